@@ -2,17 +2,23 @@ import asyncio
 import json
 import os
 import sys
+from dataclasses import dataclass
 from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple, Union
 
 import httpx # type: ignore
 from dotenv import load_dotenv # type: ignore
 from eth_account import Account # type: ignore
-from x402.clients.httpx import x402HttpxClient  # type: ignore
 from x402.clients.base import decode_x_payment_response, x402Client     # type: ignore
+from web3 import AsyncWeb3, Web3 # type: ignore
 from web3.exceptions import ContractCustomError # type: ignore
-from credora_sdk.auto_repay_watcher import AutoRepayer  # type: ignore
+from credora_sdk.auto_repay_watcher import (  # type: ignore
+    AutoRepayer,
+    RepaymentPolicy,
+    RepayWatcherPool,
+    get_repay_service,
+)
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 SDK_PATH = PROJECT_ROOT / "credora-sdk-python"
@@ -20,9 +26,15 @@ if SDK_PATH.exists() and str(SDK_PATH) not in sys.path:
     sys.path.append(str(SDK_PATH))
 
 from credora_sdk import CredoraClient # type: ignore
-from credora_sdk.utils import create_credora_client # type: ignore
-from credora_sdk.utils import retry_with_credora # type: ignore
-from credora_sdk.loans import LoanClient  # type: ignore
+from credora_sdk import AsyncCredoraClient, AsyncLoanClient # type: ignore
+from credora_sdk.chain_metadata import ChainMetadataCache # type: ignore
+from credora_sdk.checkpoints import CheckpointStore # type: ignore
+from credora_sdk.payment_cache import PaymentRequirementsCache # type: ignore
+from credora_sdk.payment_selector import PaymentSelector # type: ignore
+from credora_sdk.response_cache import ResponseCache, from_cache # type: ignore
+from credora_sdk.receipts import AsyncReceiptTracker # type: ignore
+from credora_sdk.utils import create_async_credora_client # type: ignore
+from credora_sdk.utils import X402ClientPool, retry_with_credora # type: ignore
 
 load_dotenv()  # Load PRIVATE_KEY and BASE_URL
 
@@ -47,6 +59,9 @@ def custom_payment_selector(
 # -----------------------------------------------------
 # ASYNC: real API call using x402 payment protocol
 # -----------------------------------------------------
+DEFAULT_METADATA_CACHE = "~/.cache/credora/metadata.json"
+DEFAULT_CHECKPOINT_DB = "repay_checkpoints.db"
+DEFAULT_RESPONSE_CACHE_TTL = "300"
 DEFAULT_ABI_PATH = (
     PROJECT_ROOT
     / "smart-contracts"
@@ -54,99 +69,319 @@ DEFAULT_ABI_PATH = (
     / "CreditManager.sol"
     / "CreditManager.json"
 )
+# Enough of ERC-20 to read the balance of any asset a server accepts.
+BALANCE_OF_ABI = [
+    {
+        "constant": True,
+        "inputs": [{"name": "account", "type": "address"}],
+        "name": "balanceOf",
+        "outputs": [{"name": "", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function",
+    }
+]
+
+
+
+
+@dataclass
+class PremiumCallResult:
+    """Outcome of one ``call_premium_api`` invocation."""
+
+    status: Optional[int] = None
+    payment_tx_hash: Optional[str] = None
+    loan_taken: bool = False
+    loan_tx_hash: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.status is not None and self.status < 400
+
+
+class AgentContext:
+    """Warm state shared by every task a worker runs.
+
+    Building Web3 providers, loading the ABI and opening the x402 HTTP
+    client is done once here instead of once per ``call_premium_api``.
+    The Credora clients are the ``AsyncWeb3`` variants, so loans and
+    repayments never block the worker's event loop.
+    """
+
+    # Every context in a worker shares one receipt poller instead of each
+    # transaction polling the node on its own.
+    _receipts: Optional[AsyncReceiptTracker] = None
+
+    def __init__(
+        self,
+        private_key: str,
+        base_url: str,
+        credora_rpc_url: str,
+        credora_loan_address: str,
+    ) -> None:
+        self.base_url = base_url
+        self._private_key = private_key
+        self._credora_rpc_url = credora_rpc_url
+        self._credora_loan_address = credora_loan_address
+        # x402 network name of the chain the Credora stablecoin lives on.
+        self._credora_network = os.getenv("CREDORA_NETWORK", "base-sepolia")
+        # Ethereum account for signing x402 payment
+        self.account = Account.from_key(private_key)
+        self.abi = _load_abi(_resolve_abi_path())
+        self.credora_client: Optional[AsyncCredoraClient] = None
+        self.loan_client: Optional[AsyncLoanClient] = None
+        self.watcher: Optional[Union[AutoRepayer, RepayWatcherPool]] = None
+        self.http: Optional[X402ClientPool] = None
+        self.selector: Optional[PaymentSelector] = None
+        self._balance_tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._payment_web3: Dict[str, Any] = {}
+
+    @classmethod
+    def from_env(cls, private_key: Optional[str] = None) -> Optional["AgentContext"]:
+        PRIVATE_KEY = private_key or os.getenv("PRIVATE_KEY")
+        BASE_URL = os.getenv("BASE_URL")
+        CRDORA_RPC_URL = os.getenv("CREDORA_RPC_URL")
+        CREDORA_LOAN_ADDRESS = os.getenv("CREDORA_LOAN_ADDRESS")
+
+        if not CRDORA_RPC_URL and not CREDORA_LOAN_ADDRESS:
+            print("CREDORA_RPC_URL or CREDORA_LOAN_ADDRESS missing in .env")
+            return None
+
+        if not PRIVATE_KEY:
+            print("PRIVATE_KEY missing in .env")
+            return None
+
+        if not BASE_URL:
+            print("BASE_URL missing in .env")
+            return None
+
+        try:
+            return cls(PRIVATE_KEY, BASE_URL, CRDORA_RPC_URL, CREDORA_LOAN_ADDRESS)
+        except (OSError, ValueError) as exc:
+            # Missing or invalid ABI file, malformed key: retrying won't help.
+            print(f"Invalid agent configuration: {exc}")
+            return None
+
+    async def open(self) -> "AgentContext":
+        self.credora_client = await create_async_credora_client(
+            self._private_key,
+            resolve_abi_path=_resolve_abi_path,
+            load_abi=_load_abi,
+            loan_tx_defaults=_loan_tx_defaults,
+            credora_rpc_url=self._credora_rpc_url,
+            credora_loan_address=self._credora_loan_address,
+            metadata_cache=_metadata_cache(),
+            verify_connection=False,
+            receipt_tracker=AgentContext._receipts,
+            # Concurrent tasks on this wallet that all hit insufficient
+            # funds share one loan for the summed amount.
+            loan_coalesce_window=float(os.getenv("CREDORA_LOAN_COALESCE_WINDOW", "0.25")),
+        )
+        if self.credora_client is not None:
+            self.loan_client = self.credora_client.loan
+            AgentContext._receipts = self.loan_client.receipts
+            self.loan_client.fee_oracle.start()
+
+        # Prefer whichever accepted option the wallet can pay without a
+        # loan; balances are refreshed in the background as they expire.
+        loanable = []
+        if self.loan_client is not None:
+            loanable.append((self._credora_network, self.loan_client.stablecoin.address))
+        self.selector = PaymentSelector(
+            networks=os.getenv("AGENT_PAYMENT_NETWORKS", self._credora_network).split(","),
+            loanable=loanable,
+            on_stale=self._on_stale_balance,
+            fallback=custom_payment_selector,
+        )
+        self._refresh_balance()
+
+        payment_listeners = []
+        prefund_horizon = float(os.getenv("CREDORA_PREFUND_HORIZON", "0"))
+        if self.credora_client is not None and prefund_horizon > 0:
+            # Borrow in the background before the wallet runs dry, so paid
+            # calls don't wait on 402 -> loan -> retry.
+            prefunder = self.credora_client.enable_prefunding(
+                horizon_seconds=prefund_horizon,
+                min_loan_wei=int(os.getenv("CREDORA_PREFUND_MIN_LOAN_WEI", "0")),
+                on_loan_taken=self._on_prefund_loan,
+            )
+            payment_listeners.append(prefunder.observe_payment)
+        # Settled payments debit the selector's balances and refine its
+        # per-network settlement latency.
+        payment_listeners.append(self.selector.on_payment)
+
+        # One keep-alive connection pool serves every call and post-loan
+        # retry; each of those gets its own x402 client, since x402's
+        # payment hook state is single-use and can't be shared by tasks.
+        self.http = X402ClientPool(
+            self.account,
+            self.base_url,
+            self.selector,
+            http2=os.getenv("AGENT_HTTP2", "").lower() in ("1", "true", "yes"),
+            requirements_cache=_payment_requirements_cache(),
+            response_cache=_response_cache(),
+            payment_listeners=payment_listeners,
+        )
 
+        if self.loan_client is not None:
+            print("StableCoin address:", self.loan_client.stablecoin.address)
+            # Repayment monitoring runs in the process-wide service, so API
+            # calls return as soon as they finish. "pool" mode shares one
+            # block-driven watcher across every wallet in this process.
+            repay_mode = os.getenv("CREDORA_REPAY_MODE", "logs")
+            if repay_mode == "pool":
+                self.watcher = get_repay_service().watch_in_pool(
+                    self.loan_client, checkpoint_store=_checkpoint_store()
+                )
+            else:
+                self.watcher = get_repay_service().watch(
+                    AutoRepayer(
+                        loan=self.loan_client,
+                        token_contract=self.loan_client.stablecoin,
+                        wallet=self.account.address,
+                        mode=repay_mode,
+                        checkpoint_store=_checkpoint_store(),
+                        policy=_repayment_policy(),
+                    )
+                )
+        return self
+
+    def _on_prefund_loan(self, receipt) -> None:
+        print("Pre-funding loan tx:", receipt.transactionHash.hex())
+        self._refresh_balance()
+        if self.watcher is not None:
+            self.watcher.note_loan(self.account.address)
+
+    def _on_stale_balance(self, network: str, asset: str) -> None:
+        self._refresh_balance(network, asset)
+
+    def _refresh_balance(self, network: Optional[str] = None, asset: Optional[str] = None) -> None:
+        """Re-read one balance for the selector without blocking.
+
+        Defaults to the Credora stablecoin. Other assets are read on the
+        network's ``AGENT_PAYMENT_RPC_URLS`` endpoint; assets on networks
+        without one stay unknown.
+        """
+        if network is None:
+            if self.loan_client is None:
+                return
+            network, asset = self._credora_network, self.loan_client.stablecoin.address
+        if not asset:
+            return
+        key = (network, asset.lower())
+        if key in self._balance_tasks or self._web3_for(network) is None:
+            return
+        self._balance_tasks[key] = asyncio.get_running_loop().create_task(
+            self._read_balance(network, asset)
+        )
 
-
-
-async def call_premium_api():
-    PRIVATE_KEY = os.getenv("PRIVATE_KEY")
-    BASE_URL = os.getenv("BASE_URL")
-    CRDORA_RPC_URL = os.getenv("CREDORA_RPC_URL")
-    CREDORA_LOAN_ADDRESS = os.getenv("CREDORA_LOAN_ADDRESS")
-
-    
-    
-    if not CRDORA_RPC_URL and not CREDORA_LOAN_ADDRESS:
-        print("CREDORA_RPC_URL or CREDORA_LOAN_ADDRESS missing in .env")
-        return
-    
-    if not PRIVATE_KEY:
-        print("PRIVATE_KEY missing in .env")
-        return
-
-    if not BASE_URL:
-        print("BASE_URL missing in .env")
-        return
-
-    credora_client = create_credora_client(
-        PRIVATE_KEY,
-        resolve_abi_path=_resolve_abi_path,
-        load_abi=_load_abi,
-        loan_tx_defaults=_loan_tx_defaults,
-        credora_rpc_url=CRDORA_RPC_URL,
-        credora_loan_address=CREDORA_LOAN_ADDRESS,
-    )
-
-    # Ethereum account for signing x402 payment
-    account = Account.from_key(PRIVATE_KEY)
-    loan_client:LoanClient = LoanClient(
-        web3=credora_client.web3,
-        account=account,
-        contract_address=CREDORA_LOAN_ADDRESS,
-        abi=_load_abi(_resolve_abi_path()),
-    )
-    
-    print("StableCoin address:", loan_client.stablecoin.address)
-    print("StableCoin Contract:", loan_client.stablecoin.functions)
-
-    watcher = AutoRepayer(
-        loan=loan_client,
-        token_contract=loan_client.stablecoin,
-        wallet=account.address,
-    )   
-        
-
-     # Start watcher in background
-    asyncio.create_task(watcher.watch_and_repay())
-    
-    print("Wallet:", account.address)
-    print(f"Calling {BASE_URL}/premium using x402…")
+    def _web3_for(self, network: str) -> Optional[Any]:
+        if network == self._credora_network and self.loan_client is not None:
+            return self.loan_client.web3
+        if network not in self._payment_web3:
+            url = _payment_rpc_urls().get(network)
+            self._payment_web3[network] = (
+                AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(url)) if url else None
+            )
+        return self._payment_web3[network]
+
+    async def _read_balance(self, network: str, asset: str) -> None:
+        try:
+            if (
+                network == self._credora_network
+                and self.loan_client is not None
+                and asset.lower() == self.loan_client.stablecoin.address.lower()
+            ):
+                balance = await self.loan_client.get_balance(self.account.address)
+            else:
+                token = self._web3_for(network).eth.contract(
+                    address=Web3.to_checksum_address(asset), abi=BALANCE_OF_ABI
+                )
+                balance = await token.functions.balanceOf(self.account.address).call()
+            self.selector.balances.update(network, asset, balance)
+        except Exception as e:
+            print(f"Balance refresh failed for {asset} on {network}:", e)
+        finally:
+            self._balance_tasks.pop((network, asset.lower()), None)
+
+    async def aclose(self) -> None:
+        for task in list(self._balance_tasks.values()):
+            task.cancel()
+        if self.loan_client is not None:
+            self.loan_client.fee_oracle.stop()
+        if self.watcher is not None:
+            await get_repay_service().unwatch(self.account.address)
+            self.watcher = None
+        if self.http is not None:
+            await self.http.aclose()
+            self.http = None
+
+
+async def call_premium_api(ctx: Optional[AgentContext] = None) -> PremiumCallResult:
+    owns_context = ctx is None
+    if owns_context:
+        ctx = AgentContext.from_env()
+        if ctx is None:
+            return PremiumCallResult(error="missing configuration")
+        await ctx.open()
+
+    result = PremiumCallResult()
+
+    def on_loan_taken(receipt):
+        ctx._refresh_balance()
+        result.loan_taken = True
+        if receipt is not None:
+            result.loan_tx_hash = receipt.transactionHash.hex()
+
+    print("Wallet:", ctx.account.address)
+    print(f"Calling {ctx.base_url}/premium using x402…")
 
     try:
-        async with x402HttpxClient(
-            account=account,
-            base_url=BASE_URL,
-            payment_requirements_selector=custom_payment_selector,
-            
-        ) as client:
-
-
-            response = await client.get("/premium")
-        
-            response = await retry_with_credora(
-                account,
-                response,
-                credora_client,
-                BASE_URL,
-                method="GET",
-                endpoint="/premium",
-                credora_fallback_loan_wei=None,
-                custom_payment_selector=custom_payment_selector,
-                request_kwargs=None,
-                repay_watcher=watcher,
-            )
+        async with ctx.http.client() as http:
+            response = await http.get("/premium")
+        if from_cache(response):
+            print("Served /premium from the response cache; no payment made.")
+
+        response = await retry_with_credora(
+            ctx.account,
+            response,
+            ctx.credora_client,
+            ctx.base_url,
+            method="GET",
+            endpoint="/premium",
+            credora_fallback_loan_wei=None,
+            custom_payment_selector=custom_payment_selector,
+            request_kwargs=None,
+            repay_watcher=ctx.watcher,
+            on_loan_taken=on_loan_taken,
+            clients=ctx.http,
+        )
 
-            print("Retried", response.status_code)
-            await _log_payment_response(response)
+        print("Retried", response.status_code)
+        result.status = response.status_code
+        result.payment_tx_hash = await _log_payment_response(response)
     except Exception as e:
         print("ERROR during x402 request:", e)
-            
-   
-    # 🚨 Keep the program alive so watcher can run
-    await asyncio.Event().wait()
+        result.error = str(e)
+    finally:
+        if owns_context:
+            await ctx.aclose()
 
+    return result
 
 
+async def main():
+    """Run one call, then keep repayment monitoring alive until interrupted."""
+    ctx = AgentContext.from_env()
+    if ctx is None:
+        return
+    await ctx.open()
+    try:
+        result = await call_premium_api(ctx)
+        print("Result:", result)
+        await get_repay_service().wait()
+    finally:
+        await ctx.aclose()
 
 
 @lru_cache()
@@ -176,6 +411,65 @@ def _load_abi(path: Path) -> Any:
     return abi
 
 
+@lru_cache()
+def _metadata_cache() -> ChainMetadataCache:
+    """Chain id / stablecoin address persisted across agent restarts."""
+    return ChainMetadataCache(os.getenv("CREDORA_METADATA_CACHE", DEFAULT_METADATA_CACHE))
+
+
+@lru_cache()
+def _checkpoint_store() -> CheckpointStore:
+    """Repay watcher state, so inflows during a restart are still repaid."""
+    return CheckpointStore(os.getenv("CREDORA_CHECKPOINT_DB", DEFAULT_CHECKPOINT_DB))
+
+
+@lru_cache()
+def _response_cache() -> Optional[ResponseCache]:
+    """Opt-in cache of paid responses, so a still-valid read isn't paid twice.
+
+    AGENT_RESPONSE_CACHE is a SQLite path (or "memory" for no disk tier);
+    AGENT_RESPONSE_CACHE_TTL (seconds, default 300 to match the backend's
+    PREMIUM_MAX_AGE) applies to responses without Cache-Control, e.g. from a
+    backend build that predates the header.
+    """
+    location = os.getenv("AGENT_RESPONSE_CACHE")
+    if not location:
+        return None
+    return ResponseCache(
+        None if location == "memory" else os.path.expanduser(location),
+        default_ttl=float(os.getenv("AGENT_RESPONSE_CACHE_TTL", DEFAULT_RESPONSE_CACHE_TTL)),
+    )
+
+
+@lru_cache()
+def _payment_rpc_urls() -> Dict[str, str]:
+    """``AGENT_PAYMENT_RPC_URLS`` ("network=url,...") for reading payment balances."""
+    urls = {}
+    for entry in os.getenv("AGENT_PAYMENT_RPC_URLS", "").split(","):
+        network, _, url = entry.partition("=")
+        if network.strip() and url.strip():
+            urls[network.strip()] = url.strip()
+    return urls
+
+
+@lru_cache()
+def _payment_requirements_cache() -> Optional[PaymentRequirementsCache]:
+    """402 terms shared by every context, so known resources are paid up front.
+
+    AGENT_PREPAY_TTL=0 turns pre-paying off.
+    """
+    ttl = float(os.getenv("AGENT_PREPAY_TTL", "300"))
+    return PaymentRequirementsCache(ttl=ttl) if ttl > 0 else None
+
+
+def _repayment_policy() -> RepaymentPolicy:
+    """Batch small inflows into fewer repay transactions (defaults repay each one)."""
+    return RepaymentPolicy(
+        min_repay_wei=int(os.getenv("CREDORA_MIN_REPAY_WEI", "0")),
+        max_delay_seconds=float(os.getenv("CREDORA_REPAY_MAX_DELAY", "0")),
+    )
+
+
 def _loan_tx_defaults() -> Optional[Dict[str, Any]]:
     max_fee = os.getenv("CREDORA_MAX_FEE_PER_GAS")
     priority_fee = os.getenv("CREDORA_MAX_PRIORITY_FEE_PER_GAS")
@@ -192,7 +486,7 @@ def _loan_tx_defaults() -> Optional[Dict[str, Any]]:
     return tx or None
 
 
-async def _log_payment_response(response: httpx.Response):
+async def _log_payment_response(response: httpx.Response) -> Optional[str]:
     print("Status:", response.status_code)
     print("Body:", await response.aread())
     print("Body:", response.headers)
@@ -202,12 +496,14 @@ async def _log_payment_response(response: httpx.Response):
             response.headers["X-Payment-Response"]
         )
         print(f"Payment response transaction hash: {payment_response['transaction']}")
-    else:
-        print("Warning: No payment response header found")
+        return payment_response["transaction"]
+
+    print("Warning: No payment response header found")
+    return None
 
 
 # -----------------------------------------------------
 # OPTIONAL: Allow running agent.py directly
 # -----------------------------------------------------
 if __name__ == "__main__":
-    asyncio.run(call_premium_api())
+    asyncio.run(main())
@@ -0,0 +1,368 @@
+"""SQLite-backed task queue shared by trigger.py and worker.py.
+
+Tasks live in a single WAL-mode database so any number of producers and
+worker processes can share one queue. Enqueue is a single INSERT, and a
+claim is an atomic UPDATE that leases one task to a worker; tasks whose
+lease expires (e.g. the worker crashed) become claimable again.
+
+Idle workers don't poll: each one binds a datagram socket in a doorbell
+directory next to the database and ``enqueue`` rings every socket there
+after committing. Polling remains only as a fallback, with a backoff.
+
+Every task belongs to a lane (the signing wallet it runs under, or
+``DEFAULT_LANE``) so a fleet of workers can shard the queue by key.
+"""
+
+import glob
+import json
+import os
+import select
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+QUEUE_DB = os.getenv("AGENT_QUEUE_DB", "queue.db")
+LEGACY_QUEUE_FILE = "queue.json"
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_LANE = "default"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    payload     TEXT    NOT NULL,
+    enqueued_at REAL    NOT NULL,
+    claimed_by  TEXT,
+    lease_until REAL,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    lane        TEXT    NOT NULL DEFAULT 'default',
+    dead_at     REAL,
+    last_error  TEXT
+);
+"""
+
+# Columns added after the table was first shipped, with their definitions.
+_ADDED_COLUMNS = {
+    "lane": "TEXT NOT NULL DEFAULT 'default'",
+    "dead_at": "REAL",
+    "last_error": "TEXT",
+}
+
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS tasks_lease ON tasks (lease_until, id);
+CREATE INDEX IF NOT EXISTS tasks_lane ON tasks (lane, id);
+"""
+
+
+def task_lane(task: Dict[str, Any]) -> str:
+    """Lane a task is routed to: its ``wallet`` address, lowercased."""
+    wallet = task.get("wallet")
+    return wallet.lower() if wallet else DEFAULT_LANE
+
+
+def load_key_pool(path: Optional[str] = None) -> List[str]:
+    """Signing keys this fleet may use.
+
+    Read from ``path`` (one key per line, ``#`` comments allowed), else from
+    the comma-separated ``AGENT_PRIVATE_KEYS``, else ``PRIVATE_KEY``.
+    """
+    if path:
+        with open(path, "r") as f:
+            keys = [line.split("#", 1)[0].strip() for line in f]
+    else:
+        keys = os.getenv("AGENT_PRIVATE_KEYS", "").split(",")
+    keys = [key.strip() for key in keys if key.strip()]
+    if not keys and os.getenv("PRIVATE_KEY"):
+        keys = [os.getenv("PRIVATE_KEY")]
+    return keys
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class Doorbell:
+    """Unix datagram socket a worker blocks on until a task is enqueued."""
+
+    def __init__(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{os.getpid()}.sock")
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(self.path)
+        self._sock.setblocking(False)
+
+    def fileno(self) -> int:
+        return self._sock.fileno()
+
+    def wait(self, timeout: float) -> bool:
+        """Block up to ``timeout`` seconds. Returns True if it was rung."""
+        ready, _, _ = select.select([self._sock], [], [], timeout)
+        if not ready:
+            return False
+        self.drain()
+        return True
+
+    def drain(self) -> None:
+        try:
+            while self._sock.recv(64):
+                pass
+        except BlockingIOError:
+            pass
+
+    def close(self) -> None:
+        self._sock.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def ring(directory: str) -> None:
+        """Wake every worker listening in ``directory``."""
+        for path in glob.glob(os.path.join(directory, "*.sock")):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            sock.setblocking(False)
+            try:
+                sock.sendto(b"1", path)
+            except BlockingIOError:
+                pass  # buffer full: the worker already has a wakeup pending
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Listener died without cleaning up.
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            except OSError:
+                pass
+            finally:
+                sock.close()
+
+
+class IdleBackoff:
+    """Fallback poll interval that grows while the queue stays empty."""
+
+    def __init__(self, minimum: float = 0.5, maximum: float = 30.0, factor: float = 2.0) -> None:
+        self.minimum = minimum
+        self.maximum = maximum
+        self.factor = factor
+        self.current = minimum
+
+    def reset(self) -> None:
+        self.current = self.minimum
+
+    def next(self) -> float:
+        delay = self.current
+        self.current = min(self.current * self.factor, self.maximum)
+        return delay
+
+
+class TaskQueue:
+    """Durable FIFO queue with lease-based claim/ack semantics."""
+
+    def __init__(self, path: str = QUEUE_DB, *, busy_timeout: float = 30.0) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path,
+            timeout=busy_timeout,
+            isolation_level=None,  # we manage transactions explicitly
+            check_same_thread=False,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(tasks)")}
+        for name, definition in _ADDED_COLUMNS.items():
+            if name not in columns:  # databases created before the column existed
+                self._conn.execute(f"ALTER TABLE tasks ADD COLUMN {name} {definition}")
+        self._conn.executescript(_INDEXES)
+        self.doorbell_dir = f"{path}.doorbell"
+
+    # producer side -------------------------------------------------------
+
+    def enqueue(self, task: Dict[str, Any]) -> int:
+        """Append ``task`` to the queue, wake idle workers and return its id."""
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO tasks (payload, enqueued_at, lane) VALUES (?, ?, ?)",
+                (json.dumps(task), time.time(), task_lane(task)),
+            )
+            task_id = cur.lastrowid
+        if hasattr(socket, "AF_UNIX"):
+            Doorbell.ring(self.doorbell_dir)
+        return task_id
+
+    # consumer side -------------------------------------------------------
+
+    def claim(
+        self,
+        worker_id: Optional[str] = None,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        lanes: Optional[Iterable[str]] = None,
+    ) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """Lease the oldest available task to ``worker_id``.
+
+        When ``lanes`` is given only tasks routed to those lanes are claimed.
+        Returns ``(task_id, task)`` or ``None`` when nothing is claimable.
+        """
+        worker_id = worker_id or default_worker_id()
+        now = time.time()
+        query = (
+            "SELECT id, payload FROM tasks "
+            "WHERE dead_at IS NULL AND (lease_until IS NULL OR lease_until < ?)"
+        )
+        params: list = [now]
+        if lanes is not None:
+            lanes = list(lanes)
+            query += f" AND lane IN ({', '.join('?' for _ in lanes)})"
+            params.extend(lanes)
+        query += " ORDER BY id LIMIT 1"
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock up front, so two workers
+            # can never select and lease the same row.
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(query, params).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE tasks SET claimed_by = ?, lease_until = ?, "
+                    "attempts = attempts + 1 WHERE id = ?",
+                    (worker_id, now + lease_seconds, row[0]),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return row[0], json.loads(row[1])
+
+    def ack(self, task_id: int, worker_id: Optional[str] = None) -> bool:
+        """Remove a finished task. Returns False if the lease was lost."""
+        worker_id = worker_id or default_worker_id()
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM tasks WHERE id = ? AND claimed_by = ?",
+                (task_id, worker_id),
+            )
+            return cur.rowcount == 1
+
+    def release(
+        self, task_id: int, worker_id: Optional[str] = None, delay: float = 0.0
+    ) -> bool:
+        """Give a claimed task back so any worker can pick it up after ``delay``."""
+        worker_id = worker_id or default_worker_id()
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE tasks SET claimed_by = NULL, lease_until = ? "
+                "WHERE id = ? AND claimed_by = ?",
+                (time.time() + delay if delay > 0 else None, task_id, worker_id),
+            )
+            return cur.rowcount == 1
+
+    def renew(
+        self,
+        task_id: int,
+        worker_id: Optional[str] = None,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    ) -> bool:
+        """Extend a running task's lease. Returns False if it was already lost."""
+        worker_id = worker_id or default_worker_id()
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE tasks SET lease_until = ? WHERE id = ? AND claimed_by = ?",
+                (time.time() + lease_seconds, task_id, worker_id),
+            )
+            return cur.rowcount == 1
+
+    def fail(
+        self,
+        task_id: int,
+        worker_id: Optional[str] = None,
+        error: str = "",
+        *,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        retry_backoff: float = 0.0,
+    ) -> bool:
+        """Record a failed run of a claimed task.
+
+        The task is released for another attempt after ``retry_backoff``
+        seconds times the attempts so far, unless it has been claimed
+        ``max_attempts`` times, in which case it is kept as dead (see
+        :meth:`dead_tasks`). Returns True if it will be retried.
+        """
+        worker_id = worker_id or default_worker_id()
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT attempts FROM tasks WHERE id = ? AND claimed_by = ?",
+                    (task_id, worker_id),
+                ).fetchone()
+                retry = row is not None and row[0] < max_attempts
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE tasks SET claimed_by = NULL, lease_until = ?, "
+                        "dead_at = ?, last_error = ? WHERE id = ?",
+                        (
+                            now + retry_backoff * row[0] if retry and retry_backoff > 0 else None,
+                            None if retry else now,
+                            error,
+                            task_id,
+                        ),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return retry
+
+    # wakeups -------------------------------------------------------------
+
+    def listen(self) -> Optional[Doorbell]:
+        """Create this process's doorbell, or None where AF_UNIX is unavailable."""
+        if not hasattr(socket, "AF_UNIX"):
+            return None
+        try:
+            return Doorbell(self.doorbell_dir)
+        except OSError as exc:  # e.g. socket path longer than sun_path allows
+            print(f"Doorbell unavailable, falling back to polling: {exc}")
+            return None
+
+    # introspection -------------------------------------------------------
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM tasks WHERE dead_at IS NULL"
+            ).fetchone()[0]
+
+    def dead_tasks(self) -> List[Tuple[int, Dict[str, Any], Optional[str]]]:
+        """``(task_id, task, last_error)`` for tasks that ran out of attempts."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, payload, last_error FROM tasks WHERE dead_at IS NOT NULL ORDER BY id"
+            ).fetchall()
+        return [(row[0], json.loads(row[1]), row[2]) for row in rows]
+
+    def import_legacy_file(self, path: str = LEGACY_QUEUE_FILE) -> int:
+        """Move tasks from an old ``queue.json`` into the database."""
+        try:
+            with open(path, "r") as f:
+                tasks = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+        for task in tasks:
+            self.enqueue(task)
+        os.remove(path)
+        return len(tasks)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The agent's modules are run as scripts from ai-agent/, not installed.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,38 @@
+import pytest
+
+pytest.importorskip("x402")
+
+from agent import AgentContext  # noqa: E402
+
+KEY = "0x" + "11" * 32
+
+
+@pytest.fixture
+def env(monkeypatch):
+    monkeypatch.setenv("PRIVATE_KEY", KEY)
+    monkeypatch.setenv("BASE_URL", "http://localhost:3000")
+    monkeypatch.setenv("CREDORA_RPC_URL", "http://localhost:8545")
+    monkeypatch.setenv("CREDORA_LOAN_ADDRESS", "0x" + "22" * 20)
+    return monkeypatch
+
+
+def test_missing_abi_file_is_a_configuration_error(env, tmp_path):
+    env.setenv("CREDORA_LOAN_ABI_PATH", str(tmp_path / "missing.json"))
+
+    assert AgentContext.from_env() is None
+
+
+def test_invalid_abi_file_is_a_configuration_error(env, tmp_path):
+    path = tmp_path / "CreditManager.json"
+    path.write_text("{not json")
+    env.setenv("CREDORA_LOAN_ABI_PATH", str(path))
+
+    assert AgentContext.from_env() is None
+
+
+def test_malformed_private_key_is_a_configuration_error(env, tmp_path):
+    path = tmp_path / "CreditManager.json"
+    path.write_text('{"abi": [{"type": "function", "name": "x", "inputs": []}]}')
+    env.setenv("CREDORA_LOAN_ABI_PATH", str(path))
+
+    assert AgentContext.from_env("not-a-key") is None
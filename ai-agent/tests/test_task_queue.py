@@ -0,0 +1,107 @@
+import sqlite3
+import time
+
+import pytest
+
+from task_queue import DEFAULT_LANE, TaskQueue, task_lane
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = TaskQueue(str(tmp_path / "queue.db"))
+    yield q
+    q.close()
+
+
+def test_claim_returns_oldest_task_and_ack_removes_it(queue):
+    first = queue.enqueue({"type": "a"})
+    queue.enqueue({"type": "b"})
+
+    assert queue.claim("w1") == (first, {"type": "a"})
+    assert queue.ack(first, "w1")
+    assert queue.pending_count() == 1
+
+
+def test_claimed_task_is_not_claimed_twice(queue):
+    queue.enqueue({"type": "a"})
+
+    assert queue.claim("w1") is not None
+    assert queue.claim("w2") is None
+
+
+def test_expired_lease_makes_task_claimable_again(queue):
+    task_id = queue.enqueue({"type": "a"})
+    queue.claim("w1", lease_seconds=0.01)
+    time.sleep(0.02)
+
+    assert queue.claim("w2") == (task_id, {"type": "a"})
+    # w1 lost the lease, so its late ack must not delete w2's task.
+    assert not queue.ack(task_id, "w1")
+    assert queue.ack(task_id, "w2")
+
+
+def test_renew_keeps_the_lease(queue):
+    task_id = queue.enqueue({"type": "a"})
+    queue.claim("w1", lease_seconds=0.05)
+
+    assert queue.renew(task_id, "w1", lease_seconds=60)
+    time.sleep(0.06)
+    assert queue.claim("w2") is None
+    assert not queue.renew(task_id, "w2")
+
+
+def test_release_hands_task_back(queue):
+    task_id = queue.enqueue({"type": "a"})
+    queue.claim("w1")
+
+    assert queue.release(task_id, "w1")
+    assert queue.claim("w2") == (task_id, {"type": "a"})
+
+
+def test_fail_retries_until_max_attempts_then_keeps_task_dead(queue):
+    task_id = queue.enqueue({"type": "a"})
+
+    queue.claim("w1")
+    assert queue.fail(task_id, "w1", "boom", max_attempts=2)
+    queue.claim("w1")
+    assert not queue.fail(task_id, "w1", "boom again", max_attempts=2)
+
+    assert queue.claim("w1") is None
+    assert queue.pending_count() == 0
+    assert queue.dead_tasks() == [(task_id, {"type": "a"}, "boom again")]
+
+
+def test_fail_backoff_delays_the_retry(queue):
+    task_id = queue.enqueue({"type": "a"})
+    queue.claim("w1")
+
+    assert queue.fail(task_id, "w1", "boom", retry_backoff=60)
+    assert queue.claim("w1") is None
+
+
+def test_claim_filters_by_lane(queue):
+    queue.enqueue({"type": "a", "wallet": "0xABC"})
+    other = queue.enqueue({"type": "b"})
+
+    assert task_lane({"wallet": "0xABC"}) == "0xabc"
+    assert queue.claim("w1", lanes=[DEFAULT_LANE]) == (other, {"type": "b"})
+    assert queue.claim("w1", lanes=["0xdef"]) is None
+
+
+def test_old_databases_gain_new_columns(tmp_path):
+    path = str(tmp_path / "queue.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE tasks (id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL, "
+        "enqueued_at REAL NOT NULL, claimed_by TEXT, lease_until REAL, "
+        "attempts INTEGER NOT NULL DEFAULT 0)"
+    )
+    conn.execute("INSERT INTO tasks (payload, enqueued_at) VALUES ('{\"type\": \"a\"}', 0)")
+    conn.commit()
+    conn.close()
+
+    q = TaskQueue(path)
+    try:
+        assert q.claim("w1", lanes=[DEFAULT_LANE]) == (1, {"type": "a"})
+    finally:
+        q.close()
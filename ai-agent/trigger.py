@@ -1,18 +1,48 @@
-import json
+import argparse
+import sys
 
-QUEUE_FILE = "queue.json"
+from task_queue import TaskQueue, load_key_pool, task_lane
 
-def send_task(task):
+def fleet_lanes(keys):
+    """Wallet lanes the worker fleet holds keys for."""
+    from eth_account import Account # type: ignore
+
+    return {Account.from_key(key).address.lower() for key in keys}
+
+def send_task(task, queue=None, lanes=None):
+    """Enqueue ``task``; with ``lanes``, refuse wallets no worker can sign for.
+
+    Such a task would never be claimed, since every worker only claims its
+    own keys' lanes.
+    """
+    if lanes is not None and task.get("wallet") and task_lane(task) not in lanes:
+        raise ValueError(f"No worker holds a signing key for wallet {task['wallet']}")
+    queue = queue or TaskQueue()
+    return queue.enqueue(task)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Enqueue a task for the agent worker.")
+    parser.add_argument("--type", default="call_premium_api", help="task type")
+    parser.add_argument("--wallet", help="wallet address whose key should run the task")
+    parser.add_argument(
+        "--key-pool",
+        help="file with the fleet's private keys, used to validate --wallet "
+        "(default: AGENT_PRIVATE_KEYS or PRIVATE_KEY)",
+    )
+    args = parser.parse_args()
+
+    task = {"type": args.type}
+    lanes = None
+    if args.wallet:
+        task["wallet"] = args.wallet
+        keys = load_key_pool(args.key_pool)
+        if keys:
+            lanes = fleet_lanes(keys)
+        else:
+            print("⚠️ No signing keys configured here; not validating --wallet")
     try:
-        with open(QUEUE_FILE, 'r') as file:
-            queue = json.load(file)
-    except FileNotFoundError:
-        queue = []
-    
-    queue.append(task)
-    
-    with open(QUEUE_FILE, 'w') as file:
-        json.dump(queue, file,indent=2)
-        
-send_task({"type": "call_premium_api"})
-print("📬 Task sent to agent!")  
\ No newline at end of file
+        send_task(task, lanes=lanes)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print("📬 Task sent to agent!")
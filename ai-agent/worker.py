@@ -1,44 +1,265 @@
-import time
-import json
-from agent import call_premium_api
+import argparse
 import asyncio
+import multiprocessing
+import os
+import sys
+import time
 
-QUEUE_FILE = "queue.json"
+from eth_account import Account # type: ignore
 
-def load_queue():
-    try:
-        with open(QUEUE_FILE, "r") as f:
-            return json.load(f)
-    except:
-        return []
+from agent import AgentContext, call_premium_api
+from task_queue import (
+    DEFAULT_LANE,
+    DEFAULT_LEASE_SECONDS,
+    DEFAULT_MAX_ATTEMPTS,
+    IdleBackoff,
+    TaskQueue,
+    default_worker_id,
+    load_key_pool,
+    task_lane,
+)
+
+# Tasks in flight per signing key. 1 keeps each key's tasks strictly in
+# queue order; more overlaps them (nonces stay safe, ordering doesn't).
+DEFAULT_CONCURRENCY = int(os.getenv("AGENT_CONCURRENCY", "1"))
+DEFAULT_WORKERS = int(os.getenv("AGENT_WORKERS", "1"))
+RESTART_DELAY = 1.0
+LEASE_SECONDS = float(os.getenv("AGENT_LEASE_SECONDS", str(DEFAULT_LEASE_SECONDS)))
+MAX_ATTEMPTS = int(os.getenv("AGENT_MAX_ATTEMPTS", str(DEFAULT_MAX_ATTEMPTS)))
+RETRY_BACKOFF = float(os.getenv("AGENT_RETRY_BACKOFF", "5"))  # seconds per attempt so far
+EXIT_CONFIG = 78  # sysexits EX_CONFIG: restarting won't help
 
-def save_queue(queue):
-    with open(QUEUE_FILE, "w") as f:
-        json.dump(queue, f, indent=2)
+TASK_HANDLERS = {
+    "call_premium_api": lambda ctx, task: call_premium_api(ctx),
+}
 
-def worker():
-    print("\n🟢 Agent worker started...\n")
+def shard_keys(keys, workers):
+    """Deal keys round-robin so each key belongs to exactly one process."""
+    shards = [keys[i::workers] for i in range(workers)]
+    return [shard for shard in shards if shard]
 
+async def keep_leased(queue, worker_id, task_id):
+    """Renew a running task's lease so no other worker picks it up meanwhile."""
     while True:
-        queue = load_queue()
+        await asyncio.sleep(LEASE_SECONDS / 3)
+        if not await asyncio.to_thread(queue.renew, task_id, worker_id, LEASE_SECONDS):
+            print(f"⚠️ Lost the lease on task {task_id}")
+            return
+
+async def run_task(queue, worker_id, contexts, task_id, task):
+    print(f"🚀 Running task {task_id}: {task['type']}")
+
+    handler = TASK_HANDLERS.get(task["type"])
+    ctx = contexts.get(task_lane(task))
+    if handler is None or ctx is None:
+        # Retrying can't fix these; keep the task as dead right away.
+        error = (
+            f"Unknown task type: {task['type']}"
+            if handler is None
+            else f"No signing key for lane {task_lane(task)}"
+        )
+        print(f"❌ {error}")
+        await asyncio.to_thread(queue.fail, task_id, worker_id, error, max_attempts=0)
+        return
+
+    heartbeat = asyncio.create_task(keep_leased(queue, worker_id, task_id))
+    try:
+        print(f"🔧 Executing {task['type']}()...")
+        result = await handler(ctx, task)
+        print(f"✅ {task['type']}() done: {result}")
+    except Exception as e:
+        print("❌ ERROR inside task:", e)
+        retried = await asyncio.to_thread(
+            queue.fail,
+            task_id,
+            worker_id,
+            str(e),
+            max_attempts=MAX_ATTEMPTS,
+            retry_backoff=RETRY_BACKOFF,
+        )
+        print(f"🔁 Task {task_id} will be retried" if retried else f"💀 Task {task_id} gave up")
+        return
+    finally:
+        heartbeat.cancel()
+
+    if not await asyncio.to_thread(queue.ack, task_id, worker_id):
+        print(f"⚠️ Lease on task {task_id} expired before ack")
+
+async def run_worker(concurrency=DEFAULT_CONCURRENCY, private_keys=None, owns_default_lane=True):
+    """Single event loop running up to ``concurrency`` tasks per signing key.
+
+    With ``private_keys`` the worker only claims tasks for those wallets'
+    lanes (plus the default lane if ``owns_default_lane``), so no other
+    process ever signs with the same key. Returns False if the
+    configuration is unusable.
+    """
+    print(f"\n🟢 Agent worker {os.getpid()} started (concurrency={concurrency} per key)...\n")
+
+    queue = TaskQueue()
+    imported = queue.import_legacy_file()
+    if imported:
+        print(f"📥 Imported {imported} task(s) from queue.json")
+
+    contexts = {}
+    for key in private_keys or [None]:
+        ctx = AgentContext.from_env(key)
+        if ctx is None:
+            for opened in contexts.values():
+                await opened.aclose()
+            return False
+        await ctx.open()
+        contexts[ctx.account.address.lower()] = ctx
 
-        print(f"📨 Queue length: {len(queue)}")
+    lanes = None
+    if private_keys:
+        lanes = list(contexts)
+        if owns_default_lane:
+            lanes.append(DEFAULT_LANE)
+    # Default-lane tasks sign with the first key, so they share its slots.
+    default_key = next(iter(contexts))
+    in_flight = {address: 0 for address in contexts}
+    contexts.setdefault(DEFAULT_LANE, contexts[default_key])
 
-        if queue:
-            task = queue.pop(0)
-            print(f"🚀 Running task: {task['type']}")
+    def key_for(lane):
+        return lane if lane in in_flight else default_key
 
-            try:
-                if task["type"] == "call_premium_api":
-                    print("🔧 Executing call_premium_api()...")
-                    asyncio.run(call_premium_api())
-                    print("✅ call_premium_api() done.")
-            except Exception as e:
-                print("❌ ERROR inside task:", e)
+    def free_lanes():
+        """Lanes whose key has a free slot; None means "any lane" (single key)."""
+        if lanes is None:
+            return None if in_flight[default_key] < concurrency else []
+        return [lane for lane in lanes if in_flight[key_for(lane)] < concurrency]
 
-            save_queue(queue)
+    loop = asyncio.get_running_loop()
+    worker_id = default_worker_id()
+    backoff = IdleBackoff()
+    wake = asyncio.Event()
+    doorbell = queue.listen()
+    if doorbell is not None:
+        def on_ring():
+            doorbell.drain()
+            wake.set()
+        loop.add_reader(doorbell.fileno(), on_ring)
 
-        time.sleep(2)
+    running = set()
+
+    def on_done(t, key):
+        running.discard(t)
+        in_flight[key] -= 1
+        wake.set()
+
+    try:
+        while True:
+            wake.clear()
+            claim_lanes = free_lanes()
+            if claim_lanes == []:
+                await wake.wait()  # every key is busy until a task finishes
+                continue
+            claimed = await asyncio.to_thread(
+                queue.claim, worker_id, LEASE_SECONDS, lanes=claim_lanes
+            )
+
+            if claimed is None:
+                try:
+                    await asyncio.wait_for(wake.wait(), backoff.next())
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            backoff.reset()
+            task_id, task = claimed
+            key = key_for(task_lane(task))
+            in_flight[key] += 1
+            t = asyncio.create_task(run_task(queue, worker_id, contexts, task_id, task))
+            running.add(t)
+            t.add_done_callback(lambda t, key=key: on_done(t, key))
+    finally:
+        for t in list(running):
+            t.cancel()
+        if doorbell is not None:
+            loop.remove_reader(doorbell.fileno())
+            doorbell.close()
+        for ctx in set(contexts.values()):
+            await ctx.aclose()
+
+def worker(concurrency=DEFAULT_CONCURRENCY, private_keys=None, owns_default_lane=True):
+    if asyncio.run(run_worker(concurrency, private_keys, owns_default_lane)) is False:
+        sys.exit(EXIT_CONFIG)
+
+def supervise(workers, keys, concurrency=DEFAULT_CONCURRENCY):
+    """Run one worker process per key shard and restart any that die.
+
+    Each key lives in exactly one process, so its nonces are never raced
+    and its tasks run in that process's order; different keys run in
+    parallel across cores. A worker that exits with :data:`EXIT_CONFIG`
+    is not restarted, and the supervisor exits once none are left.
+    """
+    shards = shard_keys(keys, workers)
+    if not shards:
+        print("No signing keys configured (AGENT_PRIVATE_KEYS, PRIVATE_KEY or --key-pool)")
+        sys.exit(EXIT_CONFIG)
+    for index, shard in enumerate(shards):
+        wallets = ", ".join(Account.from_key(key).address for key in shard)
+        print(f"🧩 Lane {index}: {wallets}")
+
+    ctx = multiprocessing.get_context("spawn")
+
+    def spawn(index):
+        process = ctx.Process(
+            target=worker,
+            args=(concurrency, shards[index], index == 0),
+            name=f"agent-worker-{index}",
+        )
+        process.start()
+        return process
+
+    processes = [spawn(i) for i in range(len(shards))]
+    try:
+        while any(process is not None for process in processes):
+            time.sleep(RESTART_DELAY)
+            for index, process in enumerate(processes):
+                if process is None or process.is_alive():
+                    continue
+                if process.exitcode == EXIT_CONFIG:
+                    print(f"❌ Worker {process.name} has an unusable configuration; not restarting")
+                    processes[index] = None
+                    continue
+                print(f"⚠️ Worker {process.name} exited ({process.exitcode}); restarting")
+                processes[index] = spawn(index)
+        print("No workers left to supervise")
+        sys.exit(EXIT_CONFIG)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            if process is not None:
+                process.terminate()
+        for process in processes:
+            if process is not None:
+                process.join()
 
 if __name__ == "__main__":
-    worker()
+    parser = argparse.ArgumentParser(description="Run the agent task worker.")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help="maximum number of tasks in flight per signing key; above 1 a key's tasks "
+        "may finish out of order (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="number of worker processes; keys are sharded across them (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--key-pool",
+        help="file with one private key per line (default: AGENT_PRIVATE_KEYS or PRIVATE_KEY)",
+    )
+    args = parser.parse_args()
+
+    keys = load_key_pool(args.key_pool)
+    if args.workers > 1 or len(keys) > 1:
+        supervise(max(args.workers, 1), keys, args.concurrency)
+    else:
+        worker(args.concurrency, keys or None)
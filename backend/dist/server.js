@@ -2,12 +2,18 @@
 var __importDefault = (this && this.__importDefault) || function (mod) {
     return (mod && mod.__esModule) ? mod : { "default": mod };
 };
+var _a;
 Object.defineProperty(exports, "__esModule", { value: true });
 const express_1 = __importDefault(require("express"));
 const cors_1 = __importDefault(require("cors"));
 const x402_express_1 = require("x402-express");
+const dotenv_1 = __importDefault(require("dotenv"));
+dotenv_1.default.config();
 const app = (0, express_1.default)();
 const PORT = process.env.PORT || 3000;
+const PREMIUM_MAX_AGE = Number((_a = process.env.PREMIUM_MAX_AGE) !== null && _a !== void 0 ? _a : 300); // seconds
+const facilitatorUrl = process.env.FACILITATOR_URL;
+const payTo = process.env.ADDRESS;
 app.use((0, cors_1.default)());
 app.use(express_1.default.json());
 const premiumData = {
@@ -19,17 +25,21 @@ const premiumData = {
     ],
     price: '$9.99/mo',
 };
-app.use((0, x402_express_1.paymentMiddleware)("0x4ec137a8be0466c166997bcfc56ffdafc542201b", // your receiving wallet address
+app.use((0, x402_express_1.paymentMiddleware)(payTo, // your receiving wallet address
 {
     "GET /premium": {
         // USDC amount in dollars
-        price: "$0.001",
+        price: "$5.999",
         network: "base-sepolia",
     },
 }, {
-    url: "https://x402.org/facilitator", // Facilitator URL for Base Sepolia testnet.
+    url: facilitatorUrl, // Facilitator URL for Base Sepolia testnet.
 }));
 app.get('/premium', (req, res) => {
+    console.log("Request: ", req);
+    console.log(req.payment);
+    // premiumData is static: let paying clients reuse it instead of paying again.
+    res.set('Cache-Control', `private, max-age=${PREMIUM_MAX_AGE}`);
     res.json({
         status: 'success',
         data: premiumData,
@@ -1,8 +1,14 @@
+var _a;
 import express from 'express';
 import cors from 'cors';
 import { paymentMiddleware } from "x402-express";
+import dotenv from 'dotenv';
+dotenv.config();
 const app = express();
 const PORT = process.env.PORT || 3000;
+const PREMIUM_MAX_AGE = Number((_a = process.env.PREMIUM_MAX_AGE) !== null && _a !== void 0 ? _a : 300); // seconds
+const facilitatorUrl = process.env.FACILITATOR_URL;
+const payTo = process.env.ADDRESS;
 app.use(cors());
 app.use(express.json());
 const premiumData = {
@@ -14,17 +20,21 @@ const premiumData = {
     ],
     price: '$9.99/mo',
 };
-app.use(paymentMiddleware("0x4ec137a8be0466c166997bcfc56ffdafc542201b", // your receiving wallet address
+app.use(paymentMiddleware(payTo, // your receiving wallet address
 {
     "GET /premium": {
         // USDC amount in dollars
-        price: "$0.001",
+        price: "$5.999",
         network: "base-sepolia",
     },
 }, {
-    url: "https://x402.org/facilitator", // Facilitator URL for Base Sepolia testnet.
+    url: facilitatorUrl, // Facilitator URL for Base Sepolia testnet.
 }));
 app.get('/premium', (req, res) => {
+    console.log("Request: ", req);
+    console.log(req.payment);
+    // premiumData is static: let paying clients reuse it instead of paying again.
+    res.set('Cache-Control', `private, max-age=${PREMIUM_MAX_AGE}`);
     res.json({
         status: 'success',
         data: premiumData,
@@ -12,6 +12,7 @@ import dotenv from 'dotenv';
 dotenv.config();
 const app = express();
 const PORT = process.env.PORT || 3000;
+const PREMIUM_MAX_AGE = Number(process.env.PREMIUM_MAX_AGE ?? 300); // seconds
 
 const facilitatorUrl = process.env.FACILITATOR_URL as Resource;
 const payTo = process.env.ADDRESS as `0x${string}`;
@@ -48,6 +49,8 @@ app.use(paymentMiddleware(
 app.get('/premium', (req: any, res) => {
   console.log("Request: ", req)
   console.log(req.payment)
+  // premiumData is static: let paying clients reuse it instead of paying again.
+  res.set('Cache-Control', `private, max-age=${PREMIUM_MAX_AGE}`);
   res.json({
     status: 'success',
     data: premiumData,
@@ -1,8 +1,19 @@
 """Public API for the Credora Python SDK."""
 
+from .async_client import AsyncCredoraClient
+from .async_loans import AsyncLoanClient
 from .client import CredoraClient
+from .credit import LoanRejected, RepayReverted
 from .loans import LoanClient
 from .payments import PaymentHandler
 
-__all__ = ["CredoraClient", "LoanClient", "PaymentHandler"]
+__all__ = [
+    "AsyncCredoraClient",
+    "AsyncLoanClient",
+    "CredoraClient",
+    "LoanClient",
+    "LoanRejected",
+    "PaymentHandler",
+    "RepayReverted",
+]
 
@@ -0,0 +1,17 @@
+"""Helpers for code that drives both sync and async web3 clients."""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+from typing import Any
+
+
+async def call_maybe_async(fn, *args, **kwargs) -> Any:
+    """Await async client calls; run sync (blocking) ones off the event loop."""
+    if inspect.iscoroutinefunction(fn):
+        return await fn(*args, **kwargs)
+    result = await asyncio.to_thread(fn, *args, **kwargs)
+    if inspect.isawaitable(result):
+        return await result
+    return result
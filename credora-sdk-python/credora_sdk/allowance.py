@@ -0,0 +1,63 @@
+"""Local view of the stablecoin allowance granted to the CreditManager."""
+
+from __future__ import annotations
+
+import threading
+from typing import Optional
+
+MAX_UINT256 = 2**256 - 1
+
+EXACT = "exact"
+STANDING = "standing"
+
+
+class AllowanceCache:
+    """Tracks ``allowance(account, CreditManager)`` so repays skip redundant approves.
+
+    The value is seeded from an ``allowance()`` read (or a batched loan
+    state read) and then kept current locally: approvals we send set it,
+    repayments we send spend it. Anything unexpected, such as a failed
+    repay, invalidates it so the next use re-reads the chain.
+
+    ``policy="exact"`` approves just what a repayment needs;
+    ``policy="standing"`` approves ``standing_amount`` once so later
+    repayments need no approve at all.
+    """
+
+    def __init__(self, policy: str = EXACT, standing_amount: int = MAX_UINT256) -> None:
+        if policy not in (EXACT, STANDING):
+            raise ValueError(f"Unknown allowance policy: {policy}")
+        self.policy = policy
+        self.standing_amount = standing_amount
+        self.value: Optional[int] = None
+        self.approvals_skipped = 0
+        self._lock = threading.Lock()
+
+    @property
+    def known(self) -> bool:
+        return self.value is not None
+
+    def covers(self, amount: int) -> bool:
+        with self._lock:
+            return self.value is not None and self.value >= amount
+
+    def approval_amount(self, amount: int) -> int:
+        if self.policy == STANDING:
+            return max(self.standing_amount, amount)
+        return amount
+
+    def update(self, value: int) -> None:
+        with self._lock:
+            self.value = value
+
+    def on_approved(self, amount: int) -> None:
+        self.update(amount)
+
+    def on_spent(self, amount: int) -> None:
+        with self._lock:
+            if self.value is not None and self.value != MAX_UINT256:
+                self.value = max(self.value - amount, 0)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.value = None
@@ -0,0 +1,123 @@
+"""Async variant of the high-level Credora client."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Mapping, Optional, Sequence
+
+from eth_account import Account # type: ignore
+from eth_account.signers.local import LocalAccount # type: ignore
+from web3 import AsyncHTTPProvider, AsyncWeb3 # type: ignore
+
+from .async_loans import AsyncLoanClient
+from .chain_metadata import ChainMetadataCache
+from .client import CredoraClient
+from .credit import LoanRejected
+from .loan_coalescer import AsyncLoanCoalescer
+from .payments import PaymentHandler
+from .prefunding import AsyncPreFunder
+from .receipts import AsyncReceiptTracker
+
+
+class AsyncCredoraClient:
+    """Aggregate client bundling ``AsyncWeb3`` + payment helpers.
+
+    Mirrors :class:`~credora_sdk.client.CredoraClient`; build it with
+    :meth:`create` since connecting needs to await the provider.
+    """
+
+    def __init__(
+        self,
+        web3: AsyncWeb3,
+        account: LocalAccount,
+        loan: AsyncLoanClient,
+        loan_coalesce_window: float = 0.0,
+    ) -> None:
+        self.web3 = web3
+        self.account = account
+        self.loan = loan
+        self.payments = PaymentHandler()
+        self.loan_coalescer = (
+            AsyncLoanCoalescer(loan.take_loan, loan_coalesce_window)
+            if loan_coalesce_window > 0
+            else None
+        )
+        self.prefunder: Optional[AsyncPreFunder] = None
+
+    @classmethod
+    async def create(
+        cls,
+        rpc_url: str,
+        private_key: str,
+        loan_address: str,
+        loan_abi: Sequence[Dict[str, Any]],
+        *,
+        request_timeout: int = 10,
+        loan_tx_defaults: Optional[Dict[str, Any]] = None,
+        metadata_cache: Optional[ChainMetadataCache] = None,
+        verify_connection: bool = True,
+        receipt_tracker: Optional[AsyncReceiptTracker] = None,
+        loan_coalesce_window: float = 0.0,
+    ) -> "AsyncCredoraClient":
+        provider = AsyncHTTPProvider(rpc_url, request_kwargs={"timeout": request_timeout})
+        web3 = AsyncWeb3(provider)
+        if verify_connection and not await web3.is_connected():
+            raise ConnectionError(f"Unable to reach RPC provider at {rpc_url}")
+
+        account: LocalAccount = Account.from_key(private_key)
+        loan = await AsyncLoanClient.create(
+            web3=web3,
+            account=account,
+            contract_address=loan_address,
+            abi=loan_abi,
+            tx_defaults=loan_tx_defaults,
+            metadata_cache=metadata_cache,
+            receipt_tracker=receipt_tracker,
+        )
+        return cls(
+            web3=web3, account=account, loan=loan, loan_coalesce_window=loan_coalesce_window
+        )
+
+    def enable_prefunding(self, **kwargs: Any) -> AsyncPreFunder:
+        """See :meth:`CredoraClient.enable_prefunding`."""
+        self.prefunder = AsyncPreFunder(self, **kwargs)
+        return self.prefunder
+
+    # The 402 payload inspection is pure, so it is shared with the sync client.
+    handle_payment = CredoraClient.handle_payment
+
+    async def auto_loan_and_retry_payment(
+        self,
+        borrower: str,
+        headers: Mapping[str, str],
+        *,
+        fallback_amount_wei: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        result = self.handle_payment(headers)
+
+        if result.get("ok"):
+            return result
+
+        if result.get("reason") != "insufficient_funds":
+            return result
+
+        amount = result.get("required") or fallback_amount_wei
+        if amount is None:
+            return {**result, "loanTaken": False, "reason": "missing_required_amount"}
+
+        print(f"Taking loan of {amount} wei from Credora Loan contract...")
+        try:
+            if self.loan_coalescer is not None:
+                receipt = await self.loan_coalescer.request(borrower, int(amount))
+            else:
+                receipt = await self.loan.take_loan(borrower, int(amount))
+        except LoanRejected as exc:
+            print(f"Credora loan rejected: {exc.reason}")
+            return {
+                **result,
+                "ok": False,
+                "loanTaken": False,
+                "reason": "loan_rejected",
+                "error": exc.reason,
+                "receipt": exc.receipt,
+            }
+        return {"ok": True, "loanTaken": True, "receipt": receipt}
@@ -0,0 +1,431 @@
+"""Async loan client wrapping the Credora smart contract on ``AsyncWeb3``."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from eth_account.signers.local import LocalAccount
+from web3 import AsyncWeb3, Web3
+from web3.types import TxReceipt
+
+from .allowance import EXACT, MAX_UINT256, AllowanceCache
+from .chain_metadata import AsyncFeeOracle, ChainMetadataCache, metadata_key
+from .credit import (
+    LENDING_POOL_ABI,
+    CreditCache,
+    LoanRejected,
+    RepayReverted,
+    evaluate_loan,
+    loan_rejection,
+)
+from .gas import GasKey, GasLimitCache, gas_key
+from .loans import (
+    PIPELINED_REPAY_GAS,
+    LoanState,
+    _load_usdc_abi,
+    build_loan_states,
+    loan_state_calls,
+)
+from .multicall import MULTICALL3_ADDRESS, AsyncMulticall
+from .nonces import AsyncNonceManager, is_nonce_error
+from .read_cache import MISSING, BlockReadCache, read_key
+from .receipts import AsyncReceiptTracker, tx_key
+
+
+class AsyncLoanClient:
+    """Awaitable counterpart of :class:`~credora_sdk.loans.LoanClient`.
+
+    Every RPC round-trip yields to the event loop, so many loans and
+    repayments can be in flight on a single loop. Build instances with
+    :meth:`create`, which resolves the stablecoin address.
+    """
+
+    def __init__(
+        self,
+        web3: AsyncWeb3,
+        account: LocalAccount,
+        contract_address: str,
+        abi: Sequence[Dict[str, Any]],
+        stablecoin_address: str,
+        tx_defaults: Optional[Dict[str, Any]] = None,
+        *,
+        metadata_cache: Optional[ChainMetadataCache] = None,
+        fee_oracle: Optional[AsyncFeeOracle] = None,
+        multicall_address: Optional[str] = MULTICALL3_ADDRESS,
+        allowance_policy: str = EXACT,
+        standing_allowance: int = MAX_UINT256,
+        receipt_tracker: Optional[AsyncReceiptTracker] = None,
+        gas_limits: Optional[GasLimitCache] = None,
+        credit_cache: Optional[CreditCache] = None,
+        read_cache: Optional[BlockReadCache] = None,
+    ) -> None:
+        self.web3 = web3
+        self.account = account
+        self.contract = web3.eth.contract(
+            address=Web3.to_checksum_address(contract_address),
+            abi=abi,
+        )
+        self.tx_defaults = tx_defaults or {}
+        self.metadata = metadata_cache or ChainMetadataCache()
+        self._metadata_key = metadata_key(
+            getattr(web3.provider, "endpoint_uri", None), self.contract.address
+        )
+        self.fee_oracle = fee_oracle or AsyncFeeOracle(web3)
+        self.stablecoin = web3.eth.contract(
+            address=Web3.to_checksum_address(stablecoin_address),
+            abi=_load_usdc_abi(),
+        )
+        self.nonces = AsyncNonceManager(
+            lambda: self.web3.eth.get_transaction_count(self.account.address, "pending")
+        )
+        self.allowance = AllowanceCache(allowance_policy, standing_allowance)
+        self.multicall = AsyncMulticall(web3, multicall_address) if multicall_address else None
+        self.receipts = receipt_tracker or AsyncReceiptTracker(web3)
+        self.gas_limits = gas_limits or GasLimitCache()
+        self._inflight_gas: Dict[str, Tuple[GasKey, int]] = {}
+        self.credit = credit_cache or CreditCache()
+        self.reads = read_cache or BlockReadCache()
+        self._lending_pool: Optional[Any] = None
+
+    @classmethod
+    async def create(
+        cls,
+        web3: AsyncWeb3,
+        account: LocalAccount,
+        contract_address: str,
+        abi: Sequence[Dict[str, Any]],
+        tx_defaults: Optional[Dict[str, Any]] = None,
+        stablecoin_address: Optional[str] = None,
+        *,
+        metadata_cache: Optional[ChainMetadataCache] = None,
+        fee_oracle: Optional[AsyncFeeOracle] = None,
+        multicall_address: Optional[str] = MULTICALL3_ADDRESS,
+        allowance_policy: str = EXACT,
+        standing_allowance: int = MAX_UINT256,
+        receipt_tracker: Optional[AsyncReceiptTracker] = None,
+        gas_limits: Optional[GasLimitCache] = None,
+        credit_cache: Optional[CreditCache] = None,
+        read_cache: Optional[BlockReadCache] = None,
+    ) -> "AsyncLoanClient":
+        metadata_cache = metadata_cache or ChainMetadataCache()
+        contract_address = Web3.to_checksum_address(contract_address)
+        key = metadata_key(getattr(web3.provider, "endpoint_uri", None), contract_address)
+        if stablecoin_address is None:
+            stablecoin_address = metadata_cache.get(key, "stablecoin")
+        if stablecoin_address is None:
+            contract = web3.eth.contract(address=contract_address, abi=abi)
+            stablecoin_address = await contract.functions.stablecoin().call()
+            metadata_cache.put(key, "stablecoin", stablecoin_address)
+        return cls(
+            web3=web3,
+            account=account,
+            contract_address=contract_address,
+            abi=abi,
+            stablecoin_address=stablecoin_address,
+            tx_defaults=tx_defaults,
+            metadata_cache=metadata_cache,
+            fee_oracle=fee_oracle,
+            multicall_address=multicall_address,
+            allowance_policy=allowance_policy,
+            standing_allowance=standing_allowance,
+            receipt_tracker=receipt_tracker,
+            gas_limits=gas_limits,
+            credit_cache=credit_cache,
+            read_cache=read_cache,
+        )
+
+    async def get_chain_id(self) -> int:
+        chain_id = self.metadata.get(self._metadata_key, "chainId")
+        if chain_id is None:
+            chain_id = await self.web3.eth.chain_id
+            self.metadata.put(self._metadata_key, "chainId", chain_id)
+        return chain_id
+
+    async def get_lending_pool(self) -> Any:
+        if self._lending_pool is None:
+            address = self.metadata.get(self._metadata_key, "lendingPool")
+            if address is None:
+                address = await self.contract.functions.lendingPool().call()
+                self.metadata.put(self._metadata_key, "lendingPool", address)
+            self._lending_pool = self.web3.eth.contract(address=address, abi=LENDING_POOL_ABI)
+        return self._lending_pool
+
+    async def take_loan(self, borrower: str, amount_wei: int, *, precheck: bool = True) -> TxReceipt:
+        """Call requestLoan on the contract.
+
+        See :meth:`LoanClient.take_loan` for the pre-check and
+        :class:`~credora_sdk.credit.LoanRejected`.
+        """
+        if precheck:
+            reason = await self.precheck_loan(borrower, amount_wei)
+            if reason is not None:
+                self.credit.rejected_early += 1
+                raise LoanRejected(borrower, amount_wei, reason)
+
+        fn = self.contract.functions.requestLoan(borrower, amount_wei)
+        receipt = await self._send_transaction(fn)
+        self.credit.invalidate(borrower)
+
+        reason = loan_rejection(self.web3, receipt, self.contract.address)
+        if reason is not None:
+            raise LoanRejected(borrower, amount_wei, reason, receipt)
+        return receipt
+
+    async def precheck_loan(self, borrower: str, amount_wei: int) -> Optional[str]:
+        """See :meth:`LoanClient.precheck_loan`."""
+        borrower = Web3.to_checksum_address(borrower)
+        score = self.credit.score(borrower)
+        liquidity = self.credit.liquidity()
+        fns = []
+        if score is None:
+            fns.append(self.contract.functions.getCreditScore(borrower))
+        if liquidity is None:
+            fns.append((await self.get_lending_pool()).functions.s_totalLiquidity())
+        if fns:
+            if self.multicall is not None:
+                _, values = await self.multicall.call(fns)
+            else:
+                values = list(await asyncio.gather(*(fn.call() for fn in fns)))
+            if score is None:
+                score = values.pop(0) or 0
+                self.credit.put_score(borrower, score)
+            if liquidity is None:
+                liquidity = values.pop(0) or 0
+                self.credit.put_liquidity(liquidity)
+        return evaluate_loan(score, liquidity, amount_wei)
+
+    async def allow_repay(self, amount_wei: int) -> TxReceipt:
+        fn = self.stablecoin.functions.approve(self.contract.address, amount_wei)
+        receipt = await self._send_transaction(fn)
+        self.allowance.on_approved(amount_wei)
+        return receipt
+
+    async def get_allowance(self, refresh: bool = False) -> int:
+        """Allowance granted to the CreditManager, served from cache when known."""
+        if refresh or not self.allowance.known:
+            value = await self.stablecoin.functions.allowance(
+                self.account.address, self.contract.address
+            ).call()
+            self.allowance.update(value)
+        return self.allowance.value
+
+    async def repay(self, amount_wei: int, borrower: str, on_time: bool = True) -> TxReceipt:
+        """Repay ``amount_wei``, approving first only if the allowance falls short."""
+        _, receipt = await self.approve_and_repay(amount_wei, borrower, on_time)
+        return receipt
+
+    async def approve_and_repay(
+        self,
+        amount_wei: int,
+        borrower: str,
+        on_time: bool = True,
+        *,
+        approve_amount_wei: Optional[int] = None,
+        repay_gas: Optional[int] = None,
+    ) -> Tuple[Optional[TxReceipt], TxReceipt]:
+        """Repay, broadcasting approve + repayLoan back-to-back when needed.
+
+        If the cached allowance already covers ``amount_wei`` no approve is
+        sent and the first element of the result is ``None``. Otherwise
+        both transactions are confirmed together instead of in series;
+        the approved amount follows the allowance policy. A repayLoan
+        sent before its approve is mined can't be estimated, so it uses
+        ``repay_gas``, the learned limit, or :data:`PIPELINED_REPAY_GAS`.
+
+        Raises :class:`~credora_sdk.credit.RepayReverted` when the
+        repayLoan is mined but reverted.
+        """
+        repay = self.contract.functions.repayLoan(borrower, amount_wei, on_time)
+        try:
+            if await self.get_allowance() >= amount_wei:
+                self.allowance.approvals_skipped += 1
+                receipt = await self._send_transaction(repay)
+                self._account_repay(receipt, amount_wei, borrower)
+                return None, receipt
+
+            approve_amount = self.allowance.approval_amount(
+                max(amount_wei, approve_amount_wei or 0)
+            )
+            approve = self.stablecoin.functions.approve(self.contract.address, approve_amount)
+            approve_hash = await self.broadcast(approve)
+            repay_hash = await self.broadcast(
+                repay,
+                gas=repay_gas or self.gas_limits.limit(gas_key(repay)) or PIPELINED_REPAY_GAS,
+            )
+            approve_receipt, repay_receipt = await asyncio.gather(
+                self.wait_for_receipt(approve_hash), self.wait_for_receipt(repay_hash)
+            )
+        except Exception:
+            self.allowance.invalidate()
+            raise
+
+        self.allowance.on_approved(approve_amount)
+        self._account_repay(repay_receipt, amount_wei, borrower)
+        return approve_receipt, repay_receipt
+
+    def _account_repay(self, receipt: TxReceipt, amount_wei: int, borrower: str) -> None:
+        self.credit.invalidate(borrower)
+        if receipt.get("status") == 0:
+            # Reverted: we can't tell what the allowance is any more.
+            self.allowance.invalidate()
+            raise RepayReverted(borrower, amount_wei, receipt)
+        self.allowance.on_spent(amount_wei)
+
+    async def send_batch(self, fns: Iterable[Any], gas: Optional[int] = None) -> List[TxReceipt]:
+        """Sign and broadcast ``fns`` in order, then await all receipts together."""
+        tx_hashes = [await self.broadcast(fn, gas=gas) for fn in fns]
+        return list(await asyncio.gather(*(self.wait_for_receipt(h) for h in tx_hashes)))
+
+    async def broadcast(self, fn: Any, gas: Optional[int] = None) -> Any:
+        """Sign and send ``fn`` with a locally allocated nonce; don't wait.
+
+        Without an explicit ``gas`` the learned limit is used when there is
+        one, so ``build_transaction`` skips ``eth_estimateGas``.
+        """
+        tx_params = await self._build_tx_params()
+        key = gas_key(fn)
+        if gas is None and "gas" not in tx_params:
+            gas = self.gas_limits.limit(key)
+        if gas is not None:
+            tx_params["gas"] = gas
+        try:
+            tx = await fn.build_transaction(tx_params)
+            signed = self.account.sign_transaction(tx)
+            tx_hash = await self.web3.eth.send_raw_transaction(signed.raw_transaction)
+            self._inflight_gas[tx_key(tx_hash)] = (key, tx["gas"])
+            return tx_hash
+        except Exception as exc:
+            self.nonces.resync()
+            if is_nonce_error(exc):
+                print(f"Nonce rejected ({exc}); resynced with node")
+            raise
+
+    async def submit(self, fn: Any, gas: Optional[int] = None) -> "asyncio.Future[TxReceipt]":
+        """Broadcast ``fn`` and return a future for its receipt.
+
+        The future is resolved by the shared receipt tracker, so any
+        number of tasks can await it without polling the node.
+        """
+        tx_hash = await self.broadcast(fn, gas=gas)
+        future = self.receipts.track(tx_hash)
+
+        def learn(done: "asyncio.Future[TxReceipt]") -> None:
+            if not done.cancelled() and done.exception() is None:
+                self._on_mined(tx_hash, done.result())
+
+        future.add_done_callback(learn)
+        return future
+
+    async def wait_for_receipt(self, tx_hash: Any) -> TxReceipt:
+        receipt = await self.receipts.wait(tx_hash)
+
+        if receipt is None:
+            raise Exception("Timeout waiting for transaction to be mined")
+
+        if receipt.get("blockNumber") is None:
+            raise Exception("Transaction still pending after timeout")
+
+        self._on_mined(tx_hash, receipt)
+        print(f"Transaction mined in block {receipt.get('blockNumber')}")
+        return receipt
+
+    async def get_loan(self, borrower: str) -> Any:
+        return await self.cached_call(
+            self.contract.functions.getLoan(Web3.to_checksum_address(borrower))
+        )
+
+    async def get_outstanding(self, borrower: str) -> int:
+        borrower = Web3.to_checksum_address(borrower)
+        borrowed, repaid = await asyncio.gather(
+            self.cached_call(self.contract.functions.s_totalBorrowed(borrower)),
+            self.cached_call(self.contract.functions.s_totalRepaid(borrower)),
+        )
+        return borrowed - repaid
+
+    async def get_balance(self, account: Optional[str] = None) -> int:
+        """Stablecoin balance of ``account`` (default: our own)."""
+        account = Web3.to_checksum_address(account or self.account.address)
+        return await self.cached_call(self.stablecoin.functions.balanceOf(account))
+
+    async def get_credit_score(self, borrower: str) -> int:
+        return await self.cached_call(
+            self.contract.functions.getCreditScore(Web3.to_checksum_address(borrower))
+        )
+
+    async def cached_call(self, fn: Any) -> Any:
+        """See :meth:`LoanClient.cached_call`."""
+        if self.reads.head_stale():
+            self.reads.set_head(await self.web3.eth.block_number)
+        block = self.reads.block
+        key = read_key(fn)
+        value = self.reads.get(key)
+        if value is MISSING:
+            value = await fn.call(block_identifier=block)
+            self.reads.put(key, value, block)
+        return value
+
+    async def get_loan_state(self, borrower: str) -> LoanState:
+        states = await self.get_loan_states([borrower])
+        return states[Web3.to_checksum_address(borrower)]
+
+    async def get_loan_states(
+        self, borrowers: Iterable[str], block_identifier: Optional[Any] = None
+    ) -> Dict[str, LoanState]:
+        """See :meth:`LoanClient.get_loan_states`."""
+        borrowers = [Web3.to_checksum_address(b) for b in borrowers]
+        fns = [
+            fn
+            for borrower in borrowers
+            for fn in loan_state_calls(self.contract, self.stablecoin, borrower)
+        ]
+        if self.multicall is not None:
+            block_number, values = await self.multicall.call(fns, block_identifier)
+        else:
+            block_number = (
+                block_identifier
+                if isinstance(block_identifier, int)
+                else await self.web3.eth.block_number
+            )
+            values = await asyncio.gather(
+                *(fn.call(block_identifier=block_number) for fn in fns)
+            )
+        states = build_loan_states(borrowers, values, block_number)
+        for state in states.values():
+            self.credit.put_score(state.borrower, state.credit_score)
+        own = states.get(self.account.address)
+        if own is not None:
+            self.allowance.update(own.allowance)
+        return states
+
+    # internal helpers -----------------------------------------------------
+
+    async def _send_transaction(self, fn: Any) -> TxReceipt:
+        return await self.wait_for_receipt(await self.broadcast(fn))
+
+    def _on_mined(self, tx_hash: Any, receipt: TxReceipt) -> None:
+        # Our own tx changed balances, debt or score: drop cached reads.
+        self.reads.set_head(receipt["blockNumber"])
+        self.reads.invalidate()
+        inflight = self._inflight_gas.pop(tx_key(tx_hash), None)
+        if inflight is not None:
+            key, gas_limit = inflight
+            # A rejected requestLoan succeeds without funding anything.
+            rejected = (
+                receipt.get("status") != 0
+                and loan_rejection(self.web3, receipt, self.contract.address) is not None
+            )
+            self.gas_limits.observe(key, receipt, gas_limit, early_exit=rejected)
+
+    async def _build_tx_params(self) -> Dict[str, Any]:
+        params: Dict[str, Any] = {
+            "from": self.account.address,
+            "nonce": await self.nonces.allocate(),
+            "chainId": await self.get_chain_id(),
+        }
+
+        if "maxFeePerGas" not in self.tx_defaults and "gasPrice" not in self.tx_defaults:
+            params.update(await self.fee_oracle.fees())
+
+        params.update(self.tx_defaults)
+        return params
@@ -1,70 +1,759 @@
 import asyncio
 import time
-from credora_sdk.loans import LoanClient 
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from web3 import Web3
+
+from credora_sdk.aio import call_maybe_async
+from credora_sdk.async_loans import AsyncLoanClient
+from credora_sdk.checkpoints import CheckpointStore, RepayCheckpoint, checkpoint_key
+from credora_sdk.loans import PIPELINED_REPAY_GAS, LoanClient 
 
 CHECK_INTERVAL = 5  # seconds
+BLOCK_POLL_INTERVAL = 2  # seconds; Base produces a block every ~2s
+MAX_LOG_RANGE = 2_000  # blocks per eth_getLogs request
+MAX_TOPIC_ADDRESSES = 500  # recipients OR-ed into one eth_getLogs filter
+ERROR_BACKOFF = 5.0  # seconds after a failed watcher iteration; doubles per failure
+MAX_ERROR_BACKOFF = 60.0
+WATCHER_RESTART_DELAY = 5.0  # seconds before RepayService restarts a watcher that died
+_POOL = "pool"  # RepayService task key of the shared RepayWatcherPool
+
+TRANSFER_TOPIC = Web3.to_hex(Web3.keccak(text="Transfer(address,address,uint256)"))
+
+
+def _address_topic(address: str) -> str:
+    return "0x" + "0" * 24 + address.lower().replace("0x", "")
+
+
+def _topic_address(topic: Any) -> str:
+    return Web3.to_checksum_address(bytes(topic)[-20:])
+
+
+async def read_transfers(
+    web3: Any,
+    token_address: str,
+    recipients: Sequence[str],
+    from_block: int,
+    to_block: int,
+) -> List[Tuple[str, str, int]]:
+    """``(sender, recipient, value)`` for every token Transfer to ``recipients``.
+
+    The range is fetched in ``MAX_LOG_RANGE`` chunks and the recipients are
+    OR-ed into the topic filter, so one request covers many wallets.
+    """
+    transfers: List[Tuple[str, str, int]] = []
+    for i in range(0, len(recipients), MAX_TOPIC_ADDRESSES):
+        topics = [_address_topic(r) for r in recipients[i:i + MAX_TOPIC_ADDRESSES]]
+        start = from_block
+        while start <= to_block:
+            end = min(start + MAX_LOG_RANGE - 1, to_block)
+            logs = await call_maybe_async(
+                web3.eth.get_logs,
+                {
+                    "address": token_address,
+                    "fromBlock": start,
+                    "toBlock": end,
+                    "topics": [TRANSFER_TOPIC, None, topics],
+                },
+            )
+            for log in logs:
+                transfers.append((
+                    _topic_address(log["topics"][1]),
+                    _topic_address(log["topics"][2]),
+                    int.from_bytes(bytes(log["data"]), "big"),
+                ))
+            start = end + 1
+    return transfers
+
+
+def error_backoff(failures: int) -> float:
+    """Seconds to wait after ``failures`` consecutive failed iterations."""
+    return min(ERROR_BACKOFF * 2 ** (failures - 1), MAX_ERROR_BACKOFF)
+
+
+async def retry_forever(label: str, step: Callable[[], Awaitable[Any]]) -> Any:
+    """Run ``step`` until it succeeds, logging and backing off on each failure.
+
+    Watcher loops run one iteration per call, so an RPC error retries that
+    iteration (re-reading the same block range) instead of ending the task.
+    """
+    failures = 0
+    while True:
+        try:
+            return await step()
+        except Exception as exc:
+            failures += 1
+            delay = error_backoff(failures)
+            print(f"{label} failed ({exc}); retrying in {delay:.0f}s")
+            await asyncio.sleep(delay)
+
+
+@dataclass
+class RepaymentPolicy:
+    """When accumulated inflows are worth a ``repayLoan`` transaction.
+
+    Inflows are settled together once any of these holds:
+
+    - they cover the whole outstanding debt;
+    - they reach ``min_repay_wei`` and, if ``max_gas_to_debt_ratio`` is
+      set, the estimated gas cost (converted with ``stablecoin_per_native_wei``)
+      is at most that fraction of the repay amount;
+    - the oldest unsettled inflow is ``max_delay_seconds`` old (0 means
+      no deadline: inflows below ``min_repay_wei`` wait for more).
+
+    The defaults settle every inflow immediately.
+    """
+
+    min_repay_wei: int = 0
+    max_delay_seconds: float = 0.0
+    max_gas_to_debt_ratio: Optional[float] = None
+    stablecoin_per_native_wei: Optional[float] = None
+    repay_gas: int = PIPELINED_REPAY_GAS
+
+    def should_settle(
+        self,
+        amount: int,
+        outstanding: int,
+        waited_seconds: float,
+        fee_per_gas: Optional[int] = None,
+    ) -> bool:
+        if amount >= outstanding:
+            return True
+        if self.max_delay_seconds and waited_seconds >= self.max_delay_seconds:
+            return True
+        if amount < self.min_repay_wei:
+            return False
+        if (
+            self.max_gas_to_debt_ratio is not None
+            and self.stablecoin_per_native_wei is not None
+            and fee_per_gas is not None
+        ):
+            gas_cost = self.repay_gas * fee_per_gas * self.stablecoin_per_native_wei
+            return gas_cost <= self.max_gas_to_debt_ratio * amount
+        return True
+
+
+@dataclass
+class RepayMetrics:
+    inflows_seen: int = 0
+    repayments_sent: int = 0
+    # Repay transactions avoided by settling several inflows in one call.
+    transactions_saved: int = 0
+
 
 class AutoRepayer:
-    def __init__(self,loan:LoanClient,token_contract, wallet)->None:
+    """Repay the wallet's outstanding loan as funds flow in.
+
+    ``mode="poll"`` compares ``balanceOf`` every ``CHECK_INTERVAL`` seconds.
+    ``mode="logs"`` follows new blocks and reads stablecoin
+    ``Transfer(to=wallet)`` logs over the unseen block range, so inflows
+    are handled within a block and no balance/debt reads happen while
+    nothing arrives. Transfers from the lending pool (loan payouts) are
+    not counted as repayable inflow.
+
+    With a ``checkpoint_store`` the watcher persists its state after every
+    processed block and resumes from it on start, replaying only the
+    blocks it missed, so inflows that land during a restart still get
+    repaid.
+
+    Inflows are accumulated and settled in one ``repayLoan`` according to
+    ``policy`` (see :class:`RepaymentPolicy`); ``metrics`` counts the
+    transactions this saves.
+    """
+
+    def __init__(
+        self,
+        loan:Union[LoanClient, AsyncLoanClient],
+        token_contract,
+        wallet,
+        *,
+        mode: str = "poll",
+        block_poll_interval: float = BLOCK_POLL_INTERVAL,
+        checkpoint_store: Optional[CheckpointStore] = None,
+        policy: Optional[RepaymentPolicy] = None,
+    )->None:
+        if mode not in ("poll", "logs"):
+            raise ValueError(f"Unknown AutoRepayer mode: {mode}")
         self.loan = loan
         self.token_contract = token_contract
         self.wallet = wallet
         self.last_balance = 0
+        self.mode = mode
+        self.block_poll_interval = block_poll_interval
+        self.last_block: Optional[int] = None
+        self.pending_inflow = 0
+        self._excluded_senders: set = set()
         
         self.loan_pending = False
         self.last_loan_time = 0
         self.GRACE_SECONDS = 10
 
+        self.checkpoint_store = checkpoint_store
+        self._checkpoint_key = checkpoint_key(token_contract.address, wallet)
+
+        self.policy = policy or RepaymentPolicy()
+        self.metrics = RepayMetrics()
+        self._batch_started: Optional[float] = None
+        self._batch_inflows = 0
+        self._batch_outstanding: Optional[int] = None
+        self.balance_restored = False
+
+    def restore_checkpoint(self) -> bool:
+        """Load persisted state. Returns False if there was none.
+
+        ``last_balance`` is only restored from a checkpoint written in poll
+        mode; see :attr:`balance_restored`.
+        """
+        if self.checkpoint_store is None:
+            return False
+        cp = self.checkpoint_store.load(self._checkpoint_key)
+        if cp is None:
+            return False
+        self.last_block = cp.last_block
+        # Logs and pool mode never track the balance (they save 0); a poll
+        # watcher resuming from one must re-read it, or the wallet's whole
+        # balance would look like a fresh inflow.
+        self.balance_restored = cp.mode == "poll"
+        if self.balance_restored:
+            self.last_balance = cp.last_balance
+        self.pending_inflow = cp.pending_inflow
+        self.loan_pending = cp.loan_pending
+        self.last_loan_time = cp.last_loan_time
+        if self.pending_inflow > 0:
+            # Checkpoints from before batches were persisted: start the clock now.
+            self._batch_started = cp.batch_started or time.time()
+            self._batch_inflows = cp.batch_inflows or 1
+        return True
+
+    def save_checkpoint(self) -> None:
+        if self.checkpoint_store is None:
+            return
+        self.checkpoint_store.save(
+            self._checkpoint_key,
+            RepayCheckpoint(
+                last_block=self.last_block,
+                last_balance=self.last_balance,
+                pending_inflow=self.pending_inflow,
+                loan_pending=self.loan_pending,
+                last_loan_time=self.last_loan_time,
+                batch_started=self._batch_started,
+                batch_inflows=self._batch_inflows,
+                mode=self.mode,
+            ),
+        )
+
     async def get_balance(self):
-        return self.token_contract.functions.balanceOf(self.wallet).call()      
-    
+        if self.token_contract.address == self.loan.stablecoin.address:
+            # Shares the loan client's per-block read cache.
+            return await call_maybe_async(self.loan.get_balance, self.wallet)
+        return await call_maybe_async(self.token_contract.functions.balanceOf(self.wallet).call)
+
+    def _in_grace_period(self) -> bool:
+        if not self.loan_pending:
+            return False
+        if time.time() - self.last_loan_time < self.GRACE_SECONDS:
+            return True
+        print("Grace window ended → watcher active again")
+        self.loan_pending = False
+        return False
+
     async def watch_and_repay(self):
+        if self.mode == "logs":
+            await self.watch_transfers_and_repay()
+            return
+
         print("Starting auto-repay watcher...")
-        self.last_balance = await self.get_balance()
+        self.restore_checkpoint()
+        if not self.balance_restored:
+            self.last_balance = await retry_forever("Auto-repay balance read", self.get_balance)
         
         while True:
             await asyncio.sleep(CHECK_INTERVAL) 
-           
-            # 1. If loan was just taken → skip
-            if self.loan_pending:
-                if time.time() - self.last_loan_time < self.GRACE_SECONDS:
-                    print("⏳ Grace period active. Skipping auto-repay.")
-                    continue
-                else:
-                    print("Grace window ended → watcher active again")
-                    self.loan_pending = False
-                    
-                    
-            print("Checking balance for auto-repay...")
-            current_balance = await self.get_balance()
-            
-            print(f"Current balance: {current_balance}, Last balance: {self.last_balance}")
-            if current_balance > self.last_balance:
-                gained = current_balance - self.last_balance
-                
-                print(f"Detected balance increase of {gained}. Initiating auto-repay...")
+            await retry_forever("Auto-repay balance check", self.check_balance)
+
+    async def check_balance(self) -> None:
+        """One poll-mode iteration: record a balance increase, settle if due."""
+        # 1. If loan was just taken → skip
+        if self._in_grace_period():
+            print("⏳ Grace period active. Skipping auto-repay.")
+            return
                 
-                outstanding = self.loan.get_outstanding(self.wallet)
-                print(f"Outstanding loan amount: {outstanding}")
-                if outstanding > 0:
-                    print(f"Outstanding loan amount: {outstanding}. Repaying...")
-                    repay_amount = min(gained, outstanding)
-                    
-                    print(f"➡️ Repaying {repay_amount} tokens...")
-                    
-                    try:
-                        self.loan.allow_repay(outstanding)
-                        print("Approval for repay succeeded.")
-                        receipt = self.loan.repay(repay_amount,borrower=self.wallet,on_time=True)
-                        print("Loan repaid tx:", receipt.transactionHash.hex())
-
-                    except Exception as e:
-                        print("Repay failed:", e)
-                else:
-                    print("✔️ No outstanding loan.")
-             # Update last balance
+        print("Checking balance for auto-repay...")
+        current_balance = await self.get_balance()
+        
+        print(f"Current balance: {current_balance}, Last balance: {self.last_balance}")
+        if current_balance > self.last_balance:
+            gained = current_balance - self.last_balance
+            
+            print(f"Detected balance increase of {gained}.")
+            self._record_inflows([gained])
+         # Update last balance
+        if current_balance != self.last_balance:
             self.last_balance = current_balance
+            self.save_checkpoint()
+
+        await self.settle_if_due()
+
+    async def watch_transfers_and_repay(self):
+        print("Starting auto-repay watcher (Transfer logs)...")
+        await retry_forever("Auto-repay watcher start", self._start_transfer_watch)
+        while True:
+            await retry_forever("Auto-repay block scan", self.scan_new_blocks)
+            await asyncio.sleep(self.block_poll_interval)
+
+    async def _start_transfer_watch(self) -> None:
+        lending_pool = await call_maybe_async(self.loan.contract.functions.lendingPool().call)
+        self._excluded_senders = {lending_pool.lower()}
+        self.restore_checkpoint()
+        if self.last_block is None:
+            self.last_block = await call_maybe_async(lambda: self.loan.web3.eth.block_number)
+            self.save_checkpoint()
+        else:
+            print(f"Resuming from checkpoint at block {self.last_block}")
+
+    async def scan_new_blocks(self) -> None:
+        """One logs-mode iteration: record inflows up to head, settle if due.
+
+        ``last_block`` only advances once the range has been read, so a
+        failed read is retried over the same blocks.
+        """
+        head = await call_maybe_async(lambda: self.loan.web3.eth.block_number)
+        if head > self.last_block:
+            # After a restart this replays the whole missed range, in
+            # MAX_LOG_RANGE chunks.
+            self._record_inflows(await self._inflow_values(self.last_block + 1, head))
+            self.last_block = head
+            self.save_checkpoint()
+
+        if self.pending_inflow > 0 and not self._in_grace_period():
+            await self.settle_if_due()
+
+    async def read_inflows(self, from_block: int, to_block: int) -> int:
+        """Sum stablecoin transferred to the wallet in ``[from_block, to_block]``."""
+        return sum(await self._inflow_values(from_block, to_block))
+
+    async def _inflow_values(self, from_block: int, to_block: int) -> List[int]:
+        transfers = await read_transfers(
+            self.loan.web3, self.token_contract.address, [self.wallet], from_block, to_block
+        )
+        return [
+            value
+            for sender, _, value in transfers
+            if sender.lower() not in self._excluded_senders
+        ]
+
+    def _record_inflows(self, values: Sequence[int]) -> None:
+        if not values:
+            return
+        if self._batch_started is None:
+            self._batch_started = time.time()
+        self.pending_inflow += sum(values)
+        self._batch_inflows += len(values)
+        self.metrics.inflows_seen += len(values)
+
+    async def settle_if_due(self) -> None:
+        """Repay the accumulated inflows if the policy says it's worth it."""
+        if self.pending_inflow <= 0:
+            return
+        if self._batch_outstanding is None:
+            self._batch_outstanding = await call_maybe_async(self.loan.get_outstanding, self.wallet)
+        outstanding = self._batch_outstanding
+        amount = min(self.pending_inflow, outstanding)
+
+        if outstanding > 0:
+            waited = time.time() - (self._batch_started or time.time())
+            fee_per_gas = None
+            if self.policy.max_gas_to_debt_ratio is not None:
+                fees = await call_maybe_async(self.loan.fee_oracle.fees)
+                fee_per_gas = fees.get("maxFeePerGas", fees.get("gasPrice"))
+            if not self.policy.should_settle(amount, outstanding, waited, fee_per_gas):
+                return
+
+        # The policy may have judged a minutes-old debt; repay against the
+        # current one, and never more than the wallet still holds. Read both
+        # before taking the batch, so a failed read leaves it pending.
+        outstanding = await call_maybe_async(self.loan.get_outstanding, self.wallet)
+        balance = await self.get_balance()
+
+        gained, inflows, started = self.pending_inflow, self._batch_inflows, self._batch_started
+        self.pending_inflow = 0
+        self._batch_started = None
+        self._batch_inflows = 0
+        self._batch_outstanding = None
+        amount = min(gained, balance)
+        print(f"Settling {inflows} inflow(s) totalling {gained}. Initiating auto-repay...")
+        if outstanding > 0 and amount > 0:
+            if await self.repay_from_inflow(amount, outstanding):
+                self.metrics.repayments_sent += 1
+                self.metrics.transactions_saved += max(inflows - 1, 0)
+            else:
+                # Failed: keep the batch so the next check retries it.
+                self.pending_inflow += gained
+                self._batch_inflows += inflows
+                self._batch_started = started
+        self.save_checkpoint()
+
+    def note_loan(self, wallet: Optional[str] = None) -> None:
+        """Start the post-loan grace period (``wallet`` is for pool parity)."""
+        self.loan_pending = True
+        self.last_loan_time = time.time()
+        # The new loan changes the debt the current batch is measured against.
+        self._batch_outstanding = None
+        self.save_checkpoint()
+
+    async def repay_from_inflow(self, gained: int, outstanding: Optional[int] = None) -> bool:
+        """Repay up to ``gained``. Returns True if a repayment was mined."""
+        if outstanding is None:
+            outstanding = await call_maybe_async(self.loan.get_outstanding, self.wallet)
+        print(f"Outstanding loan amount: {outstanding}")
+        if outstanding > 0:
+            print(f"Outstanding loan amount: {outstanding}. Repaying...")
+            repay_amount = min(gained, outstanding)
+            
+            print(f"➡️ Repaying {repay_amount} tokens...")
             
+            try:
+                # approve + repay are broadcast back-to-back and
+                # confirmed together instead of in series.
+                _, receipt = await call_maybe_async(
+                    self.loan.approve_and_repay,
+                    repay_amount,
+                    borrower=self.wallet,
+                    on_time=True,
+                    approve_amount_wei=outstanding,
+                )
+                print("Loan repaid tx:", receipt.transactionHash.hex())
+                return True
+
+            except Exception as e:
+                print("Repay failed:", e)
+        else:
+            print("✔️ No outstanding loan.")
+        return False
             
 
-        
\ No newline at end of file
+        
+
+class RepayWatcherPool:
+    """Watch many borrower wallets from a single loop.
+
+    Each new block costs one ``eth_getLogs`` covering every watched wallet
+    (recipients OR-ed into the topic filter). Only wallets that received
+    funds are then read, all together through one batched
+    ``get_loan_states`` call, and only those with both spare balance and
+    outstanding debt get a repayment. Per-wallet state lives in parallel
+    lists indexed by slot rather than one object per wallet.
+
+    With a ``checkpoint_store`` the block cursor and each wallet's pending
+    inflow and grace deadline survive restarts, like :class:`AutoRepayer`.
+    """
+
+    def __init__(
+        self,
+        *,
+        block_poll_interval: float = BLOCK_POLL_INTERVAL,
+        grace_seconds: float = 10,
+        checkpoint_store: Optional[CheckpointStore] = None,
+    ) -> None:
+        self.block_poll_interval = block_poll_interval
+        self.grace_seconds = grace_seconds
+        self.checkpoint_store = checkpoint_store
+        self.last_block: Optional[int] = None
+        self._reader: Optional[Union[LoanClient, AsyncLoanClient]] = None
+        self._excluded_senders: set = set()
+        self._slots: Dict[str, int] = {}
+        # struct-of-arrays, one entry per slot
+        self.wallets: List[str] = []
+        self.loans: List[Optional[Union[LoanClient, AsyncLoanClient]]] = []
+        self.pending_inflow: List[int] = []
+        self.grace_until: List[float] = []
+        self.repaying: List[bool] = []
+
+    def __len__(self) -> int:
+        return sum(1 for loan in self.loans if loan is not None)
+
+    def add(self, loan: Union[LoanClient, AsyncLoanClient]) -> int:
+        """Watch ``loan.account``'s wallet; repayments are signed with ``loan``."""
+        wallet = Web3.to_checksum_address(loan.account.address)
+        if self._reader is None:
+            self._reader = loan
+        slot = self._slots.get(wallet.lower())
+        if slot is not None:
+            self.loans[slot] = loan
+            return slot
+
+        slot = len(self.wallets)
+        self._slots[wallet.lower()] = slot
+        self.wallets.append(wallet)
+        self.loans.append(loan)
+        self.pending_inflow.append(0)
+        self.grace_until.append(0.0)
+        self.repaying.append(False)
+
+        if self.checkpoint_store is not None:
+            cp = self.checkpoint_store.load(self._wallet_key(slot))
+            if cp is not None:
+                self.pending_inflow[slot] = cp.pending_inflow
+                if cp.loan_pending:
+                    self.grace_until[slot] = cp.last_loan_time + self.grace_seconds
+        return slot
+
+    # checkpoints ----------------------------------------------------------
+
+    def _wallet_key(self, slot: int) -> str:
+        return checkpoint_key(self._reader.stablecoin.address, self.wallets[slot])
+
+    def _cursor_key(self) -> str:
+        return checkpoint_key(self._reader.stablecoin.address, "pool")
+
+    def save_checkpoint(self, slots: Sequence[int] = ()) -> None:
+        """Persist the block cursor plus the state of ``slots``, atomically."""
+        if self.checkpoint_store is None:
+            return
+        items = [(self._cursor_key(), RepayCheckpoint(last_block=self.last_block, mode="pool"))]
+        now = time.time()
+        for slot in slots:
+            items.append((
+                self._wallet_key(slot),
+                RepayCheckpoint(
+                    last_block=self.last_block,
+                    pending_inflow=self.pending_inflow[slot],
+                    loan_pending=self.grace_until[slot] > now,
+                    last_loan_time=self.grace_until[slot] - self.grace_seconds,
+                    mode="pool",
+                ),
+            ))
+        self.checkpoint_store.save_many(items)
+
+    def discard(self, wallet: str) -> None:
+        slot = self._slots.get(wallet.lower())
+        if slot is not None:
+            self.loans[slot] = None
+            self.pending_inflow[slot] = 0
+
+    def note_loan(self, wallet: str) -> None:
+        """Hold off repaying ``wallet`` right after it borrowed."""
+        slot = self._slots.get(wallet.lower())
+        if slot is not None:
+            self.grace_until[slot] = time.time() + self.grace_seconds
+            self.save_checkpoint([slot])
+
+    def _active_wallets(self) -> List[str]:
+        return [w for w, loan in zip(self.wallets, self.loans) if loan is not None]
+
+    async def run(self) -> None:
+        while self._reader is None:
+            await asyncio.sleep(self.block_poll_interval)
+        await retry_forever("Repay watcher pool start", self._start)
+        print(f"Starting repay watcher pool ({len(self)} wallets) at block {self.last_block}...")
+
+        while True:
+            await retry_forever("Repay watcher pool iteration", self.step)
+            await asyncio.sleep(self.block_poll_interval)
+
+    async def _start(self) -> None:
+        reader = self._reader
+        lending_pool = await call_maybe_async(reader.contract.functions.lendingPool().call)
+        self._excluded_senders = {lending_pool.lower()}
+        if self.last_block is None and self.checkpoint_store is not None:
+            cp = self.checkpoint_store.load(self._cursor_key())
+            self.last_block = cp.last_block if cp else None
+        if self.last_block is None:
+            self.last_block = await call_maybe_async(lambda: reader.web3.eth.block_number)
+            self.save_checkpoint()
+
+    async def step(self) -> None:
+        """Scan the blocks since ``last_block`` and settle due wallets.
+
+        The cursor advances only after its range was read, so a failed
+        read is retried over the same blocks.
+        """
+        head = await call_maybe_async(lambda: self._reader.web3.eth.block_number)
+        if head > self.last_block:
+            changed = await self.scan(self.last_block + 1, head)
+            self.last_block = head
+            self.save_checkpoint(changed)
+        await self.settle()
+
+    async def scan(self, from_block: int, to_block: int) -> List[int]:
+        """Accumulate inflows in the range; returns the slots that changed."""
+        wallets = self._active_wallets()
+        if not wallets:
+            return []
+        transfers = await read_transfers(
+            self._reader.web3,
+            self._reader.stablecoin.address,
+            wallets,
+            from_block,
+            to_block,
+        )
+        changed = set()
+        for sender, recipient, value in transfers:
+            if sender.lower() in self._excluded_senders:
+                continue
+            slot = self._slots.get(recipient.lower())
+            if slot is not None and self.loans[slot] is not None:
+                self.pending_inflow[slot] += value
+                changed.add(slot)
+        return sorted(changed)
+
+    async def settle(self) -> None:
+        now = time.time()
+        due = [
+            slot
+            for slot, inflow in enumerate(self.pending_inflow)
+            if inflow > 0
+            and self.loans[slot] is not None
+            and not self.repaying[slot]
+            and self.grace_until[slot] <= now
+        ]
+        if not due:
+            return
+
+        states = await call_maybe_async(self._reader.get_loan_states, [self.wallets[s] for s in due])
+        for slot in due:
+            state = states[self.wallets[slot]]
+            amount = min(self.pending_inflow[slot], state.outstanding, state.balance)
+            self.pending_inflow[slot] = 0
+            if amount <= 0:
+                continue
+            self.repaying[slot] = True
+            asyncio.create_task(self._repay(slot, amount, state.outstanding))
+        self.save_checkpoint(due)
+
+    async def _repay(self, slot: int, amount: int, outstanding: int) -> None:
+        wallet = self.wallets[slot]
+        print(f"➡️ Repaying {amount} tokens for {wallet}...")
+        try:
+            _, receipt = await call_maybe_async(
+                self.loans[slot].approve_and_repay,
+                amount,
+                borrower=wallet,
+                on_time=True,
+                approve_amount_wei=outstanding,
+            )
+            print(f"Loan repaid for {wallet} tx:", receipt.transactionHash.hex())
+        except Exception as e:
+            print(f"Repay failed for {wallet}:", e)
+            self.pending_inflow[slot] += amount
+            self.save_checkpoint([slot])
+        finally:
+            self.repaying[slot] = False
+
+
+class RepayService:
+    """Process-wide home for repay watchers running in the background.
+
+    Callers register watchers with :meth:`watch` and the service keeps one
+    task per wallet on the running event loop until :meth:`stop`. Loan
+    clients handed to :meth:`watch_in_pool` share one
+    :class:`RepayWatcherPool` task instead. A task that ends other than by
+    cancellation is logged and restarted after ``WATCHER_RESTART_DELAY``.
+    """
+
+    def __init__(self) -> None:
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.watchers: Dict[str, AutoRepayer] = {}
+        self.pool: Optional[RepayWatcherPool] = None
+        self._pool_task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        tasks = list(self._tasks.values()) + ([self._pool_task] if self._pool_task else [])
+        return any(not task.done() for task in tasks)
+
+    def watch_in_pool(
+        self,
+        loan: Union[LoanClient, AsyncLoanClient],
+        checkpoint_store: Optional[CheckpointStore] = None,
+    ) -> RepayWatcherPool:
+        """Add ``loan``'s wallet to the shared pool, starting it if needed."""
+        if self.pool is None:
+            self.pool = RepayWatcherPool(checkpoint_store=checkpoint_store)
+        self.pool.add(loan)
+        if self._pool_task is None or self._pool_task.done():
+            self._pool_task = self._launch(_POOL, self.pool.run)
+        return self.pool
+
+    def start(self, *watchers: AutoRepayer) -> None:
+        for watcher in watchers:
+            self.watch(watcher)
+
+    def watch(self, watcher: AutoRepayer) -> AutoRepayer:
+        """Start ``watcher`` unless one is already running for its wallet."""
+        key = watcher.wallet.lower()
+        task = self._tasks.get(key)
+        if task is not None and not task.done():
+            return self.watchers[key]
+
+        self.watchers[key] = watcher
+        self._tasks[key] = self._launch(key, watcher.watch_and_repay)
+        return watcher
+
+    def _launch(
+        self, key: str, run: Callable[[], Awaitable[None]], delay: float = 0.0
+    ) -> asyncio.Task:
+        async def supervised() -> None:
+            if delay:
+                await asyncio.sleep(delay)
+            await run()
+
+        task = asyncio.create_task(supervised())
+        task.add_done_callback(lambda done: self._restart(key, run, done))
+        return task
+
+    def _restart(self, key: str, run: Callable[[], Awaitable[None]], task: asyncio.Task) -> None:
+        current = self._pool_task if key == _POOL else self._tasks.get(key)
+        if task.cancelled() or task is not current:
+            return  # stopped, unwatched or already replaced
+        print(
+            f"Repay watcher {key} exited ({task.exception()!r}); "
+            f"restarting in {WATCHER_RESTART_DELAY:.0f}s"
+        )
+        restarted = self._launch(key, run, WATCHER_RESTART_DELAY)
+        if key == _POOL:
+            self._pool_task = restarted
+        else:
+            self._tasks[key] = restarted
+
+    async def unwatch(self, wallet: str) -> None:
+        """Stop the watcher for a single wallet, if any."""
+        key = wallet.lower()
+        if self.pool is not None:
+            self.pool.discard(wallet)
+        task = self._tasks.pop(key, None)
+        self.watchers.pop(key, None)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks.values())
+        if self._pool_task is not None:
+            tasks.append(self._pool_task)
+            self._pool_task = None
+            self.pool = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+        self.watchers.clear()
+
+    async def wait(self) -> None:
+        """Block until every watcher exits (normally: until cancelled)."""
+        tasks = list(self._tasks.values())
+        if self._pool_task is not None:
+            tasks.append(self._pool_task)
+        await asyncio.gather(*tasks)
+
+
+_default_service: Optional[RepayService] = None
+
+
+def get_repay_service() -> RepayService:
+    """Return the process-wide :class:`RepayService`."""
+    global _default_service
+    if _default_service is None:
+        _default_service = RepayService()
+    return _default_service
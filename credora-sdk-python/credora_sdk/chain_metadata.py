@@ -0,0 +1,245 @@
+"""Cached chain metadata and an EIP-1559 fee oracle for transaction building."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence
+
+DEFAULT_FEE_TTL = 12.0  # seconds; a few L2 blocks / one L1 block
+DEFAULT_FEE_HISTORY_BLOCKS = 10
+DEFAULT_PRIORITY_PERCENTILE = 50
+BASE_FEE_HEADROOM = 2  # maxFeePerGas survives ~6 full blocks of base-fee growth
+STOP_TIMEOUT = 5.0  # seconds FeeOracle.stop waits for an in-flight refresh
+
+
+def metadata_key(rpc_url: Optional[str], contract_address: str) -> str:
+    # RPC URLs often embed a provider API key; only a digest goes to disk.
+    endpoint = hashlib.sha256((rpc_url or "").encode()).hexdigest()[:16]
+    return f"{endpoint}|{contract_address.lower()}"
+
+
+def _is_metadata_key(key: str) -> bool:
+    endpoint, _, _ = key.partition("|")
+    return len(endpoint) == 16 and all(c in "0123456789abcdef" for c in endpoint)
+
+
+class ChainMetadataCache:
+    """Chain id and contract wiring that never change for an RPC + contract.
+
+    Entries are kept in memory and, when ``path`` is given, persisted as
+    JSON so later processes skip the lookups entirely. Each write merges
+    with what other processes have written since and atomically replaces
+    the file. Keys carry a digest of the RPC URL, never the URL itself.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = os.path.expanduser(path) if path else None
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = self._read() if self.path else {}
+
+    def get(self, key: str, field: str) -> Any:
+        with self._lock:
+            return self._entries.get(key, {}).get(field)
+
+    def put(self, key: str, field: str, value: Any) -> None:
+        with self._lock:
+            self._entries.setdefault(key, {})[field] = value
+            if self.path:
+                self._flush()
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, "r") as f:
+                entries = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        if not isinstance(entries, dict):
+            return {}
+        # Drops entries from older versions keyed by the plaintext URL.
+        return {
+            key: fields
+            for key, fields in entries.items()
+            if _is_metadata_key(key) and isinstance(fields, dict)
+        }
+
+    def _flush(self) -> None:
+        on_disk = self._read()
+        for key, fields in self._entries.items():
+            on_disk.setdefault(key, {}).update(fields)
+        self._entries = on_disk
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def fees_from_history(history: Dict[str, Any]) -> Dict[str, int]:
+    """Derive EIP-1559 fee caps from an ``eth_feeHistory`` response."""
+    base_fees: Sequence[int] = history["baseFeePerGas"]
+    rewards = sorted(r[0] for r in history.get("reward") or [] if r)
+    priority = rewards[len(rewards) // 2] if rewards else 0
+    # baseFeePerGas[-1] is the base fee of the next (pending) block.
+    next_base_fee = base_fees[-1]
+    return {
+        "maxPriorityFeePerGas": priority,
+        "maxFeePerGas": next_base_fee * BASE_FEE_HEADROOM + priority,
+    }
+
+
+class FeeOracle:
+    """TTL'd fee estimate built from ``eth_feeHistory`` percentiles.
+
+    :meth:`fees` refreshes on demand once the estimate is older than
+    ``ttl``; after :meth:`start` a daemon thread keeps it fresh so building
+    a transaction never waits on a fee round-trip. The RPC call runs
+    outside the lock, and callers holding a stale estimate keep using it
+    while another thread refreshes. Chains without EIP-1559 fall back to
+    a legacy ``gasPrice``.
+    """
+
+    def __init__(
+        self,
+        web3: Any,
+        *,
+        ttl: float = DEFAULT_FEE_TTL,
+        block_count: int = DEFAULT_FEE_HISTORY_BLOCKS,
+        percentile: int = DEFAULT_PRIORITY_PERCENTILE,
+    ) -> None:
+        self.web3 = web3
+        self.ttl = ttl
+        self.block_count = block_count
+        self.percentile = percentile
+        self._fees: Optional[Dict[str, int]] = None
+        self._fetched_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def fees(self) -> Dict[str, int]:
+        with self._lock:
+            fresh = self._fees is not None and time.monotonic() - self._fetched_at <= self.ttl
+            if fresh or (self._fees is not None and self._refreshing):
+                return dict(self._fees)
+        self.refresh()
+        with self._lock:
+            return dict(self._fees)
+
+    def refresh(self) -> None:
+        with self._lock:
+            self._refreshing = True
+        fees: Optional[Dict[str, int]] = None
+        try:
+            fees = self._fetch()
+        finally:
+            with self._lock:
+                self._refreshing = False
+                if fees is not None:
+                    self._fees = fees
+                    self._fetched_at = time.monotonic()
+
+    def _fetch(self) -> Dict[str, int]:
+        try:
+            history = self.web3.eth.fee_history(self.block_count, "latest", [self.percentile])
+            return fees_from_history(history)
+        except Exception:
+            return {"gasPrice": self.web3.eth.gas_price}
+
+    def start(self) -> None:
+        """Refresh in a background thread every half TTL."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+
+        def run() -> None:
+            while not self._stop.is_set():
+                try:
+                    self.refresh()
+                except Exception as exc:
+                    print(f"Fee oracle refresh failed: {exc}")
+                self._stop.wait(self.ttl / 2)
+
+        self._thread = threading.Thread(target=run, name="credora-fee-oracle", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = STOP_TIMEOUT) -> None:
+        """Stop the refresh thread, waiting up to ``timeout`` for it to exit."""
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+
+class AsyncFeeOracle:
+    """:class:`FeeOracle` for ``AsyncWeb3``; :meth:`start` runs as a task.
+
+    Concurrent refreshes share one in-flight request, and callers holding
+    a stale estimate keep using it until that request completes.
+    """
+
+    def __init__(
+        self,
+        web3: Any,
+        *,
+        ttl: float = DEFAULT_FEE_TTL,
+        block_count: int = DEFAULT_FEE_HISTORY_BLOCKS,
+        percentile: int = DEFAULT_PRIORITY_PERCENTILE,
+    ) -> None:
+        self.web3 = web3
+        self.ttl = ttl
+        self.block_count = block_count
+        self.percentile = percentile
+        self._fees: Optional[Dict[str, int]] = None
+        self._fetched_at = 0.0
+        self._refreshing: Optional[asyncio.Future] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def fees(self) -> Dict[str, int]:
+        stale = self._fees is None or time.monotonic() - self._fetched_at > self.ttl
+        if stale and (self._fees is None or self._refreshing is None):
+            await self.refresh()
+        return dict(self._fees)
+
+    async def refresh(self) -> None:
+        if self._refreshing is None:
+            self._refreshing = asyncio.ensure_future(self._refresh())
+        # Shielded so one cancelled caller doesn't cancel the shared request.
+        await asyncio.shield(self._refreshing)
+
+    async def _refresh(self) -> None:
+        try:
+            try:
+                history = await self.web3.eth.fee_history(
+                    self.block_count, "latest", [self.percentile]
+                )
+                self._fees = fees_from_history(history)
+            except Exception:
+                self._fees = {"gasPrice": await self.web3.eth.gas_price}
+            self._fetched_at = time.monotonic()
+        finally:
+            self._refreshing = None
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+
+        async def run() -> None:
+            while True:
+                try:
+                    await self.refresh()
+                except Exception as exc:
+                    print(f"Fee oracle refresh failed: {exc}")
+                await asyncio.sleep(self.ttl / 2)
+
+        self._task = asyncio.create_task(run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
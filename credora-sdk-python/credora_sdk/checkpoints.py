@@ -0,0 +1,132 @@
+"""Durable, block-anchored checkpoints for the auto-repay watchers."""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS repay_checkpoints (
+    key            TEXT PRIMARY KEY,
+    last_block     INTEGER,
+    last_balance   TEXT NOT NULL DEFAULT '0',
+    pending_inflow TEXT NOT NULL DEFAULT '0',
+    loan_pending   INTEGER NOT NULL DEFAULT 0,
+    last_loan_time REAL NOT NULL DEFAULT 0,
+    batch_started  REAL,
+    batch_inflows  INTEGER NOT NULL DEFAULT 0,
+    mode           TEXT,
+    updated_at     REAL NOT NULL
+);
+"""
+
+# Columns added after the table was first shipped, with their definitions.
+_ADDED_COLUMNS = {
+    "batch_started": "REAL",
+    "batch_inflows": "INTEGER NOT NULL DEFAULT 0",
+    "mode": "TEXT",
+}
+
+
+@dataclass
+class RepayCheckpoint:
+    """Watcher state as of ``last_block`` (the last fully processed block)."""
+
+    last_block: Optional[int] = None
+    last_balance: int = 0
+    pending_inflow: int = 0
+    loan_pending: bool = False
+    last_loan_time: float = 0.0
+    # Unsettled batch behind ``pending_inflow``: when it opened, how many inflows.
+    batch_started: Optional[float] = None
+    batch_inflows: int = 0
+    # Watcher mode that wrote the row ("poll", "logs" or "pool"). Only
+    # "poll" tracks ``last_balance``; the others leave it at 0.
+    mode: Optional[str] = None
+
+
+def checkpoint_key(token_address: str, wallet: str) -> str:
+    return f"{token_address.lower()}|{wallet.lower()}"
+
+
+class CheckpointStore:
+    """SQLite table of :class:`RepayCheckpoint` rows keyed by token + wallet.
+
+    Token amounts are stored as text since they can exceed SQLite's 64-bit
+    integers.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(repay_checkpoints)")}
+        for name, definition in _ADDED_COLUMNS.items():
+            if name not in columns:  # databases created before the column existed
+                self._conn.execute(f"ALTER TABLE repay_checkpoints ADD COLUMN {name} {definition}")
+
+    def load(self, key: str) -> Optional[RepayCheckpoint]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_block, last_balance, pending_inflow, loan_pending, last_loan_time, "
+                "batch_started, batch_inflows, mode FROM repay_checkpoints WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        return RepayCheckpoint(
+            last_block=row[0],
+            last_balance=int(row[1]),
+            pending_inflow=int(row[2]),
+            loan_pending=bool(row[3]),
+            last_loan_time=row[4],
+            batch_started=row[5],
+            batch_inflows=row[6],
+            mode=row[7],
+        )
+
+    def save(self, key: str, checkpoint: RepayCheckpoint) -> None:
+        self.save_many([(key, checkpoint)])
+
+    def save_many(self, items: Iterable[Tuple[str, RepayCheckpoint]]) -> None:
+        """Write several checkpoints in one transaction."""
+        now = time.time()
+        rows = [
+            (
+                key,
+                cp.last_block,
+                str(cp.last_balance),
+                str(cp.pending_inflow),
+                int(cp.loan_pending),
+                cp.last_loan_time,
+                cp.batch_started,
+                cp.batch_inflows,
+                cp.mode,
+                now,
+            )
+            for key, cp in items
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO repay_checkpoints "
+                    "(key, last_block, last_balance, pending_inflow, loan_pending, "
+                    "last_loan_time, batch_started, batch_inflows, mode, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -8,8 +8,13 @@ from eth_account import Account # type: ignore
 from eth_account.signers.local import LocalAccount # type: ignore
 from web3 import Web3 # type: ignore
 
+from .chain_metadata import ChainMetadataCache
+from .credit import LoanRejected
+from .loan_coalescer import LoanCoalescer
 from .loans import LoanClient
 from .payments import PaymentHandler
+from .prefunding import PreFunder
+from .receipts import ReceiptTracker
 
 
 class CredoraClient:
@@ -24,10 +29,15 @@ class CredoraClient:
         *,
         request_timeout: int = 10,
         loan_tx_defaults: Optional[Dict[str, Any]] = None,
+        metadata_cache: Optional[ChainMetadataCache] = None,
+        verify_connection: bool = True,
+        receipt_tracker: Optional[ReceiptTracker] = None,
+        loan_coalesce_window: float = 0.0,
     ) -> None:
         provider = Web3.HTTPProvider(rpc_url, request_kwargs={"timeout": request_timeout})
         self.web3 = Web3(provider)
-        if not self.web3.is_connected():
+        # Skippable: the first real RPC call surfaces a bad endpoint anyway.
+        if verify_connection and not self.web3.is_connected():
             raise ConnectionError(f"Unable to reach RPC provider at {rpc_url}")
 
         self.account: LocalAccount = Account.from_key(private_key)
@@ -39,8 +49,27 @@ class CredoraClient:
             contract_address=loan_address,
             abi=loan_abi,
             tx_defaults=loan_tx_defaults,
+            metadata_cache=metadata_cache,
+            receipt_tracker=receipt_tracker,
         )
         self.payments = PaymentHandler()
+        # With a window, concurrent shortfalls for a borrower share one loan.
+        self.loan_coalescer = (
+            LoanCoalescer(self.loan.take_loan, loan_coalesce_window)
+            if loan_coalesce_window > 0
+            else None
+        )
+        self.prefunder: Optional[PreFunder] = None
+
+    def enable_prefunding(self, **kwargs: Any) -> PreFunder:
+        """Borrow ahead of projected spend; see :class:`~credora_sdk.prefunding.PreFunder`.
+
+        Register ``prefunder.observe_payment`` as a payment listener of the
+        x402 client (``create_x402_client(..., payment_listeners=...)``) so
+        every settled payment feeds the spend estimate.
+        """
+        self.prefunder = PreFunder(self, **kwargs)
+        return self.prefunder
 
     def handle_payment(self, response) -> Dict[str, Any]:
         error = response['error']
@@ -83,6 +112,20 @@ class CredoraClient:
             return {**result, "loanTaken": False, "reason": "missing_required_amount"}
 
         print(f"Taking loan of {amount} wei from Credora Loan contract...")
-        receipt = self.loan.take_loan(borrower,int(amount))
+        try:
+            if self.loan_coalescer is not None:
+                receipt = self.loan_coalescer.request(borrower, int(amount))
+            else:
+                receipt = self.loan.take_loan(borrower,int(amount))
+        except LoanRejected as exc:
+            print(f"Credora loan rejected: {exc.reason}")
+            return {
+                **result,
+                "ok": False,
+                "loanTaken": False,
+                "reason": "loan_rejected",
+                "error": exc.reason,
+                "receipt": exc.receipt,
+            }
         return {"ok": True, "loanTaken": True, "receipt": receipt}
 
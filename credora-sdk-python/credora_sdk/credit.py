@@ -0,0 +1,142 @@
+"""Local mirror of ``CreditManager.evaluateLoan`` and loan outcome decoding."""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from hexbytes import HexBytes
+from web3 import Web3
+
+# Constants from CreditManager.sol.
+INITIAL_CREDIT_SCORE = 800
+LOAN_CREDIT_THRESHOLD = 700
+
+DEFAULT_SCORE_TTL = 60.0  # scores only move when the borrower borrows/repays
+DEFAULT_LIQUIDITY_TTL = 5.0  # other borrowers and lenders move liquidity
+
+INSUFFICIENT_SCORE = "Insufficient credit score"
+INSUFFICIENT_LIQUIDITY = "Insufficient pool liquidity"
+
+LOAN_REJECTED_TOPIC = Web3.to_hex(Web3.keccak(text="LoanRejected(address,uint256,string)"))
+
+LENDING_POOL_ABI = [
+    {
+        "inputs": [],
+        "name": "s_totalLiquidity",
+        "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function",
+    },
+]
+
+
+class LoanRejected(Exception):
+    """``requestLoan`` did not (or would not) fund the loan.
+
+    ``receipt`` is set when the rejection was mined, and ``None`` when
+    the pre-check stopped the request before it was sent.
+    """
+
+    def __init__(
+        self, borrower: str, amount_wei: int, reason: str, receipt: Optional[Any] = None
+    ) -> None:
+        super().__init__(f"Loan of {amount_wei} for {borrower} rejected: {reason}")
+        self.borrower = borrower
+        self.amount_wei = amount_wei
+        self.reason = reason
+        self.receipt = receipt
+
+
+class RepayReverted(Exception):
+    """A ``repayLoan`` transaction was mined with status 0.
+
+    Pipelined repays are sent without gas estimation, so a repay that
+    would revert (short balance, stale allowance) is only caught here.
+    """
+
+    def __init__(self, borrower: str, amount_wei: int, receipt: Any) -> None:
+        super().__init__(f"Repay of {amount_wei} for {borrower} reverted")
+        self.borrower = borrower
+        self.amount_wei = amount_wei
+        self.receipt = receipt
+
+
+def evaluate_loan(score: int, liquidity: int, amount_wei: int) -> Optional[str]:
+    """Why ``requestLoan`` would not fund ``amount_wei``, or ``None`` if it would."""
+    # requestLoan seeds unscored borrowers before evaluating them.
+    if score == 0:
+        score = INITIAL_CREDIT_SCORE
+    if score < LOAN_CREDIT_THRESHOLD:
+        return INSUFFICIENT_SCORE
+    if liquidity < amount_wei:
+        # LendingPool.provideLiquidityToLoan reverts in this case.
+        return INSUFFICIENT_LIQUIDITY
+    return None
+
+
+def loan_rejection(web3: Any, receipt: Any, credit_manager: str) -> Optional[str]:
+    """The reason from a ``LoanRejected`` log in ``receipt``, if any.
+
+    A reverted ``requestLoan`` is reported as a rejection too.
+    """
+    if receipt.get("status") == 0:
+        return "requestLoan reverted"
+    credit_manager = credit_manager.lower()
+    for log in receipt.get("logs") or []:
+        topics = log.get("topics") or []
+        if (
+            topics
+            and str(log.get("address", "")).lower() == credit_manager
+            and Web3.to_hex(topics[0]).lower() == LOAN_REJECTED_TOPIC
+        ):
+            _, reason = web3.codec.decode(["uint256", "string"], HexBytes(log["data"]))
+            return reason
+    return None
+
+
+class CreditCache:
+    """TTL'd credit scores and pool liquidity for :func:`evaluate_loan`.
+
+    Entries for a borrower are dropped whenever one of our loans or
+    repayments for them is mined, since both move the score.
+    """
+
+    def __init__(
+        self,
+        *,
+        score_ttl: float = DEFAULT_SCORE_TTL,
+        liquidity_ttl: float = DEFAULT_LIQUIDITY_TTL,
+    ) -> None:
+        self.score_ttl = score_ttl
+        self.liquidity_ttl = liquidity_ttl
+        self.rejected_early = 0
+        self._scores: Dict[str, Tuple[int, float]] = {}
+        self._liquidity: Optional[Tuple[int, float]] = None
+        self._lock = threading.Lock()
+
+    def score(self, borrower: str) -> Optional[int]:
+        with self._lock:
+            entry = self._scores.get(borrower.lower())
+        if entry is None or time.monotonic() - entry[1] > self.score_ttl:
+            return None
+        return entry[0]
+
+    def put_score(self, borrower: str, score: int) -> None:
+        with self._lock:
+            self._scores[borrower.lower()] = (score, time.monotonic())
+
+    def liquidity(self) -> Optional[int]:
+        entry = self._liquidity
+        if entry is None or time.monotonic() - entry[1] > self.liquidity_ttl:
+            return None
+        return entry[0]
+
+    def put_liquidity(self, liquidity: int) -> None:
+        self._liquidity = (liquidity, time.monotonic())
+
+    def invalidate(self, borrower: str) -> None:
+        with self._lock:
+            self._scores.pop(borrower.lower(), None)
+            self._liquidity = None
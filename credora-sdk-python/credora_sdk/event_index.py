@@ -0,0 +1,407 @@
+"""Incremental SQLite index of CreditManager and LendingPool events."""
+
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from hexbytes import HexBytes
+from web3 import Web3
+
+from credora_sdk.aio import call_maybe_async
+
+INITIAL_LOG_RANGE = 2_000  # first eth_getLogs block span
+MAX_LOG_RANGE = 100_000  # the span never grows past this
+MIN_LOG_RANGE = 1
+TARGET_LOGS_PER_REQUEST = 1_000  # grow the span while responses stay below this
+CEILING_RECOVERY = 10  # successful requests before retrying a refused span
+DEFAULT_CONFIRMATIONS = 2  # stay this far behind head so reorgs don't reach the index
+INDEX_POLL_INTERVAL = 5  # seconds
+
+# name -> (signature, types of the non-indexed fields). Every event has the
+# account as its only indexed argument.
+CREDIT_MANAGER_EVENTS: Dict[str, Tuple[str, Sequence[str]]] = {
+    "LoanApproved": ("LoanApproved(address,uint256)", ["uint256"]),
+    "LoanRejected": ("LoanRejected(address,uint256,string)", ["uint256", "string"]),
+    "CreditScoreUpdated": ("CreditScoreUpdated(address,uint256)", ["uint256"]),
+    "ReputationBoost": ("ReputationBoost(address,uint256)", ["uint256"]),
+    "ReputationPenalty": ("ReputationPenalty(address,uint256)", ["uint256"]),
+}
+LENDING_POOL_EVENTS: Dict[str, Tuple[str, Sequence[str]]] = {
+    "Deposited": ("Deposited(address,uint256)", ["uint256"]),
+    "Withdrawn": ("Withdrawn(address,uint256)", ["uint256"]),
+}
+# Events whose uint256 is a score rather than a token amount.
+SCORE_EVENTS = ("CreditScoreUpdated", "ReputationBoost", "ReputationPenalty")
+
+# How providers word "this eth_getLogs request covers too much".
+_RANGE_ERROR_MARKERS = (
+    "query returned more than",
+    "block range",
+    "range too large",
+    "range is too large",
+    "too many results",
+    "response size",
+    "max results",
+)
+# Providers reuse "limit exceeded" (-32005) for rate limits, which are transient.
+_RATE_LIMIT_MARKERS = ("rate limit", "request count", "too many requests")
+_LIMIT_EXCEEDED = -32005
+
+_EVENT_TOPICS: Dict[str, Tuple[str, Sequence[str]]] = {
+    Web3.to_hex(Web3.keccak(text=signature)): (name, types)
+    for name, (signature, types) in {**CREDIT_MANAGER_EVENTS, **LENDING_POOL_EVENTS}.items()
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    block_number INTEGER NOT NULL,
+    log_index    INTEGER NOT NULL,
+    tx_hash      TEXT NOT NULL,
+    event        TEXT NOT NULL,
+    account      TEXT NOT NULL,
+    amount       TEXT,
+    score        INTEGER,
+    reason       TEXT,
+    PRIMARY KEY (block_number, log_index)
+);
+CREATE INDEX IF NOT EXISTS events_by_account ON events (account, event, block_number);
+CREATE INDEX IF NOT EXISTS events_by_event ON events (event, block_number);
+CREATE TABLE IF NOT EXISTS index_cursor (
+    key        TEXT PRIMARY KEY,
+    last_block INTEGER NOT NULL
+);
+"""
+
+
+@dataclass
+class IndexedEvent:
+    block_number: int
+    log_index: int
+    tx_hash: str
+    event: str
+    account: str
+    amount: Optional[int] = None
+    score: Optional[int] = None
+    reason: Optional[str] = None
+
+
+@dataclass
+class BorrowerTotals:
+    loans_approved: int = 0
+    loans_rejected: int = 0
+    borrowed: int = 0
+    boosts: int = 0
+    penalties: int = 0
+    score: Optional[int] = None  # latest CreditScoreUpdated
+
+
+@dataclass
+class LenderTotals:
+    deposited: int = 0
+    withdrawn: int = 0
+
+    @property
+    def net(self) -> int:
+        return self.deposited - self.withdrawn
+
+
+def decode_event(web3: Any, log: Any) -> Optional[IndexedEvent]:
+    """Turn a raw log into an :class:`IndexedEvent`; ``None`` for other events."""
+    topics = log["topics"]
+    spec = _EVENT_TOPICS.get(Web3.to_hex(topics[0]).lower()) if topics else None
+    if spec is None:
+        return None
+    name, types = spec
+    values = web3.codec.decode(list(types), HexBytes(log["data"]))
+    event = IndexedEvent(
+        block_number=log["blockNumber"],
+        log_index=log["logIndex"],
+        tx_hash=Web3.to_hex(log["transactionHash"]),
+        event=name,
+        account=Web3.to_checksum_address(bytes(topics[1])[-20:]),
+    )
+    if name in SCORE_EVENTS:
+        event.score = values[0]
+    else:
+        # LoanApproved/LoanRejected name it loanId, but it is the amount.
+        event.amount = values[0]
+    if name == "LoanRejected":
+        event.reason = values[1]
+    return event
+
+
+class EventStore:
+    """SQLite table of :class:`IndexedEvent` rows plus the ingest cursor.
+
+    Queries only touch the local database. Token amounts are stored as
+    text since they can exceed SQLite's 64-bit integers.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def last_block(self, key: str) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_block FROM index_cursor WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def insert(self, key: str, events: Iterable[IndexedEvent], last_block: int) -> None:
+        """Store ``events`` and advance the cursor in one transaction."""
+        rows = [
+            (
+                e.block_number,
+                e.log_index,
+                e.tx_hash,
+                e.event,
+                e.account.lower(),
+                None if e.amount is None else str(e.amount),
+                e.score,
+                e.reason,
+            )
+            for e in events
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO events (block_number, log_index, tx_hash, "
+                    "event, account, amount, score, reason) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO index_cursor (key, last_block) VALUES (?, ?)",
+                    (key, last_block),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def history(
+        self,
+        account: str,
+        events: Optional[Sequence[str]] = None,
+        from_block: int = 0,
+        limit: Optional[int] = None,
+    ) -> List[IndexedEvent]:
+        """Events for ``account``, oldest first, optionally filtered by name."""
+        sql = (
+            "SELECT block_number, log_index, tx_hash, event, account, amount, score, reason "
+            "FROM events WHERE account = ? AND block_number >= ?"
+        )
+        params: List[Any] = [account.lower(), from_block]
+        if events:
+            sql += f" AND event IN ({', '.join('?' for _ in events)})"
+            params.extend(events)
+        sql += " ORDER BY block_number, log_index"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            IndexedEvent(
+                block_number=row[0],
+                log_index=row[1],
+                tx_hash=row[2],
+                event=row[3],
+                account=Web3.to_checksum_address(row[4]),
+                amount=None if row[5] is None else int(row[5]),
+                score=row[6],
+                reason=row[7],
+            )
+            for row in rows
+        ]
+
+    def score_history(self, borrower: str) -> List[Tuple[int, int]]:
+        """``(block_number, score)`` for every score change of ``borrower``."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT block_number, score FROM events "
+                "WHERE account = ? AND event = 'CreditScoreUpdated' "
+                "ORDER BY block_number, log_index",
+                (borrower.lower(),),
+            ).fetchall()
+
+    def borrower_totals(self, borrower: str) -> BorrowerTotals:
+        totals = BorrowerTotals()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT event, amount, score FROM events WHERE account = ? "
+                "AND event IN ('LoanApproved', 'LoanRejected', 'ReputationBoost', "
+                "'ReputationPenalty', 'CreditScoreUpdated') ORDER BY block_number, log_index",
+                (borrower.lower(),),
+            ).fetchall()
+        for event, amount, score in rows:
+            if event == "LoanApproved":
+                totals.loans_approved += 1
+                totals.borrowed += int(amount)
+            elif event == "LoanRejected":
+                totals.loans_rejected += 1
+            elif event == "ReputationBoost":
+                totals.boosts += 1
+            elif event == "ReputationPenalty":
+                totals.penalties += 1
+            else:
+                totals.score = score
+        return totals
+
+    def lender_totals(self, lender: str) -> LenderTotals:
+        totals = LenderTotals()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT event, amount FROM events WHERE account = ? "
+                "AND event IN ('Deposited', 'Withdrawn')",
+                (lender.lower(),),
+            ).fetchall()
+        for event, amount in rows:
+            if event == "Deposited":
+                totals.deposited += int(amount)
+            else:
+                totals.withdrawn += int(amount)
+        return totals
+
+    def borrowers(self) -> List[str]:
+        """Every account that requested a loan; a local ``getUsers()``."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT account FROM events "
+                "WHERE event IN ('LoanApproved', 'LoanRejected') ORDER BY account"
+            ).fetchall()
+        return [Web3.to_checksum_address(row[0]) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def is_range_error(exc: BaseException) -> bool:
+    """True if a node refused ``eth_getLogs`` for covering too much."""
+    message = str(exc).lower()
+    if any(marker in message for marker in _RATE_LIMIT_MARKERS):
+        return False
+    payload = exc.args[0] if exc.args else None
+    if isinstance(payload, dict) and payload.get("code") == _LIMIT_EXCEEDED:
+        return True
+    return any(marker in message for marker in _RANGE_ERROR_MARKERS)
+
+
+class EventIndexer:
+    """Keep an :class:`EventStore` in sync with the chain.
+
+    Both contracts are read with one ``eth_getLogs`` filter per chunk,
+    starting at ``start_block`` (the contracts' deployment block). The
+    chunk span adapts: it doubles while responses stay under
+    ``TARGET_LOGS_PER_REQUEST``, up to ``max_range``, and halves when the
+    node refuses a request as too large (:func:`is_range_error`). A
+    refused span caps growth until ``CEILING_RECOVERY`` requests succeed;
+    other errors propagate without touching the span. Works with ``Web3``
+    and ``AsyncWeb3``.
+    """
+
+    def __init__(
+        self,
+        web3: Any,
+        credit_manager: str,
+        lending_pool: str,
+        store: EventStore,
+        *,
+        start_block: int,
+        confirmations: int = DEFAULT_CONFIRMATIONS,
+        max_range: int = MAX_LOG_RANGE,
+    ) -> None:
+        self.web3 = web3
+        self.addresses = [
+            Web3.to_checksum_address(credit_manager),
+            Web3.to_checksum_address(lending_pool),
+        ]
+        self.store = store
+        self.start_block = start_block
+        self.confirmations = confirmations
+        self.max_range = max_range
+        self.span = min(INITIAL_LOG_RANGE, max_range)
+        self._ceiling = max_range
+        self._successes = 0
+        self.key = "|".join(a.lower() for a in self.addresses)
+
+    @classmethod
+    async def for_loan_client(
+        cls, loan: Any, store: EventStore, *, start_block: int, **kwargs: Any
+    ) -> "EventIndexer":
+        """Index the contracts behind a (sync or async) loan client from ``start_block``."""
+        if hasattr(loan, "get_lending_pool"):
+            lending_pool = await loan.get_lending_pool()
+        else:
+            lending_pool = await asyncio.to_thread(lambda: loan.lending_pool)
+        return cls(
+            loan.web3,
+            loan.contract.address,
+            lending_pool.address,
+            store,
+            start_block=start_block,
+            **kwargs,
+        )
+
+    async def sync(self, to_block: Optional[int] = None) -> int:
+        """Index up to ``to_block`` (default: confirmed head); returns events added."""
+        if to_block is None:
+            head = await call_maybe_async(lambda: self.web3.eth.block_number)
+            to_block = head - self.confirmations
+        last = self.store.last_block(self.key)
+        start = self.start_block if last is None else last + 1
+        added = 0
+
+        while start <= to_block:
+            end = min(start + self.span - 1, to_block)
+            try:
+                logs = await call_maybe_async(
+                    self.web3.eth.get_logs,
+                    {
+                        "address": self.addresses,
+                        "fromBlock": start,
+                        "toBlock": end,
+                        "topics": [list(_EVENT_TOPICS)],
+                    },
+                )
+            except Exception as exc:
+                if not is_range_error(exc) or self.span <= MIN_LOG_RANGE:
+                    raise
+                self.span = max(self.span // 2, MIN_LOG_RANGE)
+                # Don't grow straight back towards a span the node has refused.
+                self._ceiling = self.span
+                self._successes = 0
+                print(f"eth_getLogs failed ({exc}); retrying with {self.span} blocks")
+                continue
+
+            events = [e for e in (decode_event(self.web3, log) for log in logs) if e]
+            self.store.insert(self.key, events, end)
+            added += len(events)
+            start = end + 1
+            self._successes += 1
+            if self._ceiling < self.max_range and self._successes >= CEILING_RECOVERY:
+                self._ceiling = min(self._ceiling * 2, self.max_range)
+                self._successes = 0
+            if len(logs) < TARGET_LOGS_PER_REQUEST:
+                self.span = min(self.span * 2, self._ceiling)
+        return added
+
+    async def run(self, poll_interval: float = INDEX_POLL_INTERVAL) -> None:
+        while True:
+            try:
+                added = await self.sync()
+                if added:
+                    print(f"Indexed {added} Credora events")
+            except Exception as exc:
+                print(f"Event index sync failed: {exc}")
+            await asyncio.sleep(poll_interval)
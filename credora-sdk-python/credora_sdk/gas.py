@@ -0,0 +1,102 @@
+"""Learned gas limits so transaction building can skip ``eth_estimateGas``."""
+
+from __future__ import annotations
+
+import random
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+DEFAULT_GAS_MARGIN = 1.2
+DEFAULT_SAMPLE_RATE = 0.05  # share of sends that re-estimate anyway
+DEFAULT_GAS_WINDOW = 8
+# A reverted tx that burnt at least this share of its limit ran out of gas.
+OUT_OF_GAS_RATIO = 0.97
+
+GasKey = Tuple[str, str, Tuple[str, ...]]
+
+
+def _arg_shape(value: Any) -> str:
+    # Zero vs non-zero amounts and boolean flags take different code paths
+    # (storage writes, branches); other values don't move gas much.
+    if isinstance(value, bool):
+        return f"bool:{value}"
+    if isinstance(value, int):
+        return "int:0" if value == 0 else "int"
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def gas_key(fn: Any) -> GasKey:
+    """Cache key for a bound contract function: contract, name, argument shape."""
+    return (
+        str(fn.address).lower(),
+        fn.fn_name,
+        tuple(_arg_shape(arg) for arg in fn.args or ()),
+    )
+
+
+class GasLimitCache:
+    """Gas limits learned from the ``gasUsed`` of recent receipts.
+
+    :meth:`limit` returns the largest of the last ``window`` observations
+    times ``margin``, or ``None`` when the caller should estimate: nothing
+    is known yet, the entry was dropped after an out-of-gas revert, or
+    the send was picked for a ``sample_rate`` re-estimate.
+    """
+
+    def __init__(
+        self,
+        *,
+        margin: float = DEFAULT_GAS_MARGIN,
+        sample_rate: float = DEFAULT_SAMPLE_RATE,
+        window: int = DEFAULT_GAS_WINDOW,
+    ) -> None:
+        self.margin = margin
+        self.sample_rate = sample_rate
+        self.window = window
+        self.hits = 0
+        self.misses = 0
+        self._used: Dict[GasKey, Deque[int]] = {}
+        self._lock = threading.Lock()
+
+    def limit(self, key: GasKey) -> Optional[int]:
+        with self._lock:
+            used = self._used.get(key)
+            if not used or random.random() < self.sample_rate:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return int(max(used) * self.margin)
+
+    def observe(
+        self,
+        key: GasKey,
+        receipt: Any,
+        gas_limit: Optional[int] = None,
+        *,
+        early_exit: bool = False,
+    ) -> None:
+        """Learn from a mined receipt; forget the key if it ran out of gas.
+
+        Pass ``early_exit`` for a successful call that returned before its
+        normal path (e.g. a rejected ``requestLoan``): its ``gasUsed`` would
+        undersize the limit of the full call, so it is not learned.
+        """
+        gas_used = receipt.get("gasUsed")
+        if gas_used is None:
+            return
+        with self._lock:
+            if receipt.get("status") == 0:
+                if gas_limit and gas_used >= gas_limit * OUT_OF_GAS_RATIO:
+                    self._used.pop(key, None)
+                # Other reverts stop early and say nothing about the limit.
+                return
+            if early_exit:
+                return
+            self._used.setdefault(key, deque(maxlen=self.window)).append(gas_used)
+
+    def invalidate(self, key: GasKey) -> None:
+        with self._lock:
+            self._used.pop(key, None)
@@ -0,0 +1,122 @@
+"""Single-flight loans: concurrent shortfalls for one borrower share a loan."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from web3.types import TxReceipt
+
+DEFAULT_COALESCE_WINDOW = 0.25  # seconds
+
+
+@dataclass
+class _Batch:
+    borrower: str
+    amount_wei: int = 0
+    requests: int = 0
+    future: Any = None
+
+
+class LoanCoalescer:
+    """Group loan requests per borrower and take one loan for the sum.
+
+    The first request for a borrower opens a batch and, after ``window``
+    seconds, takes a single loan for every amount added to the batch in
+    the meantime. All callers get the same receipt (or the same
+    exception, e.g. :class:`~credora_sdk.credit.LoanRejected`). Requests
+    arriving once the loan is in flight start a new batch.
+    """
+
+    def __init__(
+        self,
+        take_loan: Callable[[str, int], TxReceipt],
+        window: float = DEFAULT_COALESCE_WINDOW,
+    ) -> None:
+        self.take_loan = take_loan
+        self.window = window
+        self.loans_taken = 0
+        self.requests_coalesced = 0
+        self._batches: Dict[str, _Batch] = {}
+        self._lock = threading.Lock()
+
+    def request(self, borrower: str, amount_wei: int) -> TxReceipt:
+        key = borrower.lower()
+        with self._lock:
+            batch = self._batches.get(key)
+            leader = batch is None
+            if leader:
+                batch = _Batch(borrower=borrower, future=Future())
+                self._batches[key] = batch
+            else:
+                self.requests_coalesced += 1
+            batch.amount_wei += amount_wei
+            batch.requests += 1
+
+        if leader:
+            time.sleep(self.window)
+            with self._lock:
+                self._batches.pop(key, None)
+            self._take(batch)
+        return batch.future.result()
+
+    def _take(self, batch: _Batch) -> None:
+        if batch.requests > 1:
+            print(f"Coalesced {batch.requests} loan requests into one of {batch.amount_wei} wei")
+        try:
+            receipt = self.take_loan(batch.borrower, batch.amount_wei)
+        except BaseException as exc:
+            batch.future.set_exception(exc)
+        else:
+            self.loans_taken += 1
+            batch.future.set_result(receipt)
+
+
+class AsyncLoanCoalescer:
+    """:class:`LoanCoalescer` for async clients; callers await the shared loan."""
+
+    def __init__(
+        self,
+        take_loan: Callable[[str, int], Awaitable[TxReceipt]],
+        window: float = DEFAULT_COALESCE_WINDOW,
+    ) -> None:
+        self.take_loan = take_loan
+        self.window = window
+        self.loans_taken = 0
+        self.requests_coalesced = 0
+        self._batches: Dict[str, _Batch] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def request(self, borrower: str, amount_wei: int) -> TxReceipt:
+        key = borrower.lower()
+        batch: Optional[_Batch] = self._batches.get(key)
+        if batch is None:
+            batch = _Batch(borrower=borrower, future=asyncio.get_running_loop().create_future())
+            self._batches[key] = batch
+            task = asyncio.create_task(self._flush(key, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            self.requests_coalesced += 1
+        batch.amount_wei += amount_wei
+        batch.requests += 1
+        # Shielded so one cancelled caller doesn't cancel the others' loan.
+        return await asyncio.shield(batch.future)
+
+    async def _flush(self, key: str, batch: _Batch) -> None:
+        await asyncio.sleep(self.window)
+        if self._batches.get(key) is batch:
+            del self._batches[key]
+        if batch.requests > 1:
+            print(f"Coalesced {batch.requests} loan requests into one of {batch.amount_wei} wei")
+        try:
+            receipt = await self.take_loan(batch.borrower, batch.amount_wei)
+        except Exception as exc:
+            batch.future.set_exception(exc)
+        else:
+            self.loans_taken += 1
+            batch.future.set_result(receipt)
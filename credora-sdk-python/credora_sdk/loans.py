@@ -2,12 +2,31 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, Iterable, Optional, Sequence
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 from eth_account.signers.local import LocalAccount
+from hexbytes import HexBytes
 from web3 import Web3
 from web3.types import TxReceipt
 
+from .allowance import EXACT, MAX_UINT256, AllowanceCache
+from .chain_metadata import ChainMetadataCache, FeeOracle, metadata_key
+from .credit import (
+    LENDING_POOL_ABI,
+    CreditCache,
+    LoanRejected,
+    RepayReverted,
+    evaluate_loan,
+    loan_rejection,
+)
+from .gas import GasKey, GasLimitCache, gas_key
+from .multicall import MULTICALL3_ADDRESS, Multicall
+from .nonces import NonceManager, is_nonce_error
+from .read_cache import MISSING, BlockReadCache, read_key
+from .receipts import ReceiptTracker, tx_key
+
 try:  # web3<7 exposed Contract* at web3.contract, web3>=7 moved them under web3.contract.contract
     from web3.contract import Contract, ContractFunction
 except ImportError:  # pragma: no cover - defensive fallback for newer web3 builds
@@ -15,6 +34,10 @@ except ImportError:  # pragma: no cover - defensive fallback for newer web3 buil
 import json
 import os
 
+# repayLoan can't be gas-estimated while the approve ahead of it is still
+# pending (transferFrom would revert), so pipelined repays use a fixed limit.
+PIPELINED_REPAY_GAS = 300_000
+
 def _load_usdc_abi() -> list:
     """Load the USDC ABI from the abi directory."""
     abi_path = os.path.join(os.path.dirname(__file__), "abi", "USDC.json")
@@ -22,6 +45,55 @@ def _load_usdc_abi() -> list:
         return json.load(f)
 
 
+@dataclass
+class LoanState:
+    """Borrower's loan + wallet state, all read at ``block_number``."""
+
+    borrower: str
+    borrowed: int
+    repaid: int
+    credit_score: int
+    balance: int
+    allowance: int
+    block_number: int
+
+    @property
+    def outstanding(self) -> int:
+        return self.borrowed - self.repaid
+
+
+def loan_state_calls(contract: Contract, stablecoin: Contract, borrower: str) -> List[ContractFunction]:
+    """The five view calls behind one :class:`LoanState`, in field order."""
+    return [
+        contract.functions.s_totalBorrowed(borrower),
+        contract.functions.s_totalRepaid(borrower),
+        contract.functions.getCreditScore(borrower),
+        stablecoin.functions.balanceOf(borrower),
+        stablecoin.functions.allowance(borrower, contract.address),
+    ]
+
+
+def build_loan_states(
+    borrowers: Sequence[str], values: Sequence[Any], block_number: int
+) -> Dict[str, LoanState]:
+    fields = len(values) // max(len(borrowers), 1)
+    states: Dict[str, LoanState] = {}
+    for i, borrower in enumerate(borrowers):
+        borrowed, repaid, score, balance, allowance = (
+            v or 0 for v in values[i * fields:(i + 1) * fields]
+        )
+        states[borrower] = LoanState(
+            borrower=borrower,
+            borrowed=borrowed,
+            repaid=repaid,
+            credit_score=score,
+            balance=balance,
+            allowance=allowance,
+            block_number=block_number,
+        )
+    return states
+
+
 class LoanClient:
     """Send transactions to the Credora Loan contract."""
 
@@ -32,6 +104,16 @@ class LoanClient:
         contract_address: str,
         abi: Sequence[Dict[str, Any]],
         tx_defaults: Optional[Dict[str, Any]] = None,
+        *,
+        metadata_cache: Optional[ChainMetadataCache] = None,
+        fee_oracle: Optional[FeeOracle] = None,
+        multicall_address: Optional[str] = MULTICALL3_ADDRESS,
+        allowance_policy: str = EXACT,
+        standing_allowance: int = MAX_UINT256,
+        receipt_tracker: Optional[ReceiptTracker] = None,
+        gas_limits: Optional[GasLimitCache] = None,
+        credit_cache: Optional[CreditCache] = None,
+        read_cache: Optional[BlockReadCache] = None,
     ) -> None:
         self.web3 = web3
         self.account = account
@@ -40,73 +122,353 @@ class LoanClient:
             abi=abi,
         )
         self.tx_defaults = tx_defaults or {}
+        self.metadata = metadata_cache or ChainMetadataCache()
+        self._metadata_key = metadata_key(
+            getattr(web3.provider, "endpoint_uri", None), self.contract.address
+        )
+        self.fee_oracle = fee_oracle or FeeOracle(web3)
+
+        stablecoin_address = self.metadata.get(self._metadata_key, "stablecoin")
+        if stablecoin_address is None:
+            stablecoin_address = self.contract.functions.stablecoin().call()
+            self.metadata.put(self._metadata_key, "stablecoin", stablecoin_address)
         self.stablecoin:Contract = web3.eth.contract(
-            address=self.contract.functions.stablecoin().call(),
+            address=stablecoin_address,
             abi=_load_usdc_abi(),
         )
+        self.nonces = NonceManager(
+            lambda: self.web3.eth.get_transaction_count(self.account.address, "pending")
+        )
+        self.allowance = AllowanceCache(allowance_policy, standing_allowance)
+        self.multicall = Multicall(web3, multicall_address) if multicall_address else None
+        # Shareable between clients on the same chain: one poller for all
+        # in-flight transactions.
+        self.receipts = receipt_tracker or ReceiptTracker(web3)
+        self.gas_limits = gas_limits or GasLimitCache()
+        # tx hash -> (gas key, gas limit) until its receipt is learned from
+        self._inflight_gas: Dict[str, Tuple[GasKey, int]] = {}
+        self.credit = credit_cache or CreditCache()
+        self.reads = read_cache or BlockReadCache()
+        self._lending_pool: Optional[Contract] = None
+
+    @property
+    def chain_id(self) -> int:
+        chain_id = self.metadata.get(self._metadata_key, "chainId")
+        if chain_id is None:
+            chain_id = self.web3.eth.chain_id
+            self.metadata.put(self._metadata_key, "chainId", chain_id)
+        return chain_id
         
-    def take_loan(self, borrower: str, amount_wei: int) -> TxReceipt:
-        """Call requestLoan on the contract."""
+    @property
+    def lending_pool(self) -> Contract:
+        if self._lending_pool is None:
+            address = self.metadata.get(self._metadata_key, "lendingPool")
+            if address is None:
+                address = self.contract.functions.lendingPool().call()
+                self.metadata.put(self._metadata_key, "lendingPool", address)
+            self._lending_pool = self.web3.eth.contract(address=address, abi=LENDING_POOL_ABI)
+        return self._lending_pool
+
+    def take_loan(self, borrower: str, amount_wei: int, *, precheck: bool = True) -> TxReceipt:
+        """Call requestLoan on the contract.
+
+        Raises :class:`~credora_sdk.credit.LoanRejected` when the pre-check
+        says the CreditManager won't fund the loan (nothing is sent), or
+        when the mined receipt carries ``LoanRejected``.
+        """
+        if precheck:
+            reason = self.precheck_loan(borrower, amount_wei)
+            if reason is not None:
+                self.credit.rejected_early += 1
+                raise LoanRejected(borrower, amount_wei, reason)
+
         fn = self.contract.functions.requestLoan(borrower,amount_wei)
         print(f"Built function call: {fn}")
-        return self._send_transaction(fn)
+        receipt = self._send_transaction(fn)
+        self.credit.invalidate(borrower)
+
+        reason = loan_rejection(self.web3, receipt, self.contract.address)
+        if reason is not None:
+            raise LoanRejected(borrower, amount_wei, reason, receipt)
+        return receipt
+
+    def precheck_loan(self, borrower: str, amount_wei: int) -> Optional[str]:
+        """Mirror ``evaluateLoan`` off-chain from cached score and liquidity.
+
+        Returns the rejection reason, or ``None`` if the loan should be
+        funded. Anything not cached is read in one batched call.
+        """
+        borrower = Web3.to_checksum_address(borrower)
+        score = self.credit.score(borrower)
+        liquidity = self.credit.liquidity()
+        fns = []
+        if score is None:
+            fns.append(self.contract.functions.getCreditScore(borrower))
+        if liquidity is None:
+            fns.append(self.lending_pool.functions.s_totalLiquidity())
+        if fns:
+            if self.multicall is not None:
+                _, values = self.multicall.call(fns)
+            else:
+                values = [fn.call() for fn in fns]
+            if score is None:
+                score = values.pop(0) or 0
+                self.credit.put_score(borrower, score)
+            if liquidity is None:
+                liquidity = values.pop(0) or 0
+                self.credit.put_liquidity(liquidity)
+        return evaluate_loan(score, liquidity, amount_wei)
+
+    def allow_repay(self, amount_wei: int) -> TxReceipt:
+        fn = self.stablecoin.functions.approve(self.contract.address, amount_wei)
+        receipt = self._send_transaction(fn)
+        self.allowance.on_approved(amount_wei)
+        return receipt
+
+    def get_allowance(self, refresh: bool = False) -> int:
+        """Allowance granted to the CreditManager, served from cache when known."""
+        if refresh or not self.allowance.known:
+            value = self.stablecoin.functions.allowance(
+                self.account.address, self.contract.address
+            ).call()
+            self.allowance.update(value)
+        return self.allowance.value
 
-    def allow_repay(self,amount_wei:int) -> TxReceipt:
-        fn = self.stablecoin.functions.approve(
-            self.contract.address,
-            amount_wei
-        )
-        return self._send_transaction(fn)
-    
     def repay(self, amount_wei: int, borrower: str, on_time: bool = True) -> TxReceipt:
-        fn = self.contract.functions.repayLoan(borrower,amount_wei,on_time)
-        return self._send_transaction(fn)
+        """Repay ``amount_wei``, approving first only if the allowance falls short."""
+        _, receipt = self.approve_and_repay(amount_wei, borrower, on_time)
+        return receipt
+
+    def approve_and_repay(
+        self,
+        amount_wei: int,
+        borrower: str,
+        on_time: bool = True,
+        *,
+        approve_amount_wei: Optional[int] = None,
+        repay_gas: Optional[int] = None,
+    ) -> Tuple[Optional[TxReceipt], TxReceipt]:
+        """Repay, broadcasting approve + repayLoan back-to-back when needed.
+
+        If the cached allowance already covers ``amount_wei`` no approve is
+        sent and the first element of the result is ``None``. Otherwise
+        both transactions are confirmed together instead of in series;
+        the approved amount follows the allowance policy. A repayLoan
+        sent before its approve is mined can't be estimated, so it uses
+        ``repay_gas``, the learned limit, or :data:`PIPELINED_REPAY_GAS`.
+
+        Raises :class:`~credora_sdk.credit.RepayReverted` when the
+        repayLoan is mined but reverted.
+        """
+        repay = self.contract.functions.repayLoan(borrower, amount_wei, on_time)
+        try:
+            if self.get_allowance() >= amount_wei:
+                self.allowance.approvals_skipped += 1
+                receipt = self._send_transaction(repay)
+                self._account_repay(receipt, amount_wei, borrower)
+                return None, receipt
+
+            approve_amount = self.allowance.approval_amount(
+                max(amount_wei, approve_amount_wei or 0)
+            )
+            approve = self.stablecoin.functions.approve(self.contract.address, approve_amount)
+            approve_hash = self.broadcast(approve)
+            repay_hash = self.broadcast(
+                repay,
+                gas=repay_gas or self.gas_limits.limit(gas_key(repay)) or PIPELINED_REPAY_GAS,
+            )
+            approve_receipt = self.wait_for_receipt(approve_hash)
+            repay_receipt = self.wait_for_receipt(repay_hash)
+        except Exception:
+            self.allowance.invalidate()
+            raise
+
+        self.allowance.on_approved(approve_amount)
+        self._account_repay(repay_receipt, amount_wei, borrower)
+        return approve_receipt, repay_receipt
+
+    def _account_repay(self, receipt: TxReceipt, amount_wei: int, borrower: str) -> None:
+        self.credit.invalidate(borrower)
+        if receipt.get("status") == 0:
+            # Reverted: we can't tell what the allowance is any more.
+            self.allowance.invalidate()
+            raise RepayReverted(borrower, amount_wei, receipt)
+        self.allowance.on_spent(amount_wei)
+
+    def send_batch(
+        self, fns: Iterable[ContractFunction], gas: Optional[int] = None
+    ) -> List[TxReceipt]:
+        """Sign and broadcast ``fns`` in order, then collect all receipts."""
+        tx_hashes = [self.broadcast(fn, gas=gas) for fn in fns]
+        return [self.wait_for_receipt(tx_hash) for tx_hash in tx_hashes]
+
+    def broadcast(self, fn: ContractFunction, gas: Optional[int] = None) -> HexBytes:
+        """Sign and send ``fn`` with a locally allocated nonce; don't wait.
+
+        Without an explicit ``gas`` the learned limit is used when there is
+        one, so ``build_transaction`` skips ``eth_estimateGas``.
+        """
+        tx_params = self._build_tx_params()
+        key = gas_key(fn)
+        if gas is None and "gas" not in tx_params:
+            gas = self.gas_limits.limit(key)
+        if gas is not None:
+            tx_params["gas"] = gas
+        try:
+            tx = fn.build_transaction(tx_params)
+            signed = self.account.sign_transaction(tx)
+            tx_hash = self.web3.eth.send_raw_transaction(signed.raw_transaction)
+            self._inflight_gas[tx_key(tx_hash)] = (key, tx["gas"])
+            return tx_hash
+        except Exception as exc:
+            # The allocated nonce was never used (or was wrong): re-read it
+            # from the node so later transactions don't leave a gap.
+            self.nonces.resync()
+            if is_nonce_error(exc):
+                print(f"Nonce rejected ({exc}); resynced with node")
+            raise
+
+    def submit(self, fn: ContractFunction, gas: Optional[int] = None) -> "Future[TxReceipt]":
+        """Broadcast ``fn`` and return a future for its receipt.
+
+        The future is resolved by the shared receipt tracker, so any
+        number of callers can wait on it without polling the node.
+        """
+        tx_hash = self.broadcast(fn, gas=gas)
+        future = self.receipts.track(tx_hash)
+
+        def learn(done: "Future[TxReceipt]") -> None:
+            if not done.cancelled() and done.exception() is None:
+                self._on_mined(tx_hash, done.result())
+
+        future.add_done_callback(learn)
+        return future
+
+    def wait_for_receipt(self, tx_hash: HexBytes) -> TxReceipt:
+        receipt = self.receipts.wait(tx_hash)
+
+        if receipt is None:
+            raise Exception("Timeout waiting for transaction to be mined")
+
+        if receipt.get("blockNumber") is None:
+            raise Exception("Transaction still pending after timeout")
+
+        self._on_mined(tx_hash, receipt)
+
+        print(f"Transaction mined in block {receipt}")
+        return receipt
 
     def get_loan(self, borrower: str) -> Any:
-        return self.contract.functions.getLoan(
-            Web3.to_checksum_address(borrower)
-        ).call()
+        return self.cached_call(
+            self.contract.functions.getLoan(Web3.to_checksum_address(borrower))
+        )
 
     def get_outstanding(self, borrower: str) -> int:
-        borrowed =  self.contract.functions.s_totalBorrowed(
+        borrowed =  self.cached_call(self.contract.functions.s_totalBorrowed(
             Web3.to_checksum_address(borrower)
-        ).call()
+        ))
         
-        repaid = self.contract.functions.s_totalRepaid(
+        repaid = self.cached_call(self.contract.functions.s_totalRepaid(
             Web3.to_checksum_address(borrower)
-        ).call()
+        ))
         
         
         return borrowed - repaid
+
+    def get_balance(self, account: Optional[str] = None) -> int:
+        """Stablecoin balance of ``account`` (default: our own)."""
+        account = Web3.to_checksum_address(account or self.account.address)
+        return self.cached_call(self.stablecoin.functions.balanceOf(account))
+
+    def get_credit_score(self, borrower: str) -> int:
+        return self.cached_call(
+            self.contract.functions.getCreditScore(Web3.to_checksum_address(borrower))
+        )
+
+    def cached_call(self, fn: ContractFunction) -> Any:
+        """``fn.call()`` pinned to the current head, served from :attr:`reads`.
+
+        Repeated reads within one block cost a single RPC call; the head
+        is re-read at most every ``reads.head_ttl`` seconds.
+        """
+        if self.reads.head_stale():
+            self.reads.set_head(self.web3.eth.block_number)
+        block = self.reads.block
+        key = read_key(fn)
+        value = self.reads.get(key)
+        if value is MISSING:
+            value = fn.call(block_identifier=block)
+            self.reads.put(key, value, block)
+        return value
+
+    def get_loan_state(self, borrower: str) -> LoanState:
+        return self.get_loan_states([borrower])[Web3.to_checksum_address(borrower)]
+
+    def get_loan_states(
+        self, borrowers: Iterable[str], block_identifier: Optional[Any] = None
+    ) -> Dict[str, LoanState]:
+        """Borrowed, repaid, credit score, balance and allowance for every
+        borrower in one Multicall3 round-trip, pinned to a single block.
+
+        Without Multicall3 the same calls are made one by one against an
+        explicitly pinned block number.
+        """
+        borrowers = [Web3.to_checksum_address(b) for b in borrowers]
+        fns = [
+            fn
+            for borrower in borrowers
+            for fn in loan_state_calls(self.contract, self.stablecoin, borrower)
+        ]
+        if self.multicall is not None:
+            block_number, values = self.multicall.call(fns, block_identifier)
+        else:
+            block_number = (
+                block_identifier
+                if isinstance(block_identifier, int)
+                else self.web3.eth.block_number
+            )
+            values = [fn.call(block_identifier=block_number) for fn in fns]
+        states = build_loan_states(borrowers, values, block_number)
+        for state in states.values():
+            self.credit.put_score(state.borrower, state.credit_score)
+        own = states.get(self.account.address)
+        if own is not None:
+            self.allowance.update(own.allowance)
+        return states
+
     # internal helpers -----------------------------------------------------
 
     def _send_transaction(self, fn: ContractFunction) -> TxReceipt:
-        tx_params = self._build_tx_params()
-        tx = fn.build_transaction(tx_params)
-        signed = self.account.sign_transaction(tx)
-        tx_hash = self.web3.eth.send_raw_transaction(signed.raw_transaction)
-        receipt = self.web3.eth.wait_for_transaction_receipt(tx_hash)
+        tx_hash = self.broadcast(fn)
+        receipt = self.wait_for_receipt(tx_hash)
         
-        stablecoin_balance = self.stablecoin.functions.balanceOf(self.account.address).call()
+        stablecoin_balance = self.get_balance()
         print(f"Stablecoin balance after tx: {stablecoin_balance}")
-        if receipt is None:
-            raise Exception("Timeout waiting for transaction to be mined")
-
-        if receipt.get("blockNumber") is None:
-            raise Exception("Transaction still pending after timeout")
-        
-        print(f"Transaction mined in block {receipt}")
         return receipt
 
+    def _on_mined(self, tx_hash: Any, receipt: TxReceipt) -> None:
+        # Our own tx changed balances, debt or score: drop cached reads.
+        self.reads.set_head(receipt["blockNumber"])
+        self.reads.invalidate()
+        inflight = self._inflight_gas.pop(tx_key(tx_hash), None)
+        if inflight is not None:
+            key, gas_limit = inflight
+            # A rejected requestLoan succeeds without funding anything.
+            rejected = (
+                receipt.get("status") != 0
+                and loan_rejection(self.web3, receipt, self.contract.address) is not None
+            )
+            self.gas_limits.observe(key, receipt, gas_limit, early_exit=rejected)
+
     def _build_tx_params(self) -> Dict[str, Any]:
         params: Dict[str, Any] = {
             "from": self.account.address,
-            "nonce": self.web3.eth.get_transaction_count(self.account.address,"pending"),
-            "chainId": self.web3.eth.chain_id,
+            "nonce": self.nonces.allocate(),
+            "chainId": self.chain_id,
         }
 
         if "maxFeePerGas" not in self.tx_defaults and "gasPrice" not in self.tx_defaults:
-            params["gasPrice"] = self.web3.eth.gas_price
+            params.update(self.fee_oracle.fees())
 
         params.update(self.tx_defaults)
         return params
@@ -0,0 +1,112 @@
+"""Batch contract reads into a single ``eth_call`` through Multicall3."""
+
+from __future__ import annotations
+
+from typing import Any, List, Optional, Sequence, Tuple
+
+from eth_utils.abi import collapse_if_tuple
+from web3 import Web3
+
+# Multicall3 is deployed at the same address on Base, Base Sepolia and most
+# other EVM chains: https://www.multicall3.com/deployments
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+MULTICALL3_ABI = [
+    {
+        "inputs": [
+            {
+                "components": [
+                    {"internalType": "address", "name": "target", "type": "address"},
+                    {"internalType": "bool", "name": "allowFailure", "type": "bool"},
+                    {"internalType": "bytes", "name": "callData", "type": "bytes"},
+                ],
+                "internalType": "struct Multicall3.Call3[]",
+                "name": "calls",
+                "type": "tuple[]",
+            }
+        ],
+        "name": "aggregate3",
+        "outputs": [
+            {
+                "components": [
+                    {"internalType": "bool", "name": "success", "type": "bool"},
+                    {"internalType": "bytes", "name": "returnData", "type": "bytes"},
+                ],
+                "internalType": "struct Multicall3.Result[]",
+                "name": "returnData",
+                "type": "tuple[]",
+            }
+        ],
+        "stateMutability": "payable",
+        "type": "function",
+    },
+    {
+        "inputs": [],
+        "name": "getBlockNumber",
+        "outputs": [{"internalType": "uint256", "name": "blockNumber", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function",
+    },
+]
+
+
+def encode_calls(fns: Sequence[Any], allow_failure: bool = True) -> List[Tuple[str, bool, bytes]]:
+    """Turn bound contract functions into ``aggregate3`` call structs."""
+    return [
+        (fn.address, allow_failure, Web3.to_bytes(hexstr=fn._encode_transaction_data()))
+        for fn in fns
+    ]
+
+
+def decode_results(
+    web3: Any, fns: Sequence[Any], results: Sequence[Tuple[bool, bytes]]
+) -> List[Any]:
+    """Decode ``aggregate3`` results; failed calls decode to ``None``."""
+    decoded: List[Any] = []
+    for fn, (success, data) in zip(fns, results):
+        if not success:
+            decoded.append(None)
+            continue
+        output_types = [collapse_if_tuple(output) for output in fn.abi["outputs"]]
+        values = web3.codec.decode(output_types, data)
+        decoded.append(values[0] if len(values) == 1 else values)
+    return decoded
+
+
+class Multicall:
+    """Run many view calls in one round-trip, all against the same block."""
+
+    def __init__(self, web3: Web3, address: str = MULTICALL3_ADDRESS) -> None:
+        self.web3 = web3
+        self.contract = web3.eth.contract(
+            address=Web3.to_checksum_address(address), abi=MULTICALL3_ABI
+        )
+
+    def call(
+        self, fns: Sequence[Any], block_identifier: Optional[Any] = None
+    ) -> Tuple[int, List[Any]]:
+        """Return ``(block_number, results)`` for ``fns``.
+
+        The block number is read inside the same aggregate, so it is the
+        block every result was computed against.
+        """
+        calls = [self.contract.functions.getBlockNumber()] + list(fns)
+        results = self.contract.functions.aggregate3(encode_calls(calls)).call(
+            block_identifier=block_identifier or "latest"
+        )
+        decoded = decode_results(self.web3, calls, results)
+        return decoded[0], decoded[1:]
+
+
+class AsyncMulticall(Multicall):
+    """:class:`Multicall` for ``AsyncWeb3``."""
+
+    async def call(  # type: ignore[override]
+        self, fns: Sequence[Any], block_identifier: Optional[Any] = None
+    ) -> Tuple[int, List[Any]]:
+        calls = [self.contract.functions.getBlockNumber()] + list(fns)
+        results = await self.contract.functions.aggregate3(encode_calls(calls)).call(
+            block_identifier=block_identifier or "latest"
+        )
+        decoded = decode_results(self.web3, calls, results)
+        return decoded[0], decoded[1:]
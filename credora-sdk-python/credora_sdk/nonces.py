@@ -0,0 +1,69 @@
+"""In-process nonce allocation so transactions can be pipelined."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Awaitable, Callable, Optional
+
+_NONCE_ERROR_MARKERS = (
+    "nonce too low",
+    "nonce too high",
+    "invalid nonce",
+    "already known",
+    "replacement transaction underpriced",
+    "known transaction",
+)
+
+
+def is_nonce_error(exc: BaseException) -> bool:
+    """True if a node rejected a transaction because of its nonce."""
+    message = str(exc).lower()
+    return any(marker in message for marker in _NONCE_ERROR_MARKERS)
+
+
+class NonceManager:
+    """Hands out consecutive nonces for one account.
+
+    The pending transaction count is fetched once; after that nonces are
+    allocated locally, so several transactions can be signed and broadcast
+    back-to-back. Call :meth:`resync` when the node rejects a nonce.
+    """
+
+    def __init__(self, fetch_pending_count: Callable[[], int]) -> None:
+        self._fetch = fetch_pending_count
+        self._next: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def allocate(self) -> int:
+        with self._lock:
+            if self._next is None:
+                self._next = self._fetch()
+            nonce = self._next
+            self._next += 1
+            return nonce
+
+    def resync(self) -> None:
+        """Forget the local counter; the next allocation re-reads the node."""
+        with self._lock:
+            self._next = None
+
+
+class AsyncNonceManager:
+    """:class:`NonceManager` for ``AsyncWeb3`` clients."""
+
+    def __init__(self, fetch_pending_count: Callable[[], Awaitable[int]]) -> None:
+        self._fetch = fetch_pending_count
+        self._next: Optional[int] = None
+        self._lock = asyncio.Lock()
+
+    async def allocate(self) -> int:
+        async with self._lock:
+            if self._next is None:
+                self._next = await self._fetch()
+            nonce = self._next
+            self._next += 1
+            return nonce
+
+    def resync(self) -> None:
+        self._next = None
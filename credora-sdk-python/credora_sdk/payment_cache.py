@@ -0,0 +1,237 @@
+"""Per-resource cache of x402 payment requirements for up-front payments."""
+
+from __future__ import annotations
+
+import base64
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .payments import PaymentHandler
+
+DEFAULT_REQUIREMENTS_TTL = 300.0  # seconds to trust a resource's last 402 terms
+
+PAYMENT_HEADER = "X-PAYMENT"
+_SENT_AT = "credora_payment_sent_at"  # request extension: (header, monotonic time)
+
+
+@dataclass
+class _Entry:
+    x402_version: int
+    accepts: List[Dict[str, Any]]
+    terms: Tuple[Tuple[Any, ...], ...]
+    learned_at: float
+
+
+@dataclass
+class SettledPayment:
+    """One payment the server accepted, as read back from its ``X-PAYMENT`` header."""
+
+    resource: str
+    network: Optional[str]
+    pay_to: Optional[str]
+    amount: int
+    # Request-to-response time, for payments sent with the first request.
+    seconds: Optional[float] = None
+
+
+def requirements_key(method: str, url: Any) -> str:
+    return f"{method.upper()} {url}"
+
+
+def decode_payment_header(value: str) -> Optional[Dict[str, Any]]:
+    """The JSON payload of an ``X-PAYMENT`` header, or ``None`` if unreadable."""
+    try:
+        payload = json.loads(base64.b64decode(value))
+    except (TypeError, ValueError):
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+class PaymentRequirementsCache:
+    """The ``accepts`` list from each resource's most recent 402.
+
+    Entries expire after ``ttl`` seconds. A 402 whose terms (price,
+    ``payTo``, asset, network, scheme) differ from the cached ones
+    replaces the entry and counts as an invalidation.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_REQUIREMENTS_TTL) -> None:
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.payments = PaymentHandler()
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[int, List[Dict[str, Any]]]]:
+        """``(x402Version, accepts)`` for ``key``, or ``None`` if unknown or stale."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry.learned_at > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry.x402_version, entry.accepts
+
+    def learn(self, key: str, payload: Dict[str, Any]) -> None:
+        """Store the requirements from a 402 body, replacing them on mismatch."""
+        accepts = self.payments.get_accepts(payload)
+        with self._lock:
+            previous = self._entries.get(key)
+            if not accepts:
+                if previous is not None:
+                    del self._entries[key]
+                    self.invalidations += 1
+                return
+            terms = tuple(self.payments.get_terms(accept) for accept in accepts)
+            if previous is not None and previous.terms != terms:
+                self.invalidations += 1
+            self._entries[key] = _Entry(
+                x402_version=int(payload.get("x402Version", 1)),
+                accepts=accepts,
+                terms=terms,
+                learned_at=time.monotonic(),
+            )
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+class PrepaidPaymentHooks:
+    """httpx event hooks that pay on the first request instead of after a 402.
+
+    ``on_request`` signs an ``X-PAYMENT`` header from the cached
+    requirements, so a known resource is paid in one round-trip.
+    ``on_response`` learns the requirements from every 402; register it
+    ahead of the x402 client's own hook, which still pays and retries
+    whenever the server rejects or changes its terms.
+
+    ``select`` picks one requirement from an ``accepts`` list (typically
+    the agent's payment selector) and ``sign`` turns it into a header
+    value, like ``x402Client.create_payment_header``. Requests for which
+    ``should_prepay`` returns false (e.g. response-cache hits) are sent
+    unsigned.
+    """
+
+    def __init__(
+        self,
+        cache: PaymentRequirementsCache,
+        select: Callable[[List[Dict[str, Any]]], Any],
+        sign: Callable[[Any, int], str],
+        should_prepay: Optional[Callable[[Any], bool]] = None,
+    ) -> None:
+        self.cache = cache
+        self.select = select
+        self.sign = sign
+        self.should_prepay = should_prepay
+        self.prepaid = 0
+        self.rejected = 0
+
+    async def on_request(self, request: Any) -> None:
+        if PAYMENT_HEADER in request.headers:
+            return
+        if self.should_prepay is not None and not self.should_prepay(request):
+            return
+        cached = self.cache.get(requirements_key(request.method, request.url))
+        if cached is None:
+            return
+        x402_version, accepts = cached
+        try:
+            request.headers[PAYMENT_HEADER] = self.sign(self.select(accepts), x402_version)
+        except Exception as exc:
+            # Leave the request unpaid; the 402 path still works.
+            print(f"Could not pre-sign x402 payment: {exc}")
+            return
+        self.prepaid += 1
+
+    async def on_response(self, response: Any) -> None:
+        if response.status_code != 402:
+            return
+        request = response.request
+        if PAYMENT_HEADER in request.headers:
+            self.rejected += 1
+        try:
+            payload = json.loads(await response.aread())
+        except ValueError:
+            return
+        if isinstance(payload, dict):
+            self.cache.learn(requirements_key(request.method, request.url), payload)
+
+    def event_hooks(self) -> Dict[str, List[Callable[[Any], Any]]]:
+        return {"request": [self.on_request], "response": [self.on_response]}
+
+
+class PaymentSettlementHooks:
+    """httpx event hooks that report every payment the server accepted.
+
+    A request is paid once it carries an ``X-PAYMENT`` header, whether
+    sent up front or added by the x402 hook's retry; a final status
+    under 400 means the facilitator settled it. Each settled payment is
+    passed once to every listener as a :class:`SettledPayment`. Register
+    both hooks *last*, so they see the header and the paid retry's result.
+    """
+
+    def __init__(self, listeners: Iterable[Callable[[SettledPayment], None]] = ()) -> None:
+        self.listeners = list(listeners)
+        self.settled = 0
+        self.failed = 0
+
+    async def on_request(self, request: Any) -> None:
+        header = request.headers.get(PAYMENT_HEADER)
+        if header is not None:
+            request.extensions[_SENT_AT] = (header, time.monotonic())
+
+    async def on_response(self, response: Any) -> None:
+        request = response.request
+        header = request.headers.get(PAYMENT_HEADER)
+        if header is None:
+            return
+        if response.status_code >= 400:
+            self.failed += 1
+            return
+        payment = self._settled_payment(request, header)
+        if payment is None:
+            return
+        self.settled += 1
+        for listener in self.listeners:
+            try:
+                listener(payment)
+            except Exception as exc:
+                print(f"Payment listener failed: {exc}")
+
+    def event_hooks(self) -> Dict[str, List[Callable[[Any], Any]]]:
+        return {"request": [self.on_request], "response": [self.on_response]}
+
+    @staticmethod
+    def _settled_payment(request: Any, header: str) -> Optional[SettledPayment]:
+        payload = decode_payment_header(header)
+        if payload is None:
+            return None
+        authorization = (payload.get("payload") or {}).get("authorization") or {}
+        try:
+            amount = int(authorization["value"])
+        except (KeyError, TypeError, ValueError):
+            return None
+        seconds = None
+        sent = request.extensions.get(_SENT_AT)
+        # Only when this exact header went out with the request, not a retry.
+        if sent is not None and sent[0] == header:
+            seconds = time.monotonic() - sent[1]
+        return SettledPayment(
+            resource=str(request.url),
+            network=payload.get("network"),
+            pay_to=authorization.get("to"),
+            amount=amount,
+            seconds=seconds,
+        )
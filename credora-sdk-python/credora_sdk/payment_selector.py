@@ -0,0 +1,210 @@
+"""x402 payment selection by what the wallet can afford right now."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+DEFAULT_BALANCE_TTL = 15.0  # seconds to trust a cached balance
+DEFAULT_SETTLEMENT_LATENCY = 10.0  # seconds, for networks we know nothing about
+LATENCY_ALPHA = 0.2  # weight of a new observation in the latency average
+CHOSEN_MEMORY = 256  # recent choices kept to match settled payments to an asset
+
+# Rough facilitator settlement times; refined by record_settlement().
+SETTLEMENT_LATENCY: Dict[str, float] = {
+    "base": 2.0,
+    "base-sepolia": 2.0,
+    "avalanche": 2.0,
+    "avalanche-fuji": 2.0,
+    "iotex": 5.0,
+}
+
+# Scoring tiers, best first.
+AFFORDABLE = 0
+UNKNOWN_BALANCE = 1
+NEEDS_LOAN = 2
+UNAFFORDABLE = 3
+
+BalanceKey = Tuple[str, str]
+
+
+def _field(requirement: Any, alias: str, attr: str) -> Any:
+    """A field of an x402 requirement model or of a raw ``accepts`` dict."""
+    if isinstance(requirement, dict):
+        return requirement.get(alias)
+    return getattr(requirement, attr, None)
+
+
+def balance_key(network: Optional[str], asset: Optional[str]) -> BalanceKey:
+    return (network or "", (asset or "").lower())
+
+
+class BalanceBook:
+    """Cached wallet balances per ``(network, asset)``.
+
+    Entries older than ``ttl`` read as unknown. :meth:`debit` lowers a
+    balance once a payment has settled, so the next selection sees the
+    spend before the balance is re-read.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_BALANCE_TTL) -> None:
+        self.ttl = ttl
+        self._balances: Dict[BalanceKey, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, network: Optional[str], asset: Optional[str]) -> Optional[int]:
+        with self._lock:
+            entry = self._balances.get(balance_key(network, asset))
+        if entry is None or time.monotonic() - entry[1] > self.ttl:
+            return None
+        return entry[0]
+
+    def update(self, network: Optional[str], asset: Optional[str], balance: int) -> None:
+        with self._lock:
+            self._balances[balance_key(network, asset)] = (balance, time.monotonic())
+
+    def debit(self, network: Optional[str], asset: Optional[str], amount: int) -> None:
+        key = balance_key(network, asset)
+        with self._lock:
+            entry = self._balances.get(key)
+            if entry is not None:
+                self._balances[key] = (max(entry[0] - amount, 0), entry[1])
+
+
+class PaymentSelector:
+    """An x402 ``payment_requirements_selector`` that scores every option.
+
+    Each ``accepts`` entry passing the network, scheme and ``max_value``
+    filters is ranked, in a single pass, by:
+
+    1. whether the cached balance covers it (unknown balances rank next,
+       then assets a Credora loan can top up, listed in ``loanable``);
+    2. the network's estimated settlement latency;
+    3. the amount, then the server's own order.
+
+    ``on_stale(network, asset)`` is called for options whose balance is
+    unknown or expired, so the caller can refresh :attr:`balances`
+    without the selector blocking on the chain. If no option passes the
+    filters, ``fallback`` (e.g. x402's default selector) decides.
+
+    Choosing an option spends nothing: register :meth:`on_payment` as a
+    payment listener of the x402 client, and each settled payment is
+    debited once and its settlement time folded into the estimates.
+    """
+
+    def __init__(
+        self,
+        balances: Optional[BalanceBook] = None,
+        *,
+        networks: Optional[Iterable[str]] = None,
+        scheme: Optional[str] = "exact",
+        loanable: Iterable[Tuple[str, str]] = (),
+        latency: Optional[Dict[str, float]] = None,
+        on_stale: Optional[Callable[[str, str], None]] = None,
+        fallback: Optional[Callable[..., Any]] = None,
+    ) -> None:
+        self.balances = balances or BalanceBook()
+        self.networks = set(networks) if networks is not None else None
+        self.scheme = scheme
+        self.loanable = {balance_key(network, asset) for network, asset in loanable}
+        self.latency = dict(SETTLEMENT_LATENCY if latency is None else latency)
+        self.on_stale = on_stale
+        self.fallback = fallback
+        self._lock = threading.Lock()
+        # (network, payTo, amount) -> asset of recent choices; a settled
+        # payment's header carries everything but the asset.
+        self._chosen: "OrderedDict[Tuple[str, str, int], Optional[str]]" = OrderedDict()
+
+    def __call__(
+        self,
+        accepts: Sequence[Any],
+        network_filter: Optional[str] = None,
+        scheme_filter: Optional[str] = None,
+        max_value: Optional[int] = None,
+    ) -> Any:
+        scheme_filter = scheme_filter or self.scheme
+        best: Any = None
+        best_score: Optional[Tuple[Any, ...]] = None
+        stale = set()
+        # Large lists repeat a handful of (network, asset) pairs; look each up once.
+        seen: Dict[BalanceKey, Tuple[Optional[int], float, bool]] = {}
+        for index, requirement in enumerate(accepts):
+            network = _field(requirement, "network", "network")
+            if network_filter and network != network_filter:
+                continue
+            if self.networks is not None and network not in self.networks:
+                continue
+            if scheme_filter and _field(requirement, "scheme", "scheme") != scheme_filter:
+                continue
+            raw_amount = _field(requirement, "maxAmountRequired", "max_amount_required")
+            amount = int(raw_amount) if raw_amount is not None else 0
+            if max_value is not None and amount > max_value:
+                continue
+
+            asset = _field(requirement, "asset", "asset")
+            key = balance_key(network, asset)
+            known = seen.get(key)
+            if known is None:
+                known = seen[key] = (
+                    self.balances.get(network, asset),
+                    self.estimated_latency(network),
+                    key in self.loanable,
+                )
+            balance, latency, loanable = known
+            if balance is None:
+                tier = UNKNOWN_BALANCE
+                stale.add((network, asset))
+            elif balance >= amount:
+                tier = AFFORDABLE
+            elif loanable:
+                tier = NEEDS_LOAN
+            else:
+                tier = UNAFFORDABLE
+            score = (tier, latency, amount, index)
+            if best_score is None or score < best_score:
+                best, best_score = requirement, score
+
+        if self.on_stale is not None:
+            for network, asset in stale:
+                self.on_stale(network, asset)
+
+        if best is None:
+            if self.fallback is None:
+                raise ValueError("No x402 payment requirement matches the selector's filters")
+            return self.fallback(accepts, network_filter, scheme_filter, max_value)
+
+        self._remember(best, best_score[2])
+        return best
+
+    def on_payment(self, payment: Any) -> None:
+        """Debit a :class:`~credora_sdk.payment_cache.SettledPayment` and learn its latency."""
+        key = (payment.network or "", (payment.pay_to or "").lower(), payment.amount)
+        with self._lock:
+            chosen = key in self._chosen
+            asset = self._chosen.get(key)
+        if chosen:
+            self.balances.debit(payment.network, asset, payment.amount)
+        if payment.network and payment.seconds is not None:
+            self.record_settlement(payment.network, payment.seconds)
+
+    def estimated_latency(self, network: Optional[str]) -> float:
+        return self.latency.get(network or "", DEFAULT_SETTLEMENT_LATENCY)
+
+    def record_settlement(self, network: str, seconds: float) -> None:
+        """Fold an observed settlement time into the network's estimate."""
+        with self._lock:
+            previous = self.latency.get(network)
+            self.latency[network] = (
+                seconds if previous is None else previous + LATENCY_ALPHA * (seconds - previous)
+            )
+
+    def _remember(self, requirement: Any, amount: int) -> None:
+        pay_to = _field(requirement, "payTo", "pay_to") or ""
+        key = (_field(requirement, "network", "network") or "", pay_to.lower(), amount)
+        with self._lock:
+            self._chosen[key] = _field(requirement, "asset", "asset")
+            self._chosen.move_to_end(key)
+            while len(self._chosen) > CHOSEN_MEMORY:
+                self._chosen.popitem(last=False)
@@ -5,7 +5,7 @@ from __future__ import annotations
 import base64
 import json
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 
 @dataclass
@@ -40,6 +40,20 @@ class PaymentHandler:
     def get_asset(self, accept) -> Optional[str]:
         return accept.get("asset") if accept else None
 
+    def get_accepts(self, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+        accepts = payload.get("accepts") if payload else None
+        return [accept for accept in accepts or [] if isinstance(accept, dict)]
+
+    def get_terms(self, accept) -> Tuple[Any, ...]:
+        """What a payment for ``accept`` commits to; a change means re-signing."""
+        return (
+            accept.get("scheme"),
+            accept.get("network"),
+            self.get_required_amount(accept),
+            self.get_pay_to(accept),
+            self.get_asset(accept),
+        )
+
     def get_details(self, accept) -> InsufficientFundsDetails:
         return InsufficientFundsDetails(
             required=self.get_required_amount(accept),
@@ -0,0 +1,211 @@
+"""Predictive pre-funding: borrow before paid calls run out of balance."""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from .credit import LoanRejected
+
+DEFAULT_PREFUND_HORIZON = 60.0  # seconds of projected spend to keep funded
+DEFAULT_SPEND_WINDOW = 300.0  # seconds of payments used to estimate the rate
+MIN_RATE_SPAN = 10.0  # don't extrapolate a rate from less history than this
+REJECTION_COOLDOWN = 60.0  # seconds to wait after CreditManager says no
+
+
+class SpendTracker:
+    """Recent payment amounts per endpoint and the overall spend rate."""
+
+    def __init__(self, window: float = DEFAULT_SPEND_WINDOW) -> None:
+        self.window = window
+        self.last_amount: Dict[str, int] = {}
+        self._events: Deque[Tuple[float, int]] = deque()
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: Optional[str], amount_wei: int, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._events.append((now, amount_wei))
+            self.last_amount[endpoint or ""] = amount_wei
+
+    def rate(self, now: Optional[float] = None) -> float:
+        """Spend in wei per second over the recent window."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            while self._events and now - self._events[0][0] > self.window:
+                self._events.popleft()
+            if not self._events:
+                return 0.0
+            spent = sum(amount for _, amount in self._events)
+            span = max(now - self._events[0][0], MIN_RATE_SPAN)
+        return spent / span
+
+
+def prefund_amount(
+    balance_wei: int,
+    rate: float,
+    horizon_seconds: float,
+    min_loan_wei: int = 0,
+    max_loan_wei: Optional[int] = None,
+) -> int:
+    """Loan needed so ``balance_wei`` covers ``horizon_seconds`` of spend; 0 if none."""
+    shortfall = math.ceil(rate * horizon_seconds) - balance_wei
+    if shortfall <= 0:
+        return 0
+    amount = max(shortfall, min_loan_wei)
+    if max_loan_wei is not None:
+        amount = min(amount, max_loan_wei)
+    return amount
+
+
+class _PreFunderBase(ABC):
+    def __init__(
+        self,
+        client: Any,
+        *,
+        horizon_seconds: float = DEFAULT_PREFUND_HORIZON,
+        spend_window: float = DEFAULT_SPEND_WINDOW,
+        min_loan_wei: int = 0,
+        max_loan_wei: Optional[int] = None,
+        on_loan_taken: Optional[Callable[[Any], None]] = None,
+    ) -> None:
+        self.client = client
+        self.borrower = client.account.address
+        self.horizon_seconds = horizon_seconds
+        self.min_loan_wei = min_loan_wei
+        self.max_loan_wei = max_loan_wei
+        self.on_loan_taken = on_loan_taken
+        self.spend = SpendTracker(spend_window)
+        self.loans_taken = 0
+        self._paused_until = 0.0
+
+    def record_payment(self, resource: Optional[str], amount_wei: int) -> None:
+        """Count one settled payment as spend."""
+        self.spend.record(resource, amount_wei)
+
+    def observe_payment(self, payment: Any) -> None:
+        """Record a :class:`~credora_sdk.payment_cache.SettledPayment`, then
+        check whether to pre-fund.
+
+        Pass this as a payment listener of the x402 client, so each payment
+        is counted once, when it settles, however many selections or
+        retries it took.
+        """
+        self.record_payment(payment.resource, payment.amount)
+        if time.monotonic() >= self._paused_until:
+            self._schedule_check()
+
+    def _amount_for(self, balance_wei: int) -> int:
+        return prefund_amount(
+            balance_wei,
+            self.spend.rate(),
+            self.horizon_seconds,
+            self.min_loan_wei,
+            self.max_loan_wei,
+        )
+
+    def _loan_function(self) -> Callable[[str, int], Any]:
+        # Share the client's single-flight batch with 402-driven loans.
+        coalescer = self.client.loan_coalescer
+        return coalescer.request if coalescer is not None else self.client.loan.take_loan
+
+    def _funded(self, receipt: Any) -> None:
+        self.loans_taken += 1
+        if self.on_loan_taken is not None:
+            self.on_loan_taken(receipt)
+
+    def _rejected(self, exc: LoanRejected) -> None:
+        print(f"Pre-funding loan rejected: {exc.reason}")
+        self._paused_until = time.monotonic() + REJECTION_COOLDOWN
+
+    @abstractmethod
+    def _schedule_check(self) -> None:
+        """Run one pre-funding check in the background, unless one is running."""
+
+
+class PreFunder(_PreFunderBase):
+    """Keep a :class:`~credora_sdk.client.CredoraClient` wallet funded ahead of spend.
+
+    Every observed payment updates the spend rate. When the balance no
+    longer covers ``horizon_seconds`` of projected spend, a loan for the
+    difference is taken on a background thread, so paid calls rarely hit
+    ``insufficient_funds`` and never wait on the loan being mined.
+    """
+
+    def __init__(self, client: Any, **kwargs: Any) -> None:
+        super().__init__(client, **kwargs)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _schedule_check(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run_check, name="credora-prefund", daemon=True
+            )
+            self._thread.start()
+
+    def _run_check(self) -> None:
+        try:
+            self.check()
+        except Exception as exc:
+            print(f"Pre-funding check failed: {exc}")
+        finally:
+            with self._lock:
+                self._thread = None
+
+    def check(self) -> Optional[Any]:
+        """Take a pre-funding loan if the projected balance falls short."""
+        amount = self._amount_for(self.client.loan.get_balance(self.borrower))
+        if amount <= 0:
+            return None
+        print(f"Pre-funding {amount} wei ahead of projected spend...")
+        take = self._loan_function()
+        try:
+            receipt = take(self.borrower, amount)
+        except LoanRejected as exc:
+            self._rejected(exc)
+            return None
+        self._funded(receipt)
+        return receipt
+
+
+class AsyncPreFunder(_PreFunderBase):
+    """:class:`PreFunder` for :class:`~credora_sdk.async_client.AsyncCredoraClient`;
+    the check runs as a task on the current loop."""
+
+    def __init__(self, client: Any, **kwargs: Any) -> None:
+        super().__init__(client, **kwargs)
+        self._task: Optional[asyncio.Task] = None
+
+    def _schedule_check(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run_check())
+
+    async def _run_check(self) -> None:
+        try:
+            await self.check()
+        except Exception as exc:
+            print(f"Pre-funding check failed: {exc}")
+        finally:
+            self._task = None
+
+    async def check(self) -> Optional[Any]:
+        amount = self._amount_for(await self.client.loan.get_balance(self.borrower))
+        if amount <= 0:
+            return None
+        print(f"Pre-funding {amount} wei ahead of projected spend...")
+        take = self._loan_function()
+        try:
+            receipt = await take(self.borrower, amount)
+        except LoanRejected as exc:
+            self._rejected(exc)
+            return None
+        self._funded(receipt)
+        return receipt
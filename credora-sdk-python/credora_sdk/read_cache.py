@@ -0,0 +1,67 @@
+"""Per-block cache for contract view calls."""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+DEFAULT_HEAD_TTL = 1.0  # seconds to trust a head read; about half a Base block
+
+MISSING = object()
+
+ReadKey = Tuple[str, str, Tuple[Any, ...]]
+
+
+def read_key(fn: Any) -> ReadKey:
+    """Cache key for a bound view call: contract, function and arguments."""
+    return (str(fn.address).lower(), fn.fn_name, tuple(fn.args or ()))
+
+
+class BlockReadCache:
+    """View-call results for the current head block only.
+
+    Reads are pinned to :attr:`block`, so a cached value is exactly what
+    the chain returns at that block. Moving to a newer head drops
+    everything; so does :meth:`invalidate`, which clients call when one
+    of their own transactions is mined. The head itself is re-read at
+    most every ``head_ttl`` seconds.
+    """
+
+    def __init__(self, head_ttl: float = DEFAULT_HEAD_TTL) -> None:
+        self.head_ttl = head_ttl
+        self.block: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self._head_at = 0.0
+        self._values: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+
+    def head_stale(self) -> bool:
+        return self.block is None or time.monotonic() - self._head_at > self.head_ttl
+
+    def set_head(self, block: int) -> None:
+        with self._lock:
+            if self.block is None or block > self.block:
+                self.block = block
+                self._values.clear()
+            self._head_at = time.monotonic()
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            value = self._values.get(key, MISSING)
+            if value is MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, block: int) -> None:
+        with self._lock:
+            # A newer head may have arrived while the call was in flight.
+            if block == self.block:
+                self._values[key] = value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._values.clear()
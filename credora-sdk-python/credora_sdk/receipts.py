@@ -0,0 +1,278 @@
+"""One block-driven receipt poller shared by every in-flight transaction."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from web3 import Web3
+from web3.exceptions import TimeExhausted, TransactionNotFound
+from web3.types import TxReceipt
+
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_RECEIPT_TIMEOUT = 120.0  # same as web3's wait_for_transaction_receipt
+# Past this many new blocks it is cheaper to ask for each pending receipt
+# than to fetch every block.
+MAX_BLOCK_SCAN = 8
+
+
+def tx_key(tx_hash: Any) -> str:
+    return Web3.to_hex(tx_hash).lower()
+
+
+def _block_tx_keys(block: Any) -> Set[str]:
+    return {tx_key(tx) for tx in block["transactions"]}
+
+
+class ReceiptTracker:
+    """Resolve transaction receipts from one poller instead of one per wait.
+
+    :meth:`track` returns a :class:`~concurrent.futures.Future` for the
+    hash; any number of callers may wait on it. While something is
+    pending, a daemon thread follows the chain head and, for each new
+    block, fetches the block's transaction hashes once and then the
+    receipts of only our transactions that landed in it. Newly tracked
+    hashes get one direct receipt lookup, in case they were mined before
+    the poller saw them. A failed lookup fails only that hash's future.
+    The thread exits when nothing is pending.
+    """
+
+    def __init__(
+        self,
+        web3: Web3,
+        *,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        timeout: float = DEFAULT_RECEIPT_TIMEOUT,
+        max_block_scan: int = MAX_BLOCK_SCAN,
+    ) -> None:
+        self.web3 = web3
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.max_block_scan = max_block_scan
+        self.receipt_requests = 0
+        self.blocks_scanned = 0
+        self._pending: Dict[str, Future] = {}
+        self._deadlines: Dict[str, float] = {}
+        self._unchecked: Set[str] = set()
+        self._last_block: Optional[int] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def track(self, tx_hash: Any) -> Future:
+        key = tx_key(tx_hash)
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                future = Future()
+                self._pending[key] = future
+                self._deadlines[key] = time.monotonic() + self.timeout
+                self._unchecked.add(key)
+            if self._thread is None:
+                self._last_block = None
+                self._thread = threading.Thread(
+                    target=self._run, name="credora-receipts", daemon=True
+                )
+                self._thread.start()
+        return future
+
+    def wait(self, tx_hash: Any, timeout: Optional[float] = None) -> TxReceipt:
+        return self.track(tx_hash).result(timeout)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+            try:
+                self._poll(self.web3.eth.block_number)
+            except Exception as exc:
+                print(f"Receipt poll failed: {exc}")
+            self._expire()
+            time.sleep(self.poll_interval)
+
+    def _poll(self, head: int) -> None:
+        with self._lock:
+            unchecked, self._unchecked = self._unchecked, set()
+        self._fetch(unchecked)
+
+        if self._last_block is None or head <= self._last_block:
+            self._last_block = max(head, self._last_block or 0)
+            return
+        with self._lock:
+            pending = set(self._pending)
+        if head - self._last_block > self.max_block_scan:
+            self._fetch(pending)
+        else:
+            for number in range(self._last_block + 1, head + 1):
+                mined = _block_tx_keys(self.web3.eth.get_block(number))
+                self.blocks_scanned += 1
+                self._fetch(mined & pending)
+        self._last_block = head
+
+    def _fetch(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self.receipt_requests += 1
+            try:
+                receipt = self.web3.eth.get_transaction_receipt(key)
+            except TransactionNotFound:
+                continue
+            except Exception as exc:
+                # Fail this waiter only; the rest of the batch still resolves.
+                self._fail(key, exc)
+                continue
+            if receipt is not None and receipt.get("blockNumber") is not None:
+                self._resolve(key, receipt)
+
+    def _resolve(self, key: str, receipt: TxReceipt) -> None:
+        with self._lock:
+            future = self._pending.pop(key, None)
+            self._deadlines.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(receipt)
+
+    def _fail(self, key: str, exc: BaseException) -> None:
+        with self._lock:
+            future = self._pending.pop(key, None)
+            self._deadlines.pop(key, None)
+        if future is not None and not future.done():
+            future.set_exception(exc)
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, deadline in self._deadlines.items() if deadline <= now]
+            futures = [(key, self._pending.pop(key)) for key in expired]
+            for key in expired:
+                self._deadlines.pop(key)
+        for key, future in futures:
+            if not future.done():
+                future.set_exception(
+                    TimeExhausted(f"Transaction {key} is not in the chain after {self.timeout} seconds")
+                )
+
+
+class AsyncReceiptTracker:
+    """:class:`ReceiptTracker` for ``AsyncWeb3``; the poller is a task.
+
+    :meth:`track` returns an :class:`asyncio.Future`. Lookups for the
+    same block run concurrently.
+    """
+
+    def __init__(
+        self,
+        web3: Any,
+        *,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        timeout: float = DEFAULT_RECEIPT_TIMEOUT,
+        max_block_scan: int = MAX_BLOCK_SCAN,
+    ) -> None:
+        self.web3 = web3
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.max_block_scan = max_block_scan
+        self.receipt_requests = 0
+        self.blocks_scanned = 0
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._deadlines: Dict[str, float] = {}
+        self._unchecked: Set[str] = set()
+        self._last_block: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def track(self, tx_hash: Any) -> asyncio.Future:
+        key = tx_key(tx_hash)
+        future = self._pending.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[key] = future
+            self._deadlines[key] = time.monotonic() + self.timeout
+            self._unchecked.add(key)
+        if self._task is None:
+            self._last_block = None
+            self._task = asyncio.create_task(self._run())
+        return future
+
+    async def wait(self, tx_hash: Any, timeout: Optional[float] = None) -> TxReceipt:
+        # Shielded so one cancelled waiter doesn't cancel the shared future.
+        return await asyncio.wait_for(asyncio.shield(self.track(tx_hash)), timeout)
+
+    async def _run(self) -> None:
+        try:
+            while self._pending:
+                try:
+                    await self._poll(await self.web3.eth.block_number)
+                except Exception as exc:
+                    print(f"Receipt poll failed: {exc}")
+                self._expire()
+                if self._pending:
+                    await asyncio.sleep(self.poll_interval)
+        finally:
+            self._task = None
+
+    async def _poll(self, head: int) -> None:
+        unchecked, self._unchecked = self._unchecked, set()
+        await self._fetch(unchecked)
+
+        if self._last_block is None or head <= self._last_block:
+            self._last_block = max(head, self._last_block or 0)
+            return
+        if head - self._last_block > self.max_block_scan:
+            await self._fetch(list(self._pending))
+        else:
+            blocks = await asyncio.gather(
+                *(self.web3.eth.get_block(n) for n in range(self._last_block + 1, head + 1))
+            )
+            self.blocks_scanned += len(blocks)
+            mined: Set[str] = set()
+            for block in blocks:
+                mined |= _block_tx_keys(block)
+            await self._fetch(mined.intersection(self._pending))
+        self._last_block = head
+
+    async def _fetch(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        self.receipt_requests += len(keys)
+        results: List[Any] = await asyncio.gather(
+            *(self.web3.eth.get_transaction_receipt(key) for key in keys),
+            return_exceptions=True,
+        )
+        for key, receipt in zip(keys, results):
+            if isinstance(receipt, TransactionNotFound) or receipt is None:
+                continue
+            if isinstance(receipt, BaseException):
+                self._fail(key, receipt)
+            elif receipt.get("blockNumber") is not None:
+                self._resolve(key, receipt)
+
+    def _resolve(self, key: str, receipt: TxReceipt) -> None:
+        future = self._pending.pop(key, None)
+        self._deadlines.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(receipt)
+
+    def _fail(self, key: str, exc: BaseException) -> None:
+        future = self._pending.pop(key, None)
+        self._deadlines.pop(key, None)
+        if future is not None and not future.done():
+            future.set_exception(exc)
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        for key in [k for k, deadline in self._deadlines.items() if deadline <= now]:
+            self._deadlines.pop(key)
+            future = self._pending.pop(key)
+            if not future.done():
+                future.set_exception(
+                    TimeExhausted(f"Transaction {key} is not in the chain after {self.timeout} seconds")
+                )
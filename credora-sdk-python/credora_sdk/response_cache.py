@@ -0,0 +1,252 @@
+"""Response cache for paid endpoints: a repeated read skips the payment."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+import httpx  # type: ignore
+
+DEFAULT_MAX_ENTRIES = 256  # responses kept in memory
+DEFAULT_VARY_HEADERS = ("accept", "accept-language")
+CACHE_EXTENSION = "credora_cache"
+
+CACHEABLE_METHODS = ("GET", "HEAD")
+# Not replayed from the cache: the body is stored decoded, and a hit pays nothing.
+_DROPPED_HEADERS = {
+    "connection",
+    "content-encoding",
+    "content-length",
+    "keep-alive",
+    "transfer-encoding",
+    "x-payment-response",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key        TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL,
+    status     INTEGER NOT NULL,
+    headers    TEXT NOT NULL,
+    content    BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_by_expiry ON responses (expires_at);
+"""
+
+
+@dataclass
+class CachedResponse:
+    status: int
+    headers: List[Tuple[str, str]]
+    content: bytes
+    expires_at: float  # wall clock, so disk entries survive restarts
+
+    def to_response(self, request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            self.status,
+            headers=self.headers,
+            content=self.content,
+            request=request,
+            extensions={CACHE_EXTENSION: "hit"},
+        )
+
+
+def cache_ttl(cache_control: Optional[str], default_ttl: float = 0.0) -> float:
+    """Seconds a response may be reused per its ``Cache-Control``; 0 means never."""
+    if not cache_control:
+        return default_ttl
+    max_age: Optional[float] = None
+    for directive in cache_control.lower().split(","):
+        name, _, value = directive.strip().partition("=")
+        if name in ("no-store", "no-cache"):
+            return 0.0
+        if name == "max-age":
+            try:
+                max_age = float(value.strip('"'))
+            except ValueError:
+                return 0.0
+    return default_ttl if max_age is None else max_age
+
+
+def from_cache(response: httpx.Response) -> bool:
+    """Whether ``response`` was served by a :class:`ResponseCache`."""
+    return response.extensions.get(CACHE_EXTENSION) == "hit"
+
+
+class ResponseCache:
+    """In-memory LRU of responses, backed by an optional SQLite file.
+
+    Entries live for the ``max-age`` of their ``Cache-Control`` header
+    (``default_ttl`` when the server sends none, which defaults to not
+    caching); ``no-store`` and ``no-cache`` responses are never kept.
+    Keys cover the method, URL and ``vary_headers`` of the request.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        *,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        default_ttl: float = 0.0,
+        vary_headers: Iterable[str] = DEFAULT_VARY_HEADERS,
+    ) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.vary_headers = tuple(name.lower() for name in vary_headers)
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        if path is not None:
+            self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    def key(self, request: httpx.Request, scope: str = "") -> str:
+        parts = [scope.lower(), request.method, str(request.url)]
+        parts.extend(f"{name}={request.headers.get(name, '')}" for name in self.vary_headers)
+        return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def fresh(self, key: str) -> bool:
+        """Whether :meth:`get` would hit, without counting it as a lookup."""
+        with self._lock:
+            return self._lookup(key) is not None
+
+    def put(self, key: str, entry: CachedResponse) -> None:
+        with self._lock:
+            self._remember(key, entry)
+            if self._conn is None:
+                return
+            self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, expires_at, status, headers, content) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, entry.expires_at, entry.status, json.dumps(entry.headers), entry.content),
+            )
+
+    def ttl_for(self, response: httpx.Response) -> float:
+        if response.status_code != 200 or response.headers.get("vary") == "*":
+            return 0.0
+        return cache_ttl(response.headers.get("cache-control"), self.default_ttl)
+
+    def store(self, key: str, response: httpx.Response) -> bool:
+        """Keep an already-read ``response`` if its headers allow it."""
+        ttl = self.ttl_for(response)
+        if ttl <= 0:
+            return False
+        headers = [
+            (name, value)
+            for name, value in response.headers.items()
+            if name.lower() not in _DROPPED_HEADERS
+        ]
+        self.put(key, CachedResponse(200, headers, response.content, time.time() + ttl))
+        return True
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._memory.clear()
+            else:
+                self._memory.pop(key, None)
+            if self._conn is not None:
+                if key is None:
+                    self._conn.execute("DELETE FROM responses")
+                else:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _lookup(self, key: str) -> Optional[CachedResponse]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+        elif self._conn is not None:
+            entry = self._load(key)
+            if entry is not None:
+                self._remember(key, entry)
+        if entry is not None and entry.expires_at <= time.time():
+            self._memory.pop(key, None)
+            return None
+        return entry
+
+    def _remember(self, key: str, entry: CachedResponse) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _load(self, key: str) -> Optional[CachedResponse]:
+        row = self._conn.execute(
+            "SELECT expires_at, status, headers, content FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        headers = [(name, value) for name, value in json.loads(row[2])]
+        return CachedResponse(row[1], headers, bytes(row[3]), row[0])
+
+
+def _cacheable(request: httpx.Request) -> bool:
+    if request.method not in CACHEABLE_METHODS:
+        return False
+    directives = request.headers.get("cache-control", "").lower()
+    return "no-cache" not in directives and "no-store" not in directives
+
+
+class CachingTransport(httpx.AsyncBaseTransport):
+    """Serve fresh cached responses before the request reaches the network.
+
+    A hit never reaches the server, so no 402, payment or loan happens.
+    Responses are stored by :meth:`on_response`, registered as the *last*
+    response hook so it sees the paid result of the x402 retry. ``scope``
+    (e.g. the paying wallet) keeps clients sharing a cache apart.
+    """
+
+    def __init__(
+        self, cache: ResponseCache, transport: httpx.AsyncBaseTransport, scope: str = ""
+    ) -> None:
+        self.cache = cache
+        self.transport = transport
+        self.scope = scope
+
+    def serves(self, request: httpx.Request) -> bool:
+        """Whether ``request`` will be answered from the cache."""
+        return _cacheable(request) and self.cache.fresh(self.cache.key(request, self.scope))
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if _cacheable(request):
+            entry = self.cache.get(self.cache.key(request, self.scope))
+            if entry is not None:
+                return entry.to_response(request)
+        return await self.transport.handle_async_request(request)
+
+    async def on_response(self, response: httpx.Response) -> None:
+        request = response.request
+        if from_cache(response) or not _cacheable(request) or self.cache.ttl_for(response) <= 0:
+            return
+        await response.aread()
+        self.cache.store(self.cache.key(request, self.scope), response)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
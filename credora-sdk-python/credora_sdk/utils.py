@@ -1,12 +1,21 @@
-import time
-from credora_sdk import CredoraClient
-from typing import Any, Dict, Mapping, MutableMapping, Optional, Sequence
+import inspect
+from credora_sdk import AsyncCredoraClient, CredoraClient
+from credora_sdk.payment_cache import (
+    PaymentRequirementsCache,
+    PaymentSettlementHooks,
+    PrepaidPaymentHooks,
+    SettledPayment,
+)
+from credora_sdk.response_cache import CachingTransport, ResponseCache, from_cache
+from typing import Any, Callable, Dict, Mapping, MutableMapping, Optional, Sequence, Union
 from functools import lru_cache
 from pathlib import Path
 
 import httpx # type: ignore
 from eth_account import Account # type: ignore
-from x402.clients.httpx import x402HttpxClient # type: ignore
+from x402.clients.base import MissingRequestConfigError, PaymentError, x402Client # type: ignore
+from x402.clients.httpx import HttpxHooks, x402HttpxClient # type: ignore
+from x402.types import PaymentRequirements, x402PaymentRequiredResponse # type: ignore
 from web3.exceptions import ContractCustomError # type: ignore
 
 
@@ -34,6 +43,237 @@ def pretty_error(err):
 
     return {"type": "UnknownError", "message": str(err)}
 
+SUPPORTED_HTTP_METHODS = {"GET", "POST", "PUT", "DELETE", "PATCH"}
+
+
+def _use_http2(http2: bool) -> bool:
+    if not http2:
+        return False
+    try:
+        import h2  # type: ignore  # noqa: F401
+    except ImportError:
+        print("HTTP/2 requested but the 'h2' package is missing; using HTTP/1.1")
+        return False
+    return True
+
+
+def create_x402_transport(
+    account: Account,
+    *,
+    http2: bool = False,
+    max_connections: int = 100,
+    max_keepalive_connections: int = 20,
+    keepalive_expiry: float = 30.0,
+    response_cache: Optional[ResponseCache] = None,
+) -> httpx.AsyncBaseTransport:
+    """Keep-alive connection pool for x402 clients, optionally behind a response cache."""
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+    )
+    transport = httpx.AsyncHTTPTransport(limits=limits, http2=_use_http2(http2))
+    if response_cache is not None:
+        return CachingTransport(response_cache, transport, scope=account.address)
+    return transport
+
+
+class _BorrowedTransport(httpx.AsyncBaseTransport):
+    """A shared transport lent to one client; closing the client leaves it open."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport) -> None:
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self.transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        pass  # the pool that owns ``transport`` closes it
+
+
+class PooledPaymentHooks(HttpxHooks):
+    """x402's 402 hook, sending the paid retry through the client's transport.
+
+    x402 resends the paid request on a throwaway ``httpx.AsyncClient``, so
+    the one request that costs money opens a new connection, outside the
+    keep-alive pool and any response cache. This resends it through
+    ``transport`` instead and copies the result into the original response,
+    as x402 does, for the hooks registered after it. If a response cache
+    in ``transport`` answers the retry, the unsent payment header is dropped.
+    """
+
+    def __init__(self, client: x402Client, transport: httpx.AsyncBaseTransport) -> None:
+        super().__init__(client)
+        self.transport = transport
+
+    async def on_response(self, response: httpx.Response) -> httpx.Response:
+        if response.status_code != 402 or self._is_retry:
+            return response
+        try:
+            if not response.request:
+                raise MissingRequestConfigError("Missing request configuration")
+            await response.aread()
+            payment_response = x402PaymentRequiredResponse(**response.json())
+            selected = self.client.select_payment_requirements(payment_response.accepts)
+            header = self.client.create_payment_header(selected, payment_response.x402_version)
+
+            self._is_retry = True
+            request = response.request
+            request.headers["X-Payment"] = header
+            request.headers["Access-Control-Expose-Headers"] = "X-Payment-Response"
+
+            retry = await self.transport.handle_async_request(request)
+            try:
+                await retry.aread()
+            finally:
+                await retry.aclose()
+            if from_cache(retry):
+                # Answered from the response cache: the payment never left.
+                del request.headers["X-Payment"]
+            response.status_code = retry.status_code
+            response.headers = retry.headers
+            response.extensions = retry.extensions
+            response._content = retry.content
+            return response
+        except PaymentError:
+            self._is_retry = False
+            raise
+        except Exception as exc:
+            self._is_retry = False
+            raise PaymentError(f"Failed to handle payment: {exc}") from exc
+
+
+def create_x402_client(
+    account: Account,
+    base_url: str,
+    payment_requirements_selector=None,
+    *,
+    http2: bool = False,
+    max_connections: int = 100,
+    max_keepalive_connections: int = 20,
+    keepalive_expiry: float = 30.0,
+    timeout: Optional[float] = 30.0,
+    requirements_cache: Optional[PaymentRequirementsCache] = None,
+    response_cache: Optional[ResponseCache] = None,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+    payment_listeners: Sequence[Callable[[SettledPayment], None]] = (),
+) -> x402HttpxClient:
+    """Build an x402 client for one call (or one sequence of calls).
+
+    x402's payment hooks are single-use: the first paid retry sets a
+    per-client ``_is_retry`` flag that is never cleared on success, so
+    later 402s on the same client come back unpaid. Create a client per
+    call; pass a shared ``transport`` (see :class:`X402ClientPool`) to
+    keep reusing its open connections. The paid retry after a 402 is sent
+    through the same transport (see :class:`PooledPaymentHooks`).
+
+    With a ``requirements_cache``, resources whose 402 terms are already
+    known are paid on the first request instead of after a 402. With a
+    ``response_cache`` (or a caching ``transport``), cacheable paid
+    responses are reused until they expire, without paying again.
+    ``payment_listeners`` are called once for each payment the server
+    accepts (see :class:`~credora_sdk.payment_cache.PaymentSettlementHooks`).
+    """
+    if transport is None:
+        transport = create_x402_transport(
+            account,
+            http2=http2,
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+            response_cache=response_cache,
+        )
+    else:
+        transport = _BorrowedTransport(transport)
+    caching = transport.transport if isinstance(transport, _BorrowedTransport) else transport
+    if not isinstance(caching, CachingTransport):
+        caching = None
+
+    client = x402HttpxClient(
+        account=account,
+        base_url=base_url,
+        payment_requirements_selector=payment_requirements_selector,
+        transport=transport,
+        timeout=timeout,
+    )
+    signer = x402Client(account, payment_requirements_selector=payment_requirements_selector)
+    client.event_hooks = {
+        "request": [],
+        "response": [PooledPaymentHooks(signer, transport).on_response],
+    }
+    if requirements_cache is not None:
+        prepaid = PrepaidPaymentHooks(
+            requirements_cache,
+            select=lambda accepts: signer.select_payment_requirements(
+                [PaymentRequirements(**accept) for accept in accepts]
+            ),
+            sign=signer.create_payment_header,
+            should_prepay=(lambda request: not caching.serves(request)) if caching else None,
+        )
+        hooks = prepaid.event_hooks()
+        # Learn from a 402 before the x402 hook pays and retries it.
+        client.event_hooks = {
+            name: hooks[name] + list(client.event_hooks.get(name, []))
+            for name in ("request", "response")
+        }
+    if caching is not None:
+        # Last, so it stores what the x402 hook's paid retry returned.
+        client.event_hooks = {
+            "request": list(client.event_hooks.get("request", [])),
+            "response": list(client.event_hooks.get("response", [])) + [caching.on_response],
+        }
+    if payment_listeners:
+        # Last, so they see the header and status of the paid retry.
+        settlement = PaymentSettlementHooks(payment_listeners).event_hooks()
+        client.event_hooks = {
+            name: list(client.event_hooks.get(name, [])) + settlement[name]
+            for name in ("request", "response")
+        }
+    return client
+
+
+class X402ClientPool:
+    """One keep-alive connection pool, a fresh x402 client per call.
+
+    Share one pool per wallet and open ``async with pool.client() as
+    http:`` around each call: connections are reused, while every call
+    gets its own x402 hook state (see :func:`create_x402_client`).
+    """
+
+    def __init__(
+        self,
+        account: Account,
+        base_url: str,
+        payment_requirements_selector=None,
+        *,
+        timeout: Optional[float] = 30.0,
+        requirements_cache: Optional[PaymentRequirementsCache] = None,
+        payment_listeners: Sequence[Callable[[SettledPayment], None]] = (),
+        **transport_kwargs: Any,
+    ) -> None:
+        self.account = account
+        self.base_url = base_url
+        self.payment_requirements_selector = payment_requirements_selector
+        self.timeout = timeout
+        self.requirements_cache = requirements_cache
+        self.payment_listeners = list(payment_listeners)
+        self.transport = create_x402_transport(account, **transport_kwargs)
+
+    def client(self) -> x402HttpxClient:
+        return create_x402_client(
+            self.account,
+            self.base_url,
+            self.payment_requirements_selector,
+            timeout=self.timeout,
+            requirements_cache=self.requirements_cache,
+            transport=self.transport,
+            payment_listeners=self.payment_listeners,
+        )
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
 def create_credora_client(
     private_key: str,
     resolve_abi_path,
@@ -41,6 +281,7 @@ def create_credora_client(
     loan_tx_defaults,
     credora_rpc_url:str,
     credora_loan_address:str,
+    **client_kwargs: Any,
 ) -> Optional[CredoraClient]:
     rpc_url = credora_rpc_url
     loan_address = credora_loan_address
@@ -59,6 +300,35 @@ def create_credora_client(
             loan_address=loan_address,
             loan_abi=abi,
             loan_tx_defaults=loan_defaults,
+            **client_kwargs,
+        )
+    except Exception as exc:
+        print(f"Failed to initialize Credora SDK: {exc}")
+        return None
+
+
+async def create_async_credora_client(
+    private_key: str,
+    resolve_abi_path,
+    load_abi,
+    loan_tx_defaults,
+    credora_rpc_url: str,
+    credora_loan_address: str,
+    **client_kwargs: Any,
+) -> Optional[AsyncCredoraClient]:
+    """Async counterpart of :func:`create_credora_client`."""
+    if not credora_rpc_url or not credora_loan_address:
+        print("Credora SDK disabled: missing CREDORA_RPC_URL or CREDORA_LOAN_ADDRESS")
+        return None
+
+    try:
+        return await AsyncCredoraClient.create(
+            rpc_url=credora_rpc_url,
+            private_key=private_key,
+            loan_address=credora_loan_address,
+            loan_abi=load_abi(resolve_abi_path()),
+            loan_tx_defaults=loan_tx_defaults(),
+            **client_kwargs,
         )
     except Exception as exc:
         print(f"Failed to initialize Credora SDK: {exc}")
@@ -68,7 +338,7 @@ def create_credora_client(
 async def retry_with_credora(
     account: Account,
     response: httpx.Response,
-    credora_client: Optional[CredoraClient],
+    credora_client: Optional[Union[CredoraClient, AsyncCredoraClient]],
     BASE_URL: str,
     method: str = "GET",
     endpoint: str = "",
@@ -76,7 +346,15 @@ async def retry_with_credora(
     custom_payment_selector=Any,
     request_kwargs: Optional[Dict[str, Any]] = None,
     repay_watcher: Optional[Any] = None,
+    on_loan_taken: Optional[Callable[[Any], None]] = None,
+    clients: Optional[X402ClientPool] = None,
 ) -> httpx.Response:
+    """Take a Credora loan on a 402 ``insufficient_funds`` and retry the request.
+
+    The retry always runs on a new x402 client, since the caller's has
+    already spent its paid retry. Pass the caller's ``clients`` pool to
+    reuse its open connections; otherwise a temporary pool is used.
+    """
     if not credora_client or response.status_code != 402:
         return response
 
@@ -97,6 +375,8 @@ async def retry_with_credora(
     result = credora_client.auto_loan_and_retry_payment(
         account.address, response.json(), fallback_amount_wei=fallback_value
     )
+    if inspect.isawaitable(result):
+        result = await result
 
     if not result.get("ok"):
         print(f"Credora auto-loan failed: {result}")
@@ -106,37 +386,30 @@ async def retry_with_credora(
         receipt = result.get("receipt")
         tx_hash = receipt.transactionHash.hex() if receipt else "unknown"
         print(f"Credora loan executed. Tx hash: {tx_hash}")
+        if on_loan_taken:
+            on_loan_taken(receipt)
 
         
         if repay_watcher:
-            repay_watcher.loan_pending = True
-            repay_watcher.last_loan_time = time.time()
+            repay_watcher.note_loan(account.address)
             print("Watcher temporarily paused after loan; allowing API retry.")
             
     print("🔁 Retrying premium API call after funding wallet…")
     
     
+    request_kwargs = request_kwargs or {}
+    method = method.upper()
+
     try:
-        async with x402HttpxClient(
-            account=account,
-            base_url=BASE_URL,
-            payment_requirements_selector=custom_payment_selector,
-        ) as client:
-            request_kwargs = request_kwargs or {}
-            method = method.upper()
-            
-            if method == "GET":
-                return await client.get(endpoint, **request_kwargs)
-            elif method == "POST":
-                return await client.post(endpoint, **request_kwargs)
-            elif method == "PUT":
-                return await client.put(endpoint, **request_kwargs)
-            elif method == "DELETE":
-                return await client.delete(endpoint, **request_kwargs)
-            elif method == "PATCH":
-                return await client.patch(endpoint, **request_kwargs)
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
+        if method not in SUPPORTED_HTTP_METHODS:
+            raise ValueError(f"Unsupported HTTP method: {method}")
+
+        if clients is not None:
+            retry_client = clients.client()
+        else:
+            retry_client = create_x402_client(account, BASE_URL, custom_payment_selector)
+        async with retry_client:
+            return await retry_client.request(method, endpoint, **request_kwargs)
     except Exception as e:
         print("ERROR during x402 request:", pretty_error(e))
 
@@ -0,0 +1,87 @@
+"""In-memory stand-ins for the chain, shared by the watcher tests."""
+
+from types import SimpleNamespace
+
+from web3 import Web3
+
+TOKEN = Web3.to_checksum_address("0x" + "aa" * 20)
+LENDING_POOL = Web3.to_checksum_address("0x" + "bb" * 20)
+LENDER = Web3.to_checksum_address("0x" + "cc" * 20)
+
+
+def wallet(n: int) -> str:
+    return Web3.to_checksum_address("0x" + f"{n:040x}")
+
+
+def _topic(address: str) -> bytes:
+    return bytes(12) + bytes.fromhex(address[2:])
+
+
+class FakeEth:
+    """``block_number`` plus ``get_logs`` over a list of Transfer logs."""
+
+    def __init__(self, block_number: int = 100) -> None:
+        self.block_number = block_number
+        self.transfers = []  # (block, sender, recipient, value)
+        self.failures = []  # raised by the next get_logs calls, in order
+        self.requests = []
+
+    def transfer(self, block: int, sender: str, recipient: str, value: int) -> None:
+        self.transfers.append((block, sender, recipient, value))
+
+    def get_logs(self, params):
+        self.requests.append(params)
+        if self.failures:
+            raise self.failures.pop(0)
+        recipients = {topic[-40:].lower() for topic in params["topics"][2]}
+        return [
+            {
+                "blockNumber": block,
+                "topics": [b"", _topic(sender), _topic(recipient)],
+                "data": value.to_bytes(32, "big"),
+            }
+            for block, sender, recipient, value in self.transfers
+            if params["fromBlock"] <= block <= params["toBlock"]
+            and recipient[2:].lower() in recipients
+        ]
+
+
+class FakeLoan:
+    """The parts of a sync ``LoanClient`` the repay watchers use."""
+
+    def __init__(self, address: str, eth: FakeEth, *, balance: int = 0, outstanding: int = 0):
+        self.account = SimpleNamespace(address=address)
+        self.web3 = SimpleNamespace(eth=eth)
+        self.stablecoin = SimpleNamespace(address=TOKEN)
+        self.contract = SimpleNamespace(
+            functions=SimpleNamespace(
+                lendingPool=lambda: SimpleNamespace(call=lambda: LENDING_POOL)
+            )
+        )
+        self.fee_oracle = SimpleNamespace(fees=lambda: {"maxFeePerGas": 1})
+        self.balances = {address: balance}
+        self.outstanding = {address: outstanding}
+        self.repaid = []
+        self.repay_error = None
+
+    def get_balance(self, account: str) -> int:
+        return self.balances.get(account, 0)
+
+    def get_outstanding(self, account: str) -> int:
+        return self.outstanding.get(account, 0)
+
+    def get_loan_states(self, accounts):
+        return {
+            account: SimpleNamespace(
+                balance=self.get_balance(account), outstanding=self.get_outstanding(account)
+            )
+            for account in accounts
+        }
+
+    def approve_and_repay(self, amount, *, borrower, on_time, approve_amount_wei):
+        if self.repay_error is not None:
+            raise self.repay_error
+        self.repaid.append((borrower, amount))
+        self.balances[borrower] -= amount
+        self.outstanding[borrower] -= amount
+        return None, SimpleNamespace(transactionHash=bytes(32))
@@ -0,0 +1,131 @@
+from types import SimpleNamespace
+
+import pytest
+
+from credora_sdk.allowance import EXACT, MAX_UINT256, STANDING, AllowanceCache
+from credora_sdk.credit import RepayReverted
+from credora_sdk.gas import GasLimitCache
+from credora_sdk.loans import PIPELINED_REPAY_GAS, LoanClient
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        AllowanceCache("infinite")
+
+
+def test_approval_amount_follows_the_policy():
+    assert AllowanceCache(EXACT).approval_amount(500) == 500
+    assert AllowanceCache(STANDING).approval_amount(500) == MAX_UINT256
+    assert AllowanceCache(STANDING, standing_amount=100).approval_amount(500) == 500
+
+
+def test_spending_tracks_the_allowance_locally():
+    cache = AllowanceCache()
+    assert not cache.covers(0)
+
+    cache.on_approved(1_000)
+    cache.on_spent(400)
+    assert cache.covers(600) and not cache.covers(601)
+
+    cache.on_spent(10_000)
+    assert cache.value == 0
+
+
+def test_unlimited_allowance_is_never_spent():
+    cache = AllowanceCache(STANDING)
+    cache.on_approved(MAX_UINT256)
+    cache.on_spent(10**24)
+    assert cache.value == MAX_UINT256
+
+
+class Chain:
+    """Records the transactions a stubbed ``LoanClient`` sends."""
+
+    def __init__(self, allowance=0, repay_status=1):
+        self.allowance = allowance
+        self.repay_status = repay_status
+        self.allowance_reads = 0
+        self.sent = []
+
+    def read_allowance(self):
+        self.allowance_reads += 1
+        return self.allowance
+
+    def send(self, fn, gas=None):
+        self.sent.append((fn.fn_name, gas))
+        return fn.fn_name
+
+    def receipt(self, tx_hash):
+        return {"status": self.repay_status if tx_hash == "repayLoan" else 1}
+
+
+def loan_client_stub(chain, policy=EXACT):
+    """Just what ``LoanClient.approve_and_repay`` touches."""
+
+    def call(name, *args):
+        return SimpleNamespace(
+            address="0xContract", fn_name=name, args=args, call=chain.read_allowance
+        )
+
+    client = SimpleNamespace(
+        account=SimpleNamespace(address="0xBorrower"),
+        contract=SimpleNamespace(
+            address="0xCreditManager",
+            functions=SimpleNamespace(repayLoan=lambda *args: call("repayLoan", *args)),
+        ),
+        stablecoin=SimpleNamespace(
+            functions=SimpleNamespace(
+                approve=lambda *args: call("approve", *args),
+                allowance=lambda *args: call("allowance", *args),
+            )
+        ),
+        allowance=AllowanceCache(policy),
+        credit=SimpleNamespace(invalidate=lambda borrower: None),
+        gas_limits=GasLimitCache(sample_rate=0),
+        broadcast=chain.send,
+        wait_for_receipt=chain.receipt,
+        _send_transaction=lambda fn: chain.receipt(chain.send(fn)),
+    )
+    client.get_allowance = lambda refresh=False: LoanClient.get_allowance(client, refresh)
+    client._account_repay = lambda *args: LoanClient._account_repay(client, *args)
+    return client
+
+
+def test_covered_repay_skips_the_approve_and_spends_the_cache():
+    chain = Chain(allowance=1_000)
+    client = loan_client_stub(chain)
+
+    approve, _ = LoanClient.approve_and_repay(client, 400, "0xBorrower")
+    LoanClient.approve_and_repay(client, 600, "0xBorrower")
+
+    assert approve is None
+    assert chain.sent == [("repayLoan", None), ("repayLoan", None)]
+    assert chain.allowance_reads == 1
+    assert client.allowance.value == 0
+    assert client.allowance.approvals_skipped == 2
+
+
+def test_short_allowance_pipelines_approve_and_repay():
+    chain = Chain(allowance=0)
+    client = loan_client_stub(chain, policy=STANDING)
+
+    LoanClient.approve_and_repay(client, 400, "0xBorrower")
+    LoanClient.approve_and_repay(client, 400, "0xBorrower")
+
+    # The standing approval covers the second repay too.
+    assert chain.sent == [
+        ("approve", None),
+        ("repayLoan", PIPELINED_REPAY_GAS),
+        ("repayLoan", None),
+    ]
+    assert client.allowance.value == MAX_UINT256
+
+
+def test_reverted_repay_forgets_the_allowance():
+    chain = Chain(allowance=1_000, repay_status=0)
+    client = loan_client_stub(chain)
+
+    with pytest.raises(RepayReverted):
+        LoanClient.approve_and_repay(client, 400, "0xBorrower")
+
+    assert not client.allowance.known
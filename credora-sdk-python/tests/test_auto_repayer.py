@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from credora_sdk import auto_repay_watcher
+from credora_sdk.auto_repay_watcher import AutoRepayer, retry_forever
+
+from fakes import LENDER, LENDING_POOL, FakeEth, FakeLoan, wallet
+
+BORROWER = wallet(1)
+
+
+def logs_repayer(eth, **loan_kwargs):
+    loan = FakeLoan(BORROWER, eth, **loan_kwargs)
+    repayer = AutoRepayer(loan, loan.stablecoin, BORROWER, mode="logs")
+    asyncio.run(repayer._start_transfer_watch())
+    return loan, repayer
+
+
+def test_logs_mode_repays_transfers_but_not_loan_payouts():
+    eth = FakeEth(block_number=100)
+    loan, repayer = logs_repayer(eth, balance=0, outstanding=500)
+    eth.transfer(101, LENDING_POOL, BORROWER, 500)  # the loan itself
+    eth.transfer(102, LENDER, BORROWER, 200)
+    loan.balances[BORROWER] = 700
+    eth.block_number = 102
+
+    asyncio.run(repayer.scan_new_blocks())
+
+    assert loan.repaid == [(BORROWER, 200)]
+    assert repayer.last_block == 102
+    assert repayer.pending_inflow == 0
+
+
+def test_failed_log_read_rescans_the_same_range():
+    eth = FakeEth(block_number=100)
+    loan, repayer = logs_repayer(eth, balance=200, outstanding=500)
+    eth.transfer(101, LENDER, BORROWER, 200)
+    eth.block_number = 101
+    eth.failures.append(ValueError("upstream timeout"))
+
+    with pytest.raises(ValueError):
+        asyncio.run(repayer.scan_new_blocks())
+    assert repayer.last_block == 100
+
+    asyncio.run(repayer.scan_new_blocks())
+    assert eth.requests[-1]["fromBlock"] == 101
+    assert loan.repaid == [(BORROWER, 200)]
+
+
+def test_failed_debt_read_keeps_the_batch_pending():
+    eth = FakeEth(block_number=100)
+    loan, repayer = logs_repayer(eth, balance=200, outstanding=500)
+    repayer._record_inflows([200])
+    calls = []
+
+    def flaky_outstanding(account):
+        calls.append(account)
+        if len(calls) == 2:  # the re-read right before repaying
+            raise ConnectionError("rpc down")
+        return 500
+
+    loan.get_outstanding = flaky_outstanding
+    with pytest.raises(ConnectionError):
+        asyncio.run(repayer.settle_if_due())
+
+    assert repayer.pending_inflow == 200
+    asyncio.run(repayer.settle_if_due())
+    assert loan.repaid == [(BORROWER, 200)]
+
+
+def test_retry_forever_backs_off_until_the_step_succeeds(monkeypatch):
+    monkeypatch.setattr(auto_repay_watcher, "ERROR_BACKOFF", 0)
+    attempts = []
+
+    async def step():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionError("rpc down")
+        return "done"
+
+    assert asyncio.run(retry_forever("test step", step)) == "done"
+    assert len(attempts) == 3
+
+
+def test_error_backoff_doubles_up_to_the_cap():
+    assert auto_repay_watcher.error_backoff(1) == auto_repay_watcher.ERROR_BACKOFF
+    assert auto_repay_watcher.error_backoff(2) == 2 * auto_repay_watcher.ERROR_BACKOFF
+    assert auto_repay_watcher.error_backoff(100) == auto_repay_watcher.MAX_ERROR_BACKOFF
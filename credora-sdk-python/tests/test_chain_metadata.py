@@ -0,0 +1,81 @@
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+
+from credora_sdk.chain_metadata import AsyncFeeOracle, ChainMetadataCache, FeeOracle, metadata_key
+
+RPC_URL = "https://base-sepolia.example/v2/secret-api-key"
+
+
+def test_keys_never_contain_the_rpc_url(tmp_path):
+    path = tmp_path / "metadata.json"
+    cache = ChainMetadataCache(str(path))
+    cache.put(metadata_key(RPC_URL, "0xLoan"), "chainId", 84532)
+
+    assert "secret-api-key" not in path.read_text()
+    assert ChainMetadataCache(str(path)).get(metadata_key(RPC_URL, "0xloan"), "chainId") == 84532
+
+
+def test_plaintext_keys_from_older_files_are_dropped(tmp_path):
+    path = tmp_path / "metadata.json"
+    path.write_text(json.dumps({f"{RPC_URL}|0xloan": {"chainId": 84532}}))
+
+    cache = ChainMetadataCache(str(path))
+    cache.put(metadata_key(RPC_URL, "0xLoan"), "chainId", 84532)
+
+    assert "secret-api-key" not in path.read_text()
+
+
+def test_processes_sharing_a_file_keep_each_others_entries(tmp_path):
+    path = str(tmp_path / "metadata.json")
+    first = ChainMetadataCache(path)
+    second = ChainMetadataCache(path)
+
+    first.put(metadata_key(RPC_URL, "0xA"), "chainId", 1)
+    second.put(metadata_key(RPC_URL, "0xB"), "chainId", 2)
+
+    merged = ChainMetadataCache(path)
+    assert merged.get(metadata_key(RPC_URL, "0xA"), "chainId") == 1
+    assert merged.get(metadata_key(RPC_URL, "0xB"), "chainId") == 2
+
+
+HISTORY = {"baseFeePerGas": [100, 100], "reward": [[2]]}
+
+
+def test_fee_oracle_stop_waits_for_the_refresh_thread():
+    release = threading.Event()
+
+    def fee_history(*args):
+        release.wait(5)
+        return HISTORY
+
+    oracle = FeeOracle(SimpleNamespace(eth=SimpleNamespace(fee_history=fee_history)), ttl=60)
+    oracle.start()
+    thread = oracle._thread
+    release.set()
+    oracle.stop()
+
+    assert not thread.is_alive()
+    assert oracle.fees()["maxPriorityFeePerGas"] == 2
+
+
+def test_async_fee_oracle_shares_one_in_flight_refresh():
+    calls = []
+
+    async def fee_history(*args):
+        calls.append(args)
+        await asyncio.sleep(0.01)
+        return HISTORY
+
+    oracle = AsyncFeeOracle(SimpleNamespace(eth=SimpleNamespace(fee_history=fee_history)), ttl=0)
+
+    async def run():
+        await oracle.fees()  # first estimate
+        return await asyncio.gather(*(oracle.fees() for _ in range(10)))
+
+    results = asyncio.run(run())
+
+    # The stale estimate was served while one refresh was in flight.
+    assert len(calls) == 2
+    assert all(fees == results[0] for fees in results)
@@ -0,0 +1,102 @@
+import asyncio
+import sqlite3
+import time
+
+from credora_sdk import auto_repay_watcher
+from credora_sdk.auto_repay_watcher import AutoRepayer, RepayWatcherPool
+from credora_sdk.checkpoints import CheckpointStore, RepayCheckpoint, checkpoint_key
+
+from fakes import TOKEN, FakeEth, FakeLoan, wallet
+
+BORROWER = wallet(1)
+KEY = checkpoint_key(TOKEN, BORROWER)
+
+
+def test_checkpoint_round_trip(tmp_path):
+    store = CheckpointStore(str(tmp_path / "cp.db"))
+    cp = RepayCheckpoint(
+        last_block=7,
+        last_balance=10**30,
+        pending_inflow=5,
+        loan_pending=True,
+        last_loan_time=1.5,
+        batch_started=2.5,
+        batch_inflows=3,
+        mode="poll",
+    )
+    store.save(KEY, cp)
+
+    assert store.load(KEY) == cp
+    assert store.load("missing") is None
+
+
+def test_tables_from_before_later_columns_are_migrated(tmp_path):
+    path = str(tmp_path / "cp.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE repay_checkpoints (key TEXT PRIMARY KEY, last_block INTEGER, "
+        "last_balance TEXT NOT NULL DEFAULT '0', pending_inflow TEXT NOT NULL DEFAULT '0', "
+        "loan_pending INTEGER NOT NULL DEFAULT 0, last_loan_time REAL NOT NULL DEFAULT 0, "
+        "updated_at REAL NOT NULL)"
+    )
+    conn.execute(
+        "INSERT INTO repay_checkpoints VALUES (?, 9, '100', '0', 0, 0, 0)", (KEY,)
+    )
+    conn.commit()
+    conn.close()
+
+    cp = CheckpointStore(path).load(KEY)
+    assert (cp.last_block, cp.last_balance, cp.mode) == (9, 100, None)
+
+
+def run_poll_watcher(repayer, iterations=3):
+    async def main():
+        task = asyncio.create_task(repayer.watch_and_repay())
+        for _ in range(iterations * 20):
+            await asyncio.sleep(0.001)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(main())
+
+
+def test_poll_mode_ignores_the_balance_saved_by_logs_mode(tmp_path, monkeypatch):
+    monkeypatch.setattr(auto_repay_watcher, "CHECK_INTERVAL", 0)
+    store = CheckpointStore(str(tmp_path / "cp.db"))
+    store.save(KEY, RepayCheckpoint(last_block=100, last_balance=0, mode="logs"))
+    loan = FakeLoan(BORROWER, FakeEth(), balance=1_000, outstanding=1_000)
+    repayer = AutoRepayer(loan, loan.stablecoin, BORROWER, checkpoint_store=store)
+
+    run_poll_watcher(repayer)
+
+    # The existing balance is a baseline, not an inflow to repay.
+    assert loan.repaid == []
+    assert repayer.last_balance == 1_000
+
+
+def test_poll_mode_resumes_its_own_balance(tmp_path, monkeypatch):
+    monkeypatch.setattr(auto_repay_watcher, "CHECK_INTERVAL", 0)
+    store = CheckpointStore(str(tmp_path / "cp.db"))
+    store.save(KEY, RepayCheckpoint(last_balance=600, mode="poll"))
+    loan = FakeLoan(BORROWER, FakeEth(), balance=1_000, outstanding=1_000)
+    repayer = AutoRepayer(loan, loan.stablecoin, BORROWER, checkpoint_store=store)
+
+    run_poll_watcher(repayer)
+
+    # 400 arrived while the watcher was down.
+    assert loan.repaid == [(BORROWER, 400)]
+
+
+def test_pool_saves_loan_pending_only_during_the_grace_period(tmp_path):
+    store = CheckpointStore(str(tmp_path / "cp.db"))
+    pool = RepayWatcherPool(checkpoint_store=store, grace_seconds=10)
+    pool.add(FakeLoan(BORROWER, FakeEth()))
+
+    pool.note_loan(BORROWER)
+    assert store.load(KEY).loan_pending
+
+    pool.grace_until[0] = time.time() - 1
+    pool.save_checkpoint([0])
+    cp = store.load(KEY)
+    assert not cp.loan_pending
+    assert cp.mode == "pool"
@@ -0,0 +1,146 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from eth_abi import encode
+from hexbytes import HexBytes
+from web3 import Web3
+
+from credora_sdk.event_index import (
+    CEILING_RECOVERY,
+    EventIndexer,
+    EventStore,
+    IndexedEvent,
+    decode_event,
+    is_range_error,
+)
+
+CREDIT_MANAGER = Web3.to_checksum_address("0x" + "dd" * 20)
+LENDING_POOL = Web3.to_checksum_address("0x" + "bb" * 20)
+BORROWER = Web3.to_checksum_address("0x" + "01" * 20)
+RANGE_ERROR = ValueError({"code": -32602, "message": "query returned more than 10000 results"})
+
+
+def loan_approved_log(block, amount, log_index=0):
+    return {
+        "address": CREDIT_MANAGER,
+        "blockNumber": block,
+        "logIndex": log_index,
+        "transactionHash": HexBytes(bytes([block % 256]) * 32),
+        "topics": [
+            Web3.keccak(text="LoanApproved(address,uint256)"),
+            HexBytes(bytes(12) + bytes.fromhex(BORROWER[2:])),
+        ],
+        "data": HexBytes(encode(["uint256"], [amount])),
+    }
+
+
+class LogsEth:
+    """``get_logs`` over a fixed list of logs; ``failures`` are raised first."""
+
+    def __init__(self, logs=(), block_number=10_000):
+        self.logs = list(logs)
+        self.block_number = block_number
+        self.failures = []
+        self.requests = []
+
+    def get_logs(self, params):
+        self.requests.append((params["fromBlock"], params["toBlock"]))
+        if self.failures:
+            raise self.failures.pop(0)
+        return [
+            log
+            for log in self.logs
+            if params["fromBlock"] <= log["blockNumber"] <= params["toBlock"]
+        ]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EventStore(str(tmp_path / "events.db"))
+    yield store
+    store.close()
+
+
+def indexer(eth, store, **kwargs):
+    web3 = SimpleNamespace(eth=eth, codec=Web3().codec)
+    return EventIndexer(web3, CREDIT_MANAGER, LENDING_POOL, store, start_block=0, **kwargs)
+
+
+def test_range_errors_are_told_apart_from_rate_limits():
+    assert is_range_error(RANGE_ERROR)
+    assert is_range_error(ValueError({"code": -32005, "message": "limit exceeded"}))
+    assert not is_range_error(ValueError({"code": -32005, "message": "rate limit exceeded"}))
+    assert not is_range_error(ValueError("connection reset"))
+
+
+def test_decode_event_reads_the_account_and_amount():
+    event = decode_event(Web3(), loan_approved_log(7, 500))
+
+    assert (event.event, event.account, event.amount, event.block_number) == (
+        "LoanApproved",
+        BORROWER,
+        500,
+        7,
+    )
+
+
+def test_range_error_halves_the_span_and_retries_the_same_blocks(store):
+    eth = LogsEth([loan_approved_log(10, 500)])
+    eth.failures.append(RANGE_ERROR)
+    index = indexer(eth, store, max_range=1_000)
+
+    added = asyncio.run(index.sync(to_block=999))
+
+    assert added == 1
+    assert eth.requests[:2] == [(0, 999), (0, 499)]
+    assert eth.requests[2] == (500, 999)
+    # The refused span caps growth until enough requests succeed.
+    assert index.span == 500
+    assert store.last_block(index.key) == 999
+
+
+def test_refused_span_is_retried_after_enough_successes(store):
+    eth = LogsEth()
+    eth.failures.append(RANGE_ERROR)
+    index = indexer(eth, store, max_range=64)
+
+    asyncio.run(index.sync(to_block=32 * (CEILING_RECOVERY + 1)))
+
+    assert eth.requests[0] == (0, 63)
+    assert index.span == 64
+
+
+def test_other_errors_propagate_and_keep_the_span(store):
+    eth = LogsEth()
+    eth.failures.append(ValueError("connection reset"))
+    index = indexer(eth, store, max_range=1_000)
+
+    with pytest.raises(ValueError):
+        asyncio.run(index.sync(to_block=999))
+
+    assert index.span == 1_000
+    assert store.last_block(index.key) is None
+
+
+def test_sync_resumes_from_the_cursor_below_the_confirmed_head(store):
+    eth = LogsEth([loan_approved_log(10, 500), loan_approved_log(20, 700)], block_number=17)
+    index = indexer(eth, store, confirmations=2)
+
+    asyncio.run(index.sync())
+    eth.block_number = 30
+    asyncio.run(index.sync())
+
+    assert eth.requests == [(0, 15), (16, 28)]
+    assert store.borrower_totals(BORROWER).borrowed == 1_200
+
+
+def test_cursor_is_written_in_the_same_transaction_as_the_events(store):
+    good = IndexedEvent(5, 0, "0xaa", "LoanApproved", BORROWER, amount=1)
+    bad = IndexedEvent(6, 0, None, "LoanApproved", BORROWER, amount=1)  # NOT NULL tx_hash
+
+    with pytest.raises(Exception):
+        store.insert("key", [good, bad], 6)
+
+    assert store.last_block("key") is None
+    assert store.history(BORROWER) == []
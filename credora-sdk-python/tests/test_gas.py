@@ -0,0 +1,116 @@
+from types import SimpleNamespace
+
+import pytest
+from eth_abi import encode
+from hexbytes import HexBytes
+from web3 import Web3
+
+from credora_sdk import gas
+from credora_sdk.credit import LOAN_REJECTED_TOPIC
+from credora_sdk.gas import GasLimitCache, gas_key
+from credora_sdk.loans import LoanClient
+from credora_sdk.receipts import tx_key
+
+KEY = ("0xloan", "requestLoan", ("str", "int"))
+CREDIT_MANAGER = Web3.to_checksum_address("0x" + "dd" * 20)
+
+
+@pytest.fixture
+def cache():
+    return GasLimitCache(sample_rate=0)
+
+
+def receipt(gas_used, status=1, logs=()):
+    return {"gasUsed": gas_used, "status": status, "logs": list(logs), "blockNumber": 1}
+
+
+def test_gas_key_depends_on_argument_shape_not_values():
+    def fn(*args):
+        return SimpleNamespace(address="0xLOAN", fn_name="repayLoan", args=args)
+
+    assert gas_key(fn("0xa", 5, True)) == gas_key(fn("0xb", 7, True))
+    assert gas_key(fn("0xa", 5, True)) != gas_key(fn("0xa", 0, True))
+    assert gas_key(fn("0xa", 5, True)) != gas_key(fn("0xa", 5, False))
+
+
+def test_unknown_key_asks_for_an_estimate(cache):
+    assert cache.limit(KEY) is None
+    assert cache.misses == 1
+
+
+def test_limit_is_the_largest_recent_use_plus_margin(cache):
+    cache.observe(KEY, receipt(100_000))
+    cache.observe(KEY, receipt(150_000))
+    cache.observe(KEY, receipt(120_000))
+
+    assert cache.limit(KEY) == int(150_000 * cache.margin)
+
+
+def test_window_forgets_old_observations():
+    cache = GasLimitCache(sample_rate=0, window=2)
+    cache.observe(KEY, receipt(500_000))
+    cache.observe(KEY, receipt(100_000))
+    cache.observe(KEY, receipt(100_000))
+
+    assert cache.limit(KEY) == int(100_000 * cache.margin)
+
+
+def test_out_of_gas_revert_evicts_the_key(cache):
+    cache.observe(KEY, receipt(100_000))
+
+    cache.observe(KEY, receipt(119_900, status=0), gas_limit=120_000)
+
+    assert cache.limit(KEY) is None
+
+
+def test_other_reverts_keep_the_key(cache):
+    cache.observe(KEY, receipt(100_000))
+
+    cache.observe(KEY, receipt(30_000, status=0), gas_limit=120_000)
+
+    assert cache.limit(KEY) == 120_000
+
+
+def test_early_exit_receipts_are_not_learned(cache):
+    cache.observe(KEY, receipt(40_000), early_exit=True)
+    assert cache.limit(KEY) is None
+
+
+def test_sampled_sends_re_estimate(monkeypatch):
+    cache = GasLimitCache(sample_rate=0.5)
+    cache.observe(KEY, receipt(100_000))
+    monkeypatch.setattr(gas.random, "random", lambda: 0.1)
+
+    assert cache.limit(KEY) is None
+
+
+def loan_client_stub(cache):
+    """Just what ``LoanClient._on_mined`` touches."""
+    return SimpleNamespace(
+        web3=Web3(),
+        contract=SimpleNamespace(address=CREDIT_MANAGER),
+        reads=SimpleNamespace(set_head=lambda block: None, invalidate=lambda: None),
+        gas_limits=cache,
+        _inflight_gas={},
+    )
+
+
+def rejection_log():
+    return {
+        "address": CREDIT_MANAGER,
+        "topics": [HexBytes(LOAN_REJECTED_TOPIC), HexBytes(bytes(32))],
+        "data": HexBytes(encode(["uint256", "string"], [10, "Insufficient credit score"])),
+    }
+
+
+def test_rejected_request_loan_does_not_shrink_the_learned_limit(cache):
+    client = loan_client_stub(cache)
+    tx_hash = HexBytes(b"\x01" * 32)
+
+    client._inflight_gas[tx_key(tx_hash)] = (KEY, 500_000)
+    LoanClient._on_mined(client, tx_hash, receipt(60_000, logs=[rejection_log()]))
+    assert cache.limit(KEY) is None
+
+    client._inflight_gas[tx_key(tx_hash)] = (KEY, 500_000)
+    LoanClient._on_mined(client, tx_hash, receipt(300_000))
+    assert cache.limit(KEY) == int(300_000 * cache.margin)
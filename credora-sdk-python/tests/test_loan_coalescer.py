@@ -0,0 +1,101 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from credora_sdk.credit import LoanRejected
+from credora_sdk.loan_coalescer import AsyncLoanCoalescer, LoanCoalescer
+
+BORROWER = "0xBorrower"
+
+
+class Lender:
+    """Records the loans taken; rejects them all when ``reason`` is set."""
+
+    def __init__(self, reason=None):
+        self.reason = reason
+        self.loans = []
+
+    def take(self, borrower, amount_wei):
+        self.loans.append((borrower, amount_wei))
+        if self.reason:
+            raise LoanRejected(borrower, amount_wei, self.reason, receipt={"status": 1})
+        return {"transactionHash": f"0x{len(self.loans):064x}", "status": 1}
+
+    async def take_async(self, borrower, amount_wei):
+        return self.take(borrower, amount_wei)
+
+
+def request_concurrently(coalescer, amounts, borrower=BORROWER):
+    async def run():
+        return await asyncio.gather(
+            *(coalescer.request(borrower, amount) for amount in amounts), return_exceptions=True
+        )
+
+    return asyncio.run(run())
+
+
+def test_concurrent_requests_share_one_loan_and_receipt():
+    lender = Lender()
+    coalescer = AsyncLoanCoalescer(lender.take_async, window=0.01)
+
+    receipts = request_concurrently(coalescer, [100, 200, 300])
+
+    assert lender.loans == [(BORROWER, 600)]
+    assert receipts[0] is receipts[1] is receipts[2]
+    assert (coalescer.loans_taken, coalescer.requests_coalesced) == (1, 2)
+
+
+def test_one_rejection_reaches_every_caller():
+    lender = Lender(reason="Insufficient credit score")
+    coalescer = AsyncLoanCoalescer(lender.take_async, window=0.01)
+
+    results = request_concurrently(coalescer, [100, 200])
+
+    assert len(lender.loans) == 1
+    assert all(isinstance(result, LoanRejected) for result in results)
+    assert results[0] is results[1]
+    assert coalescer.loans_taken == 0
+
+
+def test_borrowers_are_batched_separately():
+    lender = Lender()
+    coalescer = AsyncLoanCoalescer(lender.take_async, window=0.01)
+
+    async def run():
+        await asyncio.gather(
+            coalescer.request("0xA", 100),
+            coalescer.request("0xB", 200),
+            coalescer.request("0xa", 50),
+        )
+
+    asyncio.run(run())
+
+    assert sorted(lender.loans) == [("0xA", 150), ("0xB", 200)]
+
+
+def test_requests_after_the_loan_is_sent_start_a_new_batch():
+    lender = Lender()
+    coalescer = AsyncLoanCoalescer(lender.take_async, window=0.01)
+
+    request_concurrently(coalescer, [100])
+    request_concurrently(coalescer, [200])
+
+    assert lender.loans == [(BORROWER, 100), (BORROWER, 200)]
+
+
+def test_threads_share_one_loan_and_one_rejection():
+    lender = Lender()
+    coalescer = LoanCoalescer(lender.take, window=0.2)
+    with ThreadPoolExecutor(3) as pool:
+        receipts = list(pool.map(lambda amount: coalescer.request(BORROWER, amount), [1, 2, 3]))
+    assert lender.loans == [(BORROWER, 6)]
+    assert receipts[0] is receipts[1] is receipts[2]
+
+    lender.reason = "Pool liquidity too low"
+    with ThreadPoolExecutor(2) as pool:
+        futures = [pool.submit(coalescer.request, BORROWER, amount) for amount in (1, 2)]
+        for future in futures:
+            with pytest.raises(LoanRejected):
+                future.result()
+    assert len(lender.loans) == 2
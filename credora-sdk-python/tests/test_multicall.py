@@ -0,0 +1,81 @@
+from eth_abi import decode, encode
+from web3 import Web3
+from web3.providers import BaseProvider
+
+from credora_sdk.multicall import MULTICALL3_ADDRESS, Multicall, decode_results, encode_calls
+
+TOKEN = Web3.to_checksum_address("0x" + "aa" * 20)
+HOLDERS = [Web3.to_checksum_address("0x" + f"{n:040x}") for n in (1, 2, 3)]
+BALANCE_OF_ABI = [
+    {
+        "inputs": [{"name": "account", "type": "address"}],
+        "name": "balanceOf",
+        "outputs": [{"name": "", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function",
+    }
+]
+BLOCK = 1234
+
+
+class Multicall3Node(BaseProvider):
+    """Answers ``aggregate3`` eth_calls: balances are ``100 * holder``, one reverts."""
+
+    def __init__(self, failing=()):
+        super().__init__()
+        self.failing = {address.lower() for address in failing}
+        self.calls = []
+
+    def make_request(self, method, params):
+        if method == "eth_chainId":
+            return {"jsonrpc": "2.0", "id": 1, "result": "0x14a34"}
+        assert method == "eth_call"
+        self.calls.append(params)
+        data = Web3.to_bytes(hexstr=params[0]["data"])
+        (calls,) = decode(["(address,bool,bytes)[]"], data[4:])
+        results = [(True, encode(["uint256"], [BLOCK]))]  # getBlockNumber
+        for _, _, call_data in calls[1:]:
+            (holder,) = decode(["address"], call_data[4:])
+            if holder.lower() in self.failing:
+                results.append((False, b""))
+            else:
+                results.append((True, encode(["uint256"], [100 * int(holder, 16)])))
+        return {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "result": Web3.to_hex(encode(["(bool,bytes)[]"], [results])),
+        }
+
+
+def balance_calls(web3):
+    token = web3.eth.contract(address=TOKEN, abi=BALANCE_OF_ABI)
+    return [token.functions.balanceOf(holder) for holder in HOLDERS]
+
+
+def test_encode_calls_targets_each_contract():
+    web3 = Web3()
+    calls = encode_calls(balance_calls(web3), allow_failure=False)
+
+    assert [(target, allow) for target, allow, _ in calls] == [(TOKEN, False)] * 3
+    assert decode(["address"], calls[0][2][4:])[0].lower() == HOLDERS[0].lower()
+
+
+def test_failed_calls_decode_to_none():
+    web3 = Web3()
+    fns = balance_calls(web3)[:2]
+
+    decoded = decode_results(web3, fns, [(True, encode(["uint256"], [7])), (False, b"")])
+
+    assert decoded == [7, None]
+
+
+def test_one_round_trip_returns_the_block_and_every_result():
+    node = Multicall3Node(failing=[HOLDERS[1]])
+    web3 = Web3(node)
+
+    block, balances = Multicall(web3).call(balance_calls(web3))
+
+    assert len(node.calls) == 1
+    assert node.calls[0][0]["to"].lower() == MULTICALL3_ADDRESS.lower()
+    assert block == BLOCK
+    assert balances == [100, None, 300]
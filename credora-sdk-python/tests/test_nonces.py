@@ -0,0 +1,122 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from hexbytes import HexBytes
+
+from credora_sdk.async_loans import AsyncLoanClient
+from credora_sdk.gas import GasLimitCache
+from credora_sdk.loans import LoanClient
+from credora_sdk.nonces import AsyncNonceManager, NonceManager, is_nonce_error
+
+
+# The "raw transaction" is just its nonce, so the node records which were sent.
+SIGNER = SimpleNamespace(sign_transaction=lambda tx: SimpleNamespace(raw_transaction=tx["nonce"]))
+
+
+class Node:
+    """Pending transaction count plus a send that can be told to fail."""
+
+    def __init__(self, pending=5):
+        self.pending = pending
+        self.fetches = 0
+        self.failures = []
+        self.sent = []
+
+    def pending_count(self):
+        self.fetches += 1
+        return self.pending
+
+    def send_raw_transaction(self, raw):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.sent.append(raw)
+        self.pending += 1
+        return HexBytes(bytes([len(self.sent)]) * 32)
+
+
+def fn():
+    return SimpleNamespace(
+        address="0xLoan",
+        fn_name="repayLoan",
+        args=(),
+        build_transaction=lambda params: dict(params, gas=params.get("gas", 21_000)),
+    )
+
+
+def loan_client_stub(node, nonces):
+    """Just what ``LoanClient.broadcast`` touches."""
+    return SimpleNamespace(
+        _build_tx_params=lambda: {"nonce": nonces.allocate()},
+        gas_limits=GasLimitCache(sample_rate=0),
+        account=SIGNER,
+        web3=SimpleNamespace(eth=node),
+        nonces=nonces,
+        _inflight_gas={},
+    )
+
+
+def test_nonces_are_allocated_locally_after_one_fetch():
+    node = Node(pending=7)
+    nonces = NonceManager(node.pending_count)
+
+    assert [nonces.allocate() for _ in range(3)] == [7, 8, 9]
+    assert node.fetches == 1
+
+
+def test_is_nonce_error_matches_node_messages():
+    assert is_nonce_error(ValueError({"code": -32000, "message": "nonce too low"}))
+    assert is_nonce_error(ValueError("replacement transaction underpriced"))
+    assert not is_nonce_error(ValueError("insufficient funds for gas"))
+
+
+def test_failed_send_resyncs_so_the_next_nonce_has_no_gap():
+    node = Node(pending=5)
+    nonces = NonceManager(node.pending_count)
+    client = loan_client_stub(node, nonces)
+    node.failures.append(ValueError("nonce too low"))
+
+    with pytest.raises(ValueError):
+        LoanClient.broadcast(client, fn())
+    LoanClient.broadcast(client, fn())
+
+    # Nonce 5 was never used, so the retry re-reads it from the node.
+    assert node.sent == [5]
+    assert node.fetches == 2
+
+
+def test_async_failed_send_resyncs():
+    node = Node(pending=5)
+    nonces = AsyncNonceManager(lambda: asyncio.sleep(0, node.pending_count()))
+
+    async def build_transaction(params):
+        return dict(params, gas=21_000)
+
+    async def send_raw_transaction(raw):
+        return node.send_raw_transaction(raw)
+
+    async def build_tx_params():
+        return {"nonce": await nonces.allocate()}
+
+    client = SimpleNamespace(
+        _build_tx_params=build_tx_params,
+        gas_limits=GasLimitCache(sample_rate=0),
+        account=SIGNER,
+        web3=SimpleNamespace(eth=SimpleNamespace(send_raw_transaction=send_raw_transaction)),
+        nonces=nonces,
+        _inflight_gas={},
+    )
+    call = SimpleNamespace(
+        address="0xLoan", fn_name="repayLoan", args=(), build_transaction=build_transaction
+    )
+    node.failures.append(ValueError("connection reset"))
+
+    async def run():
+        with pytest.raises(ValueError):
+            await AsyncLoanClient.broadcast(client, call)
+        await AsyncLoanClient.broadcast(client, call)
+
+    asyncio.run(run())
+
+    assert node.sent == [5]
+    assert node.fetches == 2
@@ -0,0 +1,184 @@
+import asyncio
+import base64
+import json
+
+from credora_sdk.payment_cache import (
+    PAYMENT_HEADER,
+    PaymentRequirementsCache,
+    PaymentSettlementHooks,
+    PrepaidPaymentHooks,
+    requirements_key,
+)
+
+URL = "https://api.example/premium"
+KEY = requirements_key("GET", URL)
+
+
+def accepts(amount="1000", pay_to="0xPayee"):
+    return [
+        {
+            "scheme": "exact",
+            "network": "base-sepolia",
+            "maxAmountRequired": amount,
+            "payTo": pay_to,
+            "asset": "0xUSDC",
+            "resource": URL,
+        }
+    ]
+
+
+def payment_required(amount="1000"):
+    return {"x402Version": 1, "error": "X-PAYMENT header is required", "accepts": accepts(amount)}
+
+
+def payment_header(amount, network="base-sepolia", pay_to="0xPayee"):
+    payload = {
+        "x402Version": 1,
+        "scheme": "exact",
+        "network": network,
+        "payload": {"signature": "0x", "authorization": {"to": pay_to, "value": str(amount)}},
+    }
+    return base64.b64encode(json.dumps(payload).encode()).decode()
+
+
+class FakeRequest:
+    def __init__(self, method="GET", url=URL):
+        self.method = method
+        self.url = url
+        self.headers = {}
+        self.extensions = {}
+
+
+class FakeResponse:
+    def __init__(self, request, status_code, body=None):
+        self.request = request
+        self.status_code = status_code
+        self._body = json.dumps(body or {}).encode()
+
+    async def aread(self):
+        return self._body
+
+
+def test_unknown_resource_misses():
+    cache = PaymentRequirementsCache()
+
+    assert cache.get(KEY) is None
+    assert cache.misses == 1
+
+
+def test_learned_requirements_are_returned_until_they_expire(monkeypatch):
+    cache = PaymentRequirementsCache(ttl=10)
+    now = [100.0]
+    monkeypatch.setattr("credora_sdk.payment_cache.time.monotonic", lambda: now[0])
+    cache.learn(KEY, payment_required())
+
+    assert cache.get(KEY) == (1, accepts())
+    now[0] += 11
+    assert cache.get(KEY) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_changed_terms_replace_the_entry_and_count_an_invalidation():
+    cache = PaymentRequirementsCache()
+    cache.learn(KEY, payment_required("1000"))
+    cache.learn(KEY, payment_required("1000"))
+    assert cache.invalidations == 0
+
+    cache.learn(KEY, payment_required("2000"))
+    assert cache.invalidations == 1
+    assert cache.get(KEY)[1] == accepts("2000")
+
+
+def test_402_without_accepts_forgets_the_resource():
+    cache = PaymentRequirementsCache()
+    cache.learn(KEY, payment_required())
+    cache.learn(KEY, {"x402Version": 1, "accepts": []})
+
+    assert cache.get(KEY) is None
+    assert cache.invalidations == 1
+
+
+def prepaid_hooks(cache, should_prepay=None):
+    return PrepaidPaymentHooks(
+        cache,
+        select=lambda options: options[0],
+        sign=lambda requirement, version: f"signed:{requirement['maxAmountRequired']}:{version}",
+        should_prepay=should_prepay,
+    )
+
+
+def test_prepaid_hooks_learn_from_a_402_and_pay_the_next_request_up_front():
+    cache = PaymentRequirementsCache()
+    hooks = prepaid_hooks(cache)
+
+    first = FakeRequest()
+    asyncio.run(hooks.on_request(first))
+    assert PAYMENT_HEADER not in first.headers
+    asyncio.run(hooks.on_response(FakeResponse(first, 402, payment_required())))
+
+    second = FakeRequest()
+    asyncio.run(hooks.on_request(second))
+    assert second.headers[PAYMENT_HEADER] == "signed:1000:1"
+    assert hooks.prepaid == 1
+
+
+def test_prepaid_hooks_count_rejected_prepayments_and_relearn():
+    cache = PaymentRequirementsCache()
+    cache.learn(KEY, payment_required("1000"))
+    hooks = prepaid_hooks(cache)
+    request = FakeRequest()
+    asyncio.run(hooks.on_request(request))
+
+    asyncio.run(hooks.on_response(FakeResponse(request, 402, payment_required("2000"))))
+
+    assert hooks.rejected == 1
+    assert cache.get(KEY)[1] == accepts("2000")
+
+
+def test_prepaid_hooks_skip_requests_that_should_not_pay():
+    cache = PaymentRequirementsCache()
+    cache.learn(KEY, payment_required())
+    hooks = prepaid_hooks(cache, should_prepay=lambda request: False)
+    request = FakeRequest()
+    asyncio.run(hooks.on_request(request))
+
+    assert PAYMENT_HEADER not in request.headers
+    assert hooks.prepaid == 0
+
+
+def test_settlement_hooks_report_each_settled_payment_once():
+    settled = []
+    hooks = PaymentSettlementHooks([settled.append])
+
+    prepaid = FakeRequest()
+    prepaid.headers[PAYMENT_HEADER] = payment_header(1000)
+    asyncio.run(hooks.on_request(prepaid))
+    asyncio.run(hooks.on_response(FakeResponse(prepaid, 200)))
+
+    # Paid by the x402 hook's retry: the header appears after the request hook ran.
+    retried = FakeRequest()
+    asyncio.run(hooks.on_request(retried))
+    retried.headers[PAYMENT_HEADER] = payment_header(2000)
+    asyncio.run(hooks.on_response(FakeResponse(retried, 200)))
+
+    assert [(p.network, p.pay_to, p.amount) for p in settled] == [
+        ("base-sepolia", "0xPayee", 1000),
+        ("base-sepolia", "0xPayee", 2000),
+    ]
+    assert settled[0].seconds is not None
+    assert settled[1].seconds is None
+    assert settled[0].resource == URL
+
+
+def test_settlement_hooks_ignore_unpaid_and_rejected_requests():
+    settled = []
+    hooks = PaymentSettlementHooks([settled.append])
+
+    unpaid = FakeRequest()
+    asyncio.run(hooks.on_response(FakeResponse(unpaid, 200)))
+    rejected = FakeRequest()
+    rejected.headers[PAYMENT_HEADER] = payment_header(1000)
+    asyncio.run(hooks.on_response(FakeResponse(rejected, 402)))
+
+    assert settled == []
+    assert (hooks.settled, hooks.failed) == (0, 1)
@@ -0,0 +1,75 @@
+from credora_sdk.payment_cache import SettledPayment
+from credora_sdk.payment_selector import BalanceBook, PaymentSelector
+
+
+def option(network="base-sepolia", asset="0xUSDC", amount=100, pay_to="0xPayee"):
+    return {
+        "scheme": "exact",
+        "network": network,
+        "asset": asset,
+        "maxAmountRequired": str(amount),
+        "payTo": pay_to,
+    }
+
+
+def test_prefers_an_option_the_balance_covers():
+    selector = PaymentSelector(latency={"base-sepolia": 2.0, "avalanche-fuji": 1.0})
+    selector.balances.update("base-sepolia", "0xUSDC", 1_000)
+    selector.balances.update("avalanche-fuji", "0xUSDC", 0)
+    covered = option("base-sepolia")
+
+    assert selector([option("avalanche-fuji"), covered]) is covered
+
+
+def test_loanable_asset_ranks_after_unknown_balances():
+    stale = []
+    selector = PaymentSelector(
+        loanable=[("base-sepolia", "0xUSDC")], on_stale=lambda *key: stale.append(key)
+    )
+    selector.balances.update("base-sepolia", "0xUSDC", 0)
+    unknown = option("base-sepolia", asset="0xOther")
+
+    assert selector([option("base-sepolia"), unknown]) is unknown
+    assert stale == [("base-sepolia", "0xOther")]
+
+
+def test_ties_go_to_the_faster_network_then_the_lower_amount():
+    selector = PaymentSelector(latency={"base-sepolia": 2.0, "iotex": 5.0})
+    cheap_slow = option("iotex", amount=1)
+    dear_fast = option("base-sepolia", amount=50)
+    cheap_fast = option("base-sepolia", amount=10)
+
+    assert selector([cheap_slow, dear_fast, cheap_fast]) is cheap_fast
+
+
+def test_filtered_out_options_fall_back():
+    selector = PaymentSelector(networks=["base"], fallback=lambda accepts, *args: "fallback")
+
+    assert selector([option("base-sepolia")]) == "fallback"
+
+
+def test_selection_spends_nothing_until_the_payment_settles():
+    balances = BalanceBook()
+    balances.update("base-sepolia", "0xUSDC", 1_000)
+    selector = PaymentSelector(balances)
+    chosen = option(amount=300)
+
+    # A prepaid request that falls back to the 402 flow selects twice.
+    selector([chosen])
+    selector([chosen])
+    assert balances.get("base-sepolia", "0xUSDC") == 1_000
+
+    selector.on_payment(SettledPayment("/premium", "base-sepolia", "0xpayee", 300, 4.0))
+    assert balances.get("base-sepolia", "0xUSDC") == 700
+    assert selector.estimated_latency("base-sepolia") == 2.0 + 0.2 * (4.0 - 2.0)
+
+
+def test_unmatched_settlements_only_update_latency():
+    balances = BalanceBook()
+    balances.update("base-sepolia", "0xUSDC", 1_000)
+    selector = PaymentSelector(balances, latency={})
+
+    selector.on_payment(SettledPayment("/premium", "base-sepolia", "0xElse", 300, 3.0))
+
+    assert balances.get("base-sepolia", "0xUSDC") == 1_000
+    assert selector.estimated_latency("base-sepolia") == 3.0
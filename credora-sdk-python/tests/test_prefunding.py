@@ -0,0 +1,135 @@
+import asyncio
+from types import SimpleNamespace
+
+from credora_sdk.credit import LoanRejected
+from credora_sdk.payment_cache import SettledPayment
+from credora_sdk.prefunding import (
+    MIN_RATE_SPAN,
+    AsyncPreFunder,
+    PreFunder,
+    SpendTracker,
+    prefund_amount,
+)
+
+BORROWER = "0xBorrower"
+
+
+def payment(amount, resource="https://api.example/premium"):
+    return SettledPayment(
+        resource=resource, network="base-sepolia", pay_to="0xPayee", amount=amount, seconds=None
+    )
+
+
+class Loans:
+    """Balance reads and loans for a stubbed Credora client."""
+
+    def __init__(self, balance=0, reject=False):
+        self.balance = balance
+        self.reject = reject
+        self.loans = []
+
+    def get_balance(self, borrower):
+        return self.balance
+
+    def take_loan(self, borrower, amount_wei):
+        self.loans.append(amount_wei)
+        if self.reject:
+            raise LoanRejected(borrower, amount_wei, "Insufficient credit score")
+        return {"status": 1}
+
+
+def client(loans, coalescer=None):
+    return SimpleNamespace(
+        account=SimpleNamespace(address=BORROWER), loan=loans, loan_coalescer=coalescer
+    )
+
+
+def test_rate_is_spend_over_the_window():
+    spend = SpendTracker(window=100)
+    spend.record("a", 300, now=0)
+    spend.record("b", 700, now=50)
+
+    assert spend.rate(now=50) == 1_000 / 50
+    assert spend.rate(now=120) == 700 / 70  # the first payment left the window
+    assert spend.last_amount == {"a": 300, "b": 700}
+
+
+def test_a_single_payment_is_not_extrapolated():
+    spend = SpendTracker()
+    spend.record(None, 100, now=0)
+
+    assert spend.rate(now=0) == 100 / MIN_RATE_SPAN
+
+
+def test_prefund_amount_covers_the_horizon_within_limits():
+    assert prefund_amount(500, rate=10, horizon_seconds=60) == 100
+    assert prefund_amount(600, rate=10, horizon_seconds=60) == 0
+    assert prefund_amount(500, rate=10, horizon_seconds=60, min_loan_wei=1_000) == 1_000
+    assert prefund_amount(0, rate=10, horizon_seconds=60, max_loan_wei=250) == 250
+
+
+def test_check_borrows_the_projected_shortfall():
+    loans = Loans(balance=0)
+    funded = []
+    prefunder = PreFunder(client(loans), horizon_seconds=60, on_loan_taken=funded.append)
+    prefunder.record_payment("premium", 100)
+
+    assert prefunder.check() == {"status": 1}
+    assert loans.loans == [600]  # 100 wei per MIN_RATE_SPAN seconds, for 60s
+    assert funded == [{"status": 1}]
+
+    loans.balance = 600
+    assert prefunder.check() is None
+    assert prefunder.loans_taken == 1
+
+
+def test_check_uses_the_shared_coalescer():
+    loans = Loans()
+    shared = []
+    coalescer = SimpleNamespace(request=lambda borrower, amount: shared.append(amount) or {})
+    prefunder = PreFunder(client(loans, coalescer), horizon_seconds=60)
+    prefunder.record_payment("premium", 100)
+
+    prefunder.check()
+
+    assert shared == [600] and loans.loans == []
+
+
+def test_rejection_pauses_pre_funding():
+    loans = Loans(reject=True)
+    prefunder = PreFunder(client(loans), horizon_seconds=60)
+    prefunder.observe_payment(payment(100))
+    check = prefunder._thread
+    if check is not None:
+        check.join(5)
+
+    prefunder.observe_payment(payment(100))
+
+    assert loans.loans == [600]
+    assert prefunder._thread is None
+    assert prefunder.loans_taken == 0
+
+
+def test_async_observed_payments_trigger_one_check():
+    balance_reads = []
+
+    async def get_balance(borrower):
+        balance_reads.append(borrower)
+        await asyncio.sleep(0.01)
+        return 0
+
+    async def take_loan(borrower, amount_wei):
+        return {"amount": amount_wei}
+
+    loans = SimpleNamespace(get_balance=get_balance, take_loan=take_loan)
+    prefunder = AsyncPreFunder(client(loans), horizon_seconds=60)
+
+    async def run():
+        for _ in range(3):
+            prefunder.observe_payment(payment(100))
+        await prefunder._task
+
+    asyncio.run(run())
+
+    assert balance_reads == [BORROWER]
+    assert prefunder.loans_taken == 1
@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+
+from credora_sdk import read_cache
+from credora_sdk.loans import LoanClient
+from credora_sdk.read_cache import MISSING, BlockReadCache, read_key
+
+KEY = ("0xloan", "getOutstanding", ("0xborrower",))
+
+
+class ViewCall:
+    """A bound view call that counts the blocks it was read at."""
+
+    def __init__(self, value=0, fn_name="getOutstanding", args=("0xBorrower",)):
+        self.address = "0xLoan"
+        self.fn_name = fn_name
+        self.args = args
+        self.value = value
+        self.blocks = []
+
+    def call(self, block_identifier="latest"):
+        self.blocks.append(block_identifier)
+        return self.value
+
+
+def test_read_key_covers_contract_function_and_arguments():
+    assert read_key(ViewCall()) == ("0xloan", "getOutstanding", ("0xBorrower",))
+    assert read_key(ViewCall(args=("0xOther",))) != read_key(ViewCall())
+
+
+def test_values_live_until_a_newer_head():
+    cache = BlockReadCache()
+    cache.set_head(10)
+    cache.put(KEY, 5, 10)
+
+    cache.set_head(10)
+    assert cache.get(KEY) == 5
+    cache.set_head(11)
+    assert cache.get(KEY) is MISSING
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_results_for_an_older_block_are_not_stored():
+    cache = BlockReadCache()
+    cache.set_head(10)
+    cache.set_head(11)  # arrived while a block-10 read was in flight
+    cache.put(KEY, 5, 10)
+
+    assert cache.get(KEY) is MISSING
+
+
+def test_head_is_re_read_after_the_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(read_cache.time, "monotonic", lambda: now[0])
+    cache = BlockReadCache(head_ttl=1.0)
+    assert cache.head_stale()
+
+    cache.set_head(10)
+    assert not cache.head_stale()
+    now[0] += 1.5
+    assert cache.head_stale()
+
+
+def test_cached_call_reads_each_value_once_per_block():
+    eth = SimpleNamespace(block_number=10)
+    client = SimpleNamespace(web3=SimpleNamespace(eth=eth), reads=BlockReadCache(head_ttl=0))
+    fn = ViewCall(value=42)
+
+    assert LoanClient.cached_call(client, fn) == 42
+    assert LoanClient.cached_call(client, fn) == 42
+    eth.block_number = 11
+    LoanClient.cached_call(client, fn)
+    client.reads.invalidate()  # one of our own transactions was mined
+    LoanClient.cached_call(client, fn)
+
+    assert fn.blocks == [10, 11, 11]
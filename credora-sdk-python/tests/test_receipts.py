@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+from web3.exceptions import TransactionNotFound
+
+from credora_sdk.receipts import AsyncReceiptTracker, ReceiptTracker, tx_key
+
+MINED = bytes([0x11]) * 32
+BROKEN = bytes([0x22]) * 32
+LATER = bytes([0x33]) * 32
+OTHER = bytes([0x44]) * 32
+
+
+class ChainEth:
+    """Receipts keyed by hash; ``errors`` are raised for their hash's lookup."""
+
+    def __init__(self, head=10):
+        self.head = head
+        self.receipts = {}
+        self.errors = {}
+        self.blocks = {}
+        self.lookups = []
+
+    def mine(self, tx_hash, block):
+        self.receipts[tx_key(tx_hash)] = {"transactionHash": tx_hash, "blockNumber": block}
+        self.blocks.setdefault(block, []).append(tx_hash)
+
+    def receipt(self, tx_hash):
+        self.lookups.append(tx_hash)
+        if tx_hash in self.errors:
+            raise self.errors[tx_hash]
+        if tx_hash not in self.receipts:
+            raise TransactionNotFound(tx_hash)
+        return self.receipts[tx_hash]
+
+    def block(self, number):
+        return {"number": number, "transactions": self.blocks.get(number, [])}
+
+
+class SyncEth(ChainEth):
+    @property
+    def block_number(self):
+        return self.head
+
+    def get_transaction_receipt(self, tx_hash):
+        return self.receipt(tx_hash)
+
+    def get_block(self, number):
+        return self.block(number)
+
+
+class AsyncEth(ChainEth):
+    @property
+    def block_number(self):
+        async def head():
+            return self.head
+
+        return head()
+
+    async def get_transaction_receipt(self, tx_hash):
+        return self.receipt(tx_hash)
+
+    async def get_block(self, number):
+        return self.block(number)
+
+
+class FakeWeb3:
+    def __init__(self, eth):
+        self.eth = eth
+
+
+def test_async_failed_lookup_fails_only_its_own_waiter():
+    eth = AsyncEth()
+    eth.mine(MINED, 9)
+    eth.errors[tx_key(BROKEN)] = ValueError("rpc down")
+
+    async def run():
+        tracker = AsyncReceiptTracker(FakeWeb3(eth), poll_interval=0.01)
+        results = await asyncio.gather(
+            tracker.wait(MINED), tracker.wait(BROKEN), return_exceptions=True
+        )
+        return tracker, results
+
+    tracker, (mined, broken) = asyncio.run(run())
+
+    assert mined["blockNumber"] == 9
+    assert isinstance(broken, ValueError)
+    assert tracker.pending == 0
+
+
+def test_async_block_scan_only_fetches_our_mined_transactions():
+    eth = AsyncEth(head=10)
+
+    async def run():
+        tracker = AsyncReceiptTracker(FakeWeb3(eth), poll_interval=0.01)
+        waiter = asyncio.ensure_future(tracker.wait(LATER))
+        await asyncio.sleep(0.05)  # first poll: not mined yet
+        eth.mine(LATER, 11)
+        eth.blocks[11].append(OTHER)  # someone else's transaction
+        eth.head = 11
+        return tracker, await waiter
+
+    tracker, receipt = asyncio.run(run())
+
+    assert receipt["blockNumber"] == 11
+    assert tracker.blocks_scanned == 1
+    assert tx_key(OTHER) not in eth.lookups
+
+
+def test_sync_failed_lookup_fails_only_its_own_waiter():
+    eth = SyncEth()
+    eth.mine(MINED, 9)
+    eth.errors[tx_key(BROKEN)] = ValueError("rpc down")
+    tracker = ReceiptTracker(FakeWeb3(eth), poll_interval=0.01)
+
+    broken = tracker.track(BROKEN)
+    mined = tracker.track(MINED)
+
+    assert mined.result(timeout=5)["blockNumber"] == 9
+    with pytest.raises(ValueError):
+        broken.result(timeout=5)
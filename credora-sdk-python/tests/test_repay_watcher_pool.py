@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+
+from credora_sdk import auto_repay_watcher
+from credora_sdk.auto_repay_watcher import RepayService, RepayWatcherPool
+
+from fakes import LENDER, LENDING_POOL, FakeEth, FakeLoan, wallet
+
+ALICE = wallet(1)
+BOB = wallet(2)
+CAROL = wallet(3)
+
+
+class SharedLoan(FakeLoan):
+    """One ledger for every wallet, like several clients on one chain."""
+
+    def __init__(self, address, eth, ledger):
+        super().__init__(address, eth)
+        self.balances = ledger.balances
+        self.outstanding = ledger.outstanding
+        self.repaid = ledger.repaid
+
+
+def pool_with(eth, **debts):
+    ledger = FakeLoan(ALICE, eth)
+    ledger.balances, ledger.outstanding = {}, {}
+    pool = RepayWatcherPool(block_poll_interval=0)
+    loans = {}
+    for address, (balance, outstanding) in debts.items():
+        ledger.balances[address] = balance
+        ledger.outstanding[address] = outstanding
+        loans[address] = SharedLoan(address, eth, ledger)
+        pool.add(loans[address])
+    asyncio.run(pool._start())
+    return pool, ledger
+
+
+def settle(pool, step=None):
+    async def run():
+        await (step or pool.settle)()
+        # Repayments run as tasks; let them finish.
+        while any(pool.repaying):
+            await asyncio.sleep(0)
+
+    asyncio.run(run())
+
+
+def test_scan_accumulates_inflows_per_wallet_in_one_log_request():
+    eth = FakeEth(block_number=100)
+    pool, _ = pool_with(eth, **{ALICE: (0, 100), BOB: (0, 100), CAROL: (0, 100)})
+    eth.transfer(101, LENDER, ALICE, 30)
+    eth.transfer(101, LENDING_POOL, BOB, 100)  # a loan payout, not an inflow
+    eth.transfer(102, LENDER, CAROL, 5)
+    eth.transfer(102, LENDER, ALICE, 20)
+
+    changed = asyncio.run(pool.scan(101, 102))
+
+    assert len(eth.requests) == 1
+    assert [pool.wallets[slot] for slot in changed] == [ALICE, CAROL]
+    assert pool.pending_inflow == [50, 0, 5]
+
+
+def test_settle_repays_up_to_balance_and_debt():
+    eth = FakeEth(block_number=100)
+    pool, ledger = pool_with(eth, **{ALICE: (50, 500), BOB: (80, 40), CAROL: (10, 500)})
+    pool.pending_inflow[:] = [50, 80, 30]
+
+    settle(pool)
+
+    # Bob only owed 40; Carol only still holds 10.
+    assert sorted(ledger.repaid) == sorted([(ALICE, 50), (BOB, 40), (CAROL, 10)])
+    assert pool.pending_inflow == [0, 0, 0]
+
+
+def test_settle_waits_out_the_grace_period_after_a_loan():
+    eth = FakeEth(block_number=100)
+    pool, ledger = pool_with(eth, **{ALICE: (50, 500)})
+    pool.pending_inflow[0] = 50
+    pool.note_loan(ALICE)
+
+    settle(pool)
+
+    assert ledger.repaid == []
+    assert pool.pending_inflow == [50]
+
+
+def test_failed_repay_is_kept_for_the_next_settle():
+    eth = FakeEth(block_number=100)
+    pool, ledger = pool_with(eth, **{ALICE: (50, 500)})
+    pool.loans[0].repay_error = RuntimeError("nonce too low")
+    pool.pending_inflow[0] = 50
+
+    settle(pool)
+
+    assert pool.pending_inflow == [50]
+
+
+def test_failed_step_leaves_the_cursor_for_a_rescan():
+    eth = FakeEth(block_number=100)
+    pool, ledger = pool_with(eth, **{ALICE: (30, 500)})
+    eth.transfer(101, LENDER, ALICE, 30)
+    eth.block_number = 101
+    eth.failures.append(ConnectionError("rpc down"))
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(pool.step())
+    assert pool.last_block == 100
+
+    settle(pool, pool.step)
+    assert pool.last_block == 101
+    assert ledger.repaid == [(ALICE, 30)]
+
+
+def test_repay_service_restarts_a_watcher_that_died(monkeypatch):
+    monkeypatch.setattr(auto_repay_watcher, "WATCHER_RESTART_DELAY", 0)
+    runs = []
+
+    class Watcher:
+        wallet = ALICE
+
+        async def watch_and_repay(self):
+            runs.append(1)
+            if len(runs) == 1:
+                raise RuntimeError("watcher crashed")
+            await asyncio.sleep(3600)
+
+    async def main():
+        service = RepayService()
+        service.watch(Watcher())
+        for _ in range(10):
+            await asyncio.sleep(0)
+        assert service.running
+        await service.stop()
+
+    asyncio.run(main())
+    assert len(runs) == 2
@@ -0,0 +1,61 @@
+from credora_sdk.auto_repay_watcher import RepaymentPolicy
+from credora_sdk.credit import (
+    INSUFFICIENT_LIQUIDITY,
+    INSUFFICIENT_SCORE,
+    LOAN_CREDIT_THRESHOLD,
+    evaluate_loan,
+)
+
+
+def test_default_policy_settles_every_inflow():
+    assert RepaymentPolicy().should_settle(1, outstanding=1_000, waited_seconds=0)
+
+
+def test_inflow_covering_the_debt_always_settles():
+    policy = RepaymentPolicy(min_repay_wei=10_000)
+
+    assert policy.should_settle(500, outstanding=500, waited_seconds=0)
+
+
+def test_small_inflows_wait_for_min_repay():
+    policy = RepaymentPolicy(min_repay_wei=100)
+
+    assert not policy.should_settle(99, outstanding=1_000, waited_seconds=0)
+    assert policy.should_settle(100, outstanding=1_000, waited_seconds=0)
+
+
+def test_zero_max_delay_means_no_deadline():
+    policy = RepaymentPolicy(min_repay_wei=100, max_delay_seconds=0)
+
+    assert not policy.should_settle(1, outstanding=1_000, waited_seconds=10_000)
+
+
+def test_max_delay_settles_below_min_repay():
+    policy = RepaymentPolicy(min_repay_wei=100, max_delay_seconds=30)
+
+    assert not policy.should_settle(1, outstanding=1_000, waited_seconds=29)
+    assert policy.should_settle(1, outstanding=1_000, waited_seconds=30)
+
+
+def test_gas_ratio_holds_back_repays_that_cost_too_much():
+    policy = RepaymentPolicy(
+        max_gas_to_debt_ratio=0.01,
+        stablecoin_per_native_wei=1.0,
+        repay_gas=100,
+    )
+
+    # 100 gas * 10 wei = 1_000 in gas; worth it only from 100_000 repaid.
+    assert not policy.should_settle(99_999, outstanding=10**9, waited_seconds=0, fee_per_gas=10)
+    assert policy.should_settle(100_000, outstanding=10**9, waited_seconds=0, fee_per_gas=10)
+    # Without a fee estimate the ratio can't be checked, so it doesn't block.
+    assert policy.should_settle(1, outstanding=10**9, waited_seconds=0)
+
+
+def test_evaluate_loan_seeds_unscored_borrowers():
+    assert evaluate_loan(0, liquidity=1_000, amount_wei=1_000) is None
+
+
+def test_evaluate_loan_reasons():
+    assert evaluate_loan(LOAN_CREDIT_THRESHOLD - 1, 10**6, 1) == INSUFFICIENT_SCORE
+    assert evaluate_loan(LOAN_CREDIT_THRESHOLD, 999, 1_000) == INSUFFICIENT_LIQUIDITY
+    assert evaluate_loan(LOAN_CREDIT_THRESHOLD, 1_000, 1_000) is None
@@ -0,0 +1,155 @@
+import asyncio
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from credora_sdk.response_cache import (  # noqa: E402
+    CachedResponse,
+    CachingTransport,
+    ResponseCache,
+    cache_ttl,
+    from_cache,
+)
+
+URL = "https://api.example/premium"
+
+
+def test_cache_ttl_reads_max_age():
+    assert cache_ttl("private, max-age=30") == 30
+    assert cache_ttl(None, default_ttl=5) == 5
+    assert cache_ttl("private", default_ttl=5) == 5
+
+
+def test_cache_ttl_never_caches_no_store_or_bad_max_age():
+    assert cache_ttl("no-store, max-age=30") == 0
+    assert cache_ttl("no-cache") == 0
+    assert cache_ttl("max-age=soon") == 0
+
+
+def entry(expires_at, content=b"paid"):
+    return CachedResponse(200, [("content-type", "text/plain")], content, expires_at)
+
+
+def test_get_counts_hits_and_misses():
+    cache = ResponseCache()
+    cache.put("k", entry(expires_at=float("inf")))
+
+    assert cache.get("k").content == b"paid"
+    assert cache.get("other") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_expired_entries_miss(monkeypatch):
+    now = [1_000.0]
+    monkeypatch.setattr("credora_sdk.response_cache.time.time", lambda: now[0])
+    cache = ResponseCache()
+    cache.put("k", entry(expires_at=1_010.0))
+
+    assert cache.fresh("k")
+    now[0] = 1_010.0
+    assert cache.get("k") is None
+
+
+def test_memory_is_bounded_lru():
+    cache = ResponseCache(max_entries=2)
+    for key in ("a", "b"):
+        cache.put(key, entry(float("inf")))
+    cache.get("a")
+    cache.put("c", entry(float("inf")))
+
+    assert cache.fresh("a") and cache.fresh("c")
+    assert not cache.fresh("b")
+
+
+def test_entries_survive_a_restart_on_disk(tmp_path):
+    path = str(tmp_path / "responses.db")
+    cache = ResponseCache(path)
+    cache.put("k", entry(float("inf"), content=b"\x00binary"))
+    cache.close()
+
+    reopened = ResponseCache(path)
+    assert reopened.get("k").content == b"\x00binary"
+    reopened.invalidate("k")
+    assert reopened.get("k") is None
+    reopened.close()
+
+
+def test_keys_separate_scopes_and_vary_headers():
+    cache = ResponseCache()
+    plain = httpx.Request("GET", URL)
+    json_request = httpx.Request("GET", URL, headers={"accept": "application/json"})
+
+    assert cache.key(plain, "0xWalletA") != cache.key(plain, "0xWalletB")
+    assert cache.key(plain) != cache.key(json_request)
+    assert cache.key(plain) == cache.key(httpx.Request("GET", URL))
+
+
+class CountingServer:
+    def __init__(self, cache_control="private, max-age=60", status=200):
+        self.calls = 0
+        self.cache_control = cache_control
+        self.status = status
+
+    def __call__(self, request):
+        self.calls += 1
+        return httpx.Response(
+            self.status,
+            headers={"cache-control": self.cache_control},
+            content=f"call {self.calls}".encode(),
+        )
+
+
+def fetch(server, cache, method="GET", scope="", headers=None):
+    async def run():
+        caching = CachingTransport(cache, httpx.MockTransport(server), scope=scope)
+        async with httpx.AsyncClient(
+            transport=caching, event_hooks={"response": [caching.on_response]}
+        ) as client:
+            response = await client.request(method, URL, headers=headers)
+            return response, response.content
+
+    return asyncio.run(run())
+
+
+def test_caching_transport_serves_repeats_without_reaching_the_server():
+    server = CountingServer()
+    cache = ResponseCache()
+
+    first, body = fetch(server, cache)
+    second, cached_body = fetch(server, cache)
+
+    assert server.calls == 1
+    assert not from_cache(first)
+    assert from_cache(second)
+    assert cached_body == body == b"call 1"
+
+
+def test_caching_transport_forwards_uncacheable_requests():
+    cache = ResponseCache()
+
+    no_store = CountingServer(cache_control="no-store")
+    fetch(no_store, cache)
+    fetch(no_store, cache)
+    assert no_store.calls == 2
+
+    payment_required = CountingServer(status=402)
+    fetch(payment_required, cache)
+    fetch(payment_required, cache)
+    assert payment_required.calls == 2
+
+    post = CountingServer()
+    fetch(post, cache, method="POST")
+    fetch(post, cache, method="POST")
+    assert post.calls == 2
+
+
+def test_caching_transport_honours_request_no_cache_and_scope():
+    server = CountingServer()
+    cache = ResponseCache()
+    fetch(server, cache, scope="0xWalletA")
+
+    fetch(server, cache, scope="0xWalletA", headers={"cache-control": "no-cache"})
+    fetch(server, cache, scope="0xWalletB")
+
+    assert server.calls == 3
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("x402")
+
+from eth_account import Account  # noqa: E402
+
+from credora_sdk.response_cache import ResponseCache  # noqa: E402
+from credora_sdk.utils import create_x402_client, create_x402_transport  # noqa: E402
+
+BASE_URL = "https://api.example"
+ACCEPTS = [
+    {
+        "scheme": "exact",
+        "network": "base-sepolia",
+        "maxAmountRequired": "1000",
+        "resource": f"{BASE_URL}/premium",
+        "description": "",
+        "mimeType": "application/json",
+        "payTo": "0x4ec137a8be0466c166997bcfc56ffdafc542201b",
+        "maxTimeoutSeconds": 60,
+        "asset": "0x036CbD53842c5426634e7929541eC2318f3dCF7e",
+        "extra": {"name": "USDC", "version": "2"},
+    }
+]
+
+
+class PaywalledServer:
+    def __init__(self):
+        self.paid = 0
+        self.unpaid = 0
+
+    def __call__(self, request):
+        if "X-Payment" not in request.headers:
+            self.unpaid += 1
+            return httpx.Response(402, json={"x402Version": 1, "error": "", "accepts": ACCEPTS})
+        self.paid += 1
+        return httpx.Response(
+            200, json={"status": "success"}, headers={"Cache-Control": "max-age=60"}
+        )
+
+
+def get(server):
+    async def run():
+        transport = httpx.MockTransport(server)
+        async with create_x402_client(Account.create(), BASE_URL, transport=transport) as client:
+            return await client.get("/premium")
+
+    return asyncio.run(run())
+
+
+def test_paid_retry_goes_through_the_client_transport():
+    server = PaywalledServer()
+
+    response = get(server)
+
+    # MockTransport is the only route to the server: a throwaway client
+    # would have hit the network instead.
+    assert response.status_code == 200
+    assert response.json() == {"status": "success"}
+    assert (server.unpaid, server.paid) == (1, 1)
+    assert "X-Payment" in response.request.headers
+
+
+def test_paid_retry_is_stored_in_the_response_cache():
+    server = PaywalledServer()
+    cache = ResponseCache()
+
+    async def run():
+        account = Account.create()
+        transport = create_x402_transport(account, response_cache=cache)
+        transport.transport = httpx.MockTransport(server)
+        for _ in range(2):
+            async with create_x402_client(account, BASE_URL, transport=transport) as client:
+                response = await client.get("/premium")
+                assert response.status_code == 200
+
+    asyncio.run(run())
+
+    assert (server.unpaid, server.paid) == (1, 1)